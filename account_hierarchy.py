@@ -0,0 +1,196 @@
+"""
+Index of the manager (MCC) hierarchy below the accessible Google Ads accounts.
+
+The Google Ads API only serves an account below a manager when the request
+names that manager in the login-customer-id header. The server fills this
+index by querying customer_client one level at a time (HIERARCHY_QUERY) from
+every account returned by listAccessibleCustomers. Sub-managers are crawled
+concurrently, and the index records for every account:
+
+- its parent manager and direct children
+- whether it is a manager
+- the login-customer-id that grants access to it (the accessible root above it)
+
+Each manager remembers when it was last crawled, so a refresh only queries
+managers whose entry is older than the TTL. Accounts a manager no longer
+lists are dropped with everything below them.
+
+An account linked under several managers is kept under the first one found.
+"""
+
+import time
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+# Direct clients of one manager (level 1) plus the manager itself (level 0)
+HIERARCHY_QUERY = """
+    SELECT
+        customer_client.id,
+        customer_client.descriptive_name,
+        customer_client.currency_code,
+        customer_client.time_zone,
+        customer_client.manager,
+        customer_client.level
+    FROM customer_client
+    WHERE customer_client.level <= 1
+"""
+
+
+def client_metadata(client: Dict[str, Any]) -> Dict[str, Any]:
+    """Account cache entry (see AccountCache) of a customerClient result."""
+    return {
+        "name": client.get('descriptiveName', ''),
+        "currency": client.get('currencyCode', ''),
+        "time_zone": client.get('timeZone', ''),
+        "manager": bool(client.get('manager', False)),
+    }
+
+
+class HierarchyIndex:
+    """Thread-safe tree of accounts keyed by 10-digit customer ID."""
+
+    def __init__(self):
+        # customer ID -> {"parent", "children", "manager", "login_customer_id", "name"}
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.roots: List[str] = []
+        # customer ID -> time.monotonic() of the last customer_client query from it
+        self.crawled_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def set_roots(self, customer_ids: List[str]) -> None:
+        """Record the directly accessible accounts; each is its own login customer."""
+        with self._lock:
+            for customer_id in customer_ids:
+                node = self.nodes.setdefault(customer_id, self._new_node(customer_id))
+                node["login_customer_id"] = customer_id
+            removed = set(self.roots) - set(customer_ids)
+            self.roots = list(customer_ids)
+            for customer_id in removed:
+                node = self.nodes.get(customer_id)
+                if node and node["parent"] is None:
+                    self._remove(customer_id)
+
+    def update_manager(self, customer_id: str, rows: List[Dict[str, Any]]) -> List[str]:
+        """
+        Record the result of HIERARCHY_QUERY run from an account.
+
+        Args:
+            customer_id: The account queried
+            rows: Result rows with a 'customerClient' object each
+
+        Returns:
+            IDs of the direct children that are managers themselves
+        """
+        children = {}
+        with self._lock:
+            node = self.nodes.setdefault(customer_id, self._new_node(customer_id))
+            for row in rows:
+                client = row.get('customerClient', {})
+                if not client.get('id'):
+                    continue
+                client_id = str(client['id']).zfill(10)
+                if str(client.get('level', '1')) == '0' or client_id == customer_id:
+                    node["manager"] = bool(client.get('manager', False))
+                    node["name"] = client.get('descriptiveName', '')
+                else:
+                    children[client_id] = client
+
+            for client_id in set(node["children"]) - set(children):
+                if self.nodes.get(client_id, {}).get("parent") == customer_id:
+                    self._remove(client_id)
+
+            node["children"] = list(children)
+            for client_id, client in children.items():
+                child = self.nodes.setdefault(client_id, self._new_node(client_id))
+                if child["parent"] is None:
+                    child["parent"] = customer_id
+                # Directly accessible accounts keep themselves as login customer
+                if child["parent"] == customer_id and client_id not in self.roots:
+                    child["login_customer_id"] = node["login_customer_id"]
+                child["manager"] = bool(client.get('manager', False))
+                child["name"] = client.get('descriptiveName', '')
+
+            self.crawled_at[customer_id] = time.monotonic()
+            return [client_id for client_id in children if self.nodes[client_id]["manager"]]
+
+    def needs_crawl(self, customer_id: str, ttl: float) -> bool:
+        crawled_at = self.crawled_at.get(customer_id)
+        return crawled_at is None or time.monotonic() - crawled_at >= ttl
+
+    def login_customer_id(self, customer_id: str) -> Optional[str]:
+        """The login-customer-id to send for an account, or None if it is not indexed."""
+        node = self.nodes.get(customer_id)
+        return node["login_customer_id"] if node else None
+
+    def login_customer_ids(self) -> Dict[str, str]:
+        """Customer ID -> login-customer-id of every indexed account that has one."""
+        with self._lock:
+            return {
+                customer_id: node["login_customer_id"]
+                for customer_id, node in self.nodes.items() if node["login_customer_id"]
+            }
+
+    def children(self, customer_id: str) -> List[str]:
+        node = self.nodes.get(customer_id)
+        return list(node["children"]) if node else []
+
+    def walk(self, customer_id: str) -> List[Tuple[str, int]]:
+        """(customer ID, depth below customer_id) of an account and its subtree, depth first."""
+        with self._lock:
+            if customer_id not in self.nodes:
+                return []
+            found = []
+            seen = set()
+            stack = [(customer_id, 0)]
+            while stack:
+                current, depth = stack.pop()
+                if current in seen:
+                    continue
+                seen.add(current)
+                found.append((current, depth))
+                children = [
+                    child for child in self.nodes[current]["children"]
+                    if self.nodes.get(child, {}).get("parent") == current
+                ]
+                stack.extend((child, depth + 1) for child in reversed(children))
+            return found
+
+    def subtree(self, customer_id: str) -> List[str]:
+        """An account and every account below it, parents before children."""
+        return [current for current, _ in self.walk(customer_id)]
+
+    def top_level(self) -> List[str]:
+        """Accessible accounts that are not below another indexed account."""
+        return [customer_id for customer_id in self.roots if self.nodes.get(customer_id, {}).get("parent") is None]
+
+    def render(self, customer_id: str, metadata: Dict[str, Optional[Dict[str, Any]]]) -> List[str]:
+        """Indented tree lines for an account and its subtree, with currency and time zone if known."""
+        lines = []
+        for current, depth in self.walk(customer_id):
+            node = self.nodes[current]
+            details = metadata.get(current) or {}
+            label = [current, node["name"] or details.get("name") or "(unnamed)"]
+            if details.get("currency"):
+                label.append(f"{details['currency']}, {details.get('time_zone') or '?'}")
+            if node["manager"]:
+                label.append("manager")
+            lines.append(("  " * depth) + " | ".join(label))
+        return lines
+
+    def _new_node(self, customer_id: str) -> Dict[str, Any]:
+        return {"parent": None, "children": [], "manager": False, "login_customer_id": None, "name": ""}
+
+    def _remove(self, customer_id: str) -> None:
+        """Drop an account and its subtree; directly accessible accounts stay as roots."""
+        node = self.nodes.get(customer_id)
+        if node is None:
+            return
+        if customer_id in self.roots:
+            node["parent"] = None
+            node["login_customer_id"] = customer_id
+            return
+        for child in node["children"]:
+            if self.nodes.get(child, {}).get("parent") == customer_id:
+                self._remove(child)
+        self.nodes.pop(customer_id, None)
+        self.crawled_at.pop(customer_id, None)
@@ -0,0 +1,204 @@
+"""
+Anomaly detection over daily Google Ads metrics.
+
+detect_anomalies() in google_ads_server.py fetches one row per entity and day
+(segments.date). This module turns those rows into dense [entity × day] numpy
+matrices for spend, CTR, CPC and conversions. It then scores every cell
+against a trailing baseline in one vectorized pass:
+
+- baseline: median of the previous `baseline_days` days of the same entity
+- spread: median absolute deviation (MAD) of those days, scaled by 1.4826 so
+  it estimates a standard deviation for normal data
+- robust z-score: (value - baseline) / spread
+
+Days without traffic do not count toward CTR and CPC baselines (they are NaN).
+The spread has a floor per metric (MIN_SCALE, and 10% of the baseline), so
+tiny entities with almost constant values do not flag every small wobble.
+Only cells at or above the z-score threshold are returned.
+
+numpy is required; it is imported when this module is.
+"""
+
+import warnings
+from datetime import date, timedelta
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# Level -> (FROM resource, ID field, name field)
+LEVELS = {
+    "campaign": ("campaign", "campaign.id", "campaign.name"),
+    "ad_group": ("ad_group", "ad_group.id", "ad_group.name"),
+}
+
+METRICS = ("spend", "ctr", "cpc", "conversions")
+
+# Smallest spread per metric, in display units (currency, ratio, currency, conversions)
+MIN_SCALE = {"spend": 1.0, "ctr": 0.002, "cpc": 0.05, "conversions": 1.0}
+RELATIVE_MIN_SCALE = 0.1
+MAD_TO_SIGMA = 1.4826
+
+
+def build_query(level: str, start: date, end: date) -> str:
+    resource, id_field, name_field = LEVELS[level]
+    return (
+        f"SELECT {id_field}, {name_field}, segments.date, metrics.impressions, metrics.clicks, "
+        f"metrics.cost_micros, metrics.conversions FROM {resource} "
+        f"WHERE segments.date BETWEEN '{start.isoformat()}' AND '{end.isoformat()}'"
+    )
+
+
+def date_range(start: date, end: date) -> List[str]:
+    return [(start + timedelta(days=offset)).isoformat() for offset in range((end - start).days + 1)]
+
+
+def build_matrices(rows: List[Dict[str, Any]], level: str, dates: List[str]) -> Tuple[List[str], Dict[str, str], Dict[str, "np.ndarray"]]:
+    """
+    Arrange daily rows into [entity × day] matrices.
+
+    Returns:
+        Tuple of (entity IDs in row order, entity ID -> name, metric -> matrix) where the
+        matrices are "spend", "ctr", "cpc" and "conversions"; CTR and CPC are NaN on days
+        without impressions or clicks
+    """
+    resource, _, _ = LEVELS[level]
+    # REST rows nest the fields under the camelCase resource name, e.g. {"adGroup": {"id", "name"}}
+    head, *rest = resource.split('_')
+    key = head + ''.join(word.title() for word in rest)
+    day_index = {day: i for i, day in enumerate(dates)}
+
+    entity_index: Dict[str, int] = {}
+    names: Dict[str, str] = {}
+    cells = []
+    for row in rows:
+        entity = row.get(key, {})
+        entity_id = str(entity.get('id') or "")
+        day = day_index.get(row.get('segments', {}).get('date'))
+        if not entity_id or day is None:
+            continue
+        position = entity_index.get(entity_id)
+        if position is None:
+            position = entity_index[entity_id] = len(entity_index)
+            names[entity_id] = str(entity.get('name') or "")
+        metrics = row.get('metrics', {})
+        cells.append((
+            position, day,
+            metrics.get('impressions') or 0, metrics.get('clicks') or 0,
+            metrics.get('costMicros') or 0, metrics.get('conversions') or 0,
+        ))
+
+    shape = (len(entity_index), len(dates))
+    impressions, clicks, spend, conversions = (np.zeros(shape) for _ in range(4))
+    if cells:
+        # The REST API returns int64 metrics as strings; numpy converts them in bulk
+        values = np.array(cells, dtype=float)
+        values[:, 4] /= 1_000_000
+        entity_positions, day_positions = values[:, 0].astype(int), values[:, 1].astype(int)
+        # Several rows for the same cell are summed
+        for matrix, column in ((impressions, 2), (clicks, 3), (spend, 4), (conversions, 5)):
+            np.add.at(matrix, (entity_positions, day_positions), values[:, column])
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ctr = np.where(impressions > 0, clicks / impressions, np.nan)
+        cpc = np.where(clicks > 0, spend / clicks, np.nan)
+
+    return list(entity_index), names, {"spend": spend, "ctr": ctr, "cpc": cpc, "conversions": conversions}
+
+
+def robust_scores(matrix: "np.ndarray", baseline_days: int, min_scale: float) -> Tuple["np.ndarray", "np.ndarray"]:
+    """
+    Trailing median baseline and robust z-score of every cell.
+
+    Returns:
+        Tuple of (baseline, z-score) matrices of the same shape; the first baseline_days
+        columns (no full history yet) and cells without a value or baseline are NaN
+    """
+    entities, days = matrix.shape
+    baseline = np.full(matrix.shape, np.nan)
+    scores = np.full(matrix.shape, np.nan)
+    if days <= baseline_days or entities == 0:
+        return baseline, scores
+
+    # windows[:, d] holds days d .. d + baseline_days - 1, the history of day d + baseline_days
+    windows = np.lib.stride_tricks.sliding_window_view(matrix, baseline_days, axis=1)[:, :-1]
+    # np.median is several times faster; NaN only occurs in CTR and CPC
+    median_of = np.nanmedian if np.isnan(matrix).any() else np.median
+    with warnings.catch_warnings():
+        # All-NaN windows (no traffic at all) leave the baseline NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = median_of(windows, axis=2)
+        mad = median_of(np.abs(windows - median[:, :, None]), axis=2)
+
+    scale = np.maximum(mad * MAD_TO_SIGMA, np.maximum(np.abs(median) * RELATIVE_MIN_SCALE, min_scale))
+    baseline[:, baseline_days:] = median
+    with np.errstate(invalid='ignore'):
+        scores[:, baseline_days:] = (matrix[:, baseline_days:] - median) / scale
+    return baseline, scores
+
+
+def detect(rows: List[Dict[str, Any]], level: str, dates: List[str], baseline_days: int, threshold: float) -> Dict[str, Any]:
+    """
+    Score every metric of every entity and day, and collect the flagged cells.
+
+    Returns:
+        Dict with "entities", "days" (days scored) and "anomalies", a list of
+        {"date", "id", "name", "metric", "value", "baseline", "z"} sorted by |z|, largest first
+    """
+    entity_ids, names, matrices = build_matrices(rows, level, dates)
+    anomalies = []
+    for metric in METRICS:
+        baseline, scores = robust_scores(matrices[metric], baseline_days, MIN_SCALE[metric])
+        with np.errstate(invalid='ignore'):
+            flagged_entities, flagged_days = np.nonzero(np.abs(scores) >= threshold)
+        for entity, day in zip(flagged_entities.tolist(), flagged_days.tolist()):
+            anomalies.append({
+                "date": dates[day],
+                "id": entity_ids[entity],
+                "name": names[entity_ids[entity]],
+                "metric": metric,
+                "value": float(matrices[metric][entity, day]),
+                "baseline": float(baseline[entity, day]),
+                "z": float(scores[entity, day]),
+            })
+    anomalies.sort(key=lambda anomaly: -abs(anomaly["z"]))
+    return {"entities": len(entity_ids), "days": max(0, len(dates) - baseline_days), "anomalies": anomalies}
+
+
+def format_value(value: float, metric: str) -> str:
+    if metric == "ctr":
+        return f"{value:.2%}"
+    if metric in ("spend", "cpc"):
+        return f"{value:,.2f}"
+    return f"{value:,.1f}"
+
+
+def format_anomalies(result: Dict[str, Any], level: str, customer_id: str, threshold: float, top_n: int) -> str:
+    """Render detect() output as a summary line and a table of the strongest anomalies."""
+    anomalies = result["anomalies"]
+    lines = [
+        f"Anomalies for account {customer_id} by {level}: {len(anomalies)} flagged "
+        f"(|robust z| >= {threshold:g}) across {result['entities']} entities x {result['days']} days"
+    ]
+    if not anomalies:
+        lines.append("No anomalies found.")
+        return "\n".join(lines)
+
+    _, id_field, name_field = LEVELS[level]
+    table = [["date", id_field, name_field, "metric", "value", "baseline", "z"]]
+    for anomaly in anomalies[:top_n]:
+        table.append([
+            anomaly["date"], anomaly["id"], anomaly["name"], anomaly["metric"],
+            format_value(anomaly["value"], anomaly["metric"]),
+            format_value(anomaly["baseline"], anomaly["metric"]),
+            f"{anomaly['z']:+.1f}",
+        ])
+
+    widths = [max(len(row[column]) for row in table) for column in range(len(table[0]))]
+    lines.append("-" * 80)
+    for position, row in enumerate(table):
+        lines.append(" | ".join(f"{value:{widths[column]}}" for column, value in enumerate(row)))
+        if position == 0:
+            lines.append("-" * len(lines[-1]))
+    if len(anomalies) > top_n:
+        lines.append(f"... {len(anomalies) - top_n} more not shown")
+    return "\n".join(lines)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+JSON decoding and encoding benchmark for Google Ads responses
+
+Builds googleAds:search response bodies with the mock API's row generator
+(nested resources, segments.date rows, micros, ratios and long strings) and
+times, for each fast_json backend that is available:
+
+- decode: fast_json.loads() of the response body
+- json / json_compact: run_gaql's JSON output formats for the decoded response
+- table: run_gaql's table format, for comparison with work that is not JSON
+
+Usage:
+    python benchmarks/bench_json.py
+    python benchmarks/bench_json.py --sizes 1000 100000 --repeat 5
+    python benchmarks/bench_json.py --output json.json
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+import fast_json
+import gaql_format
+from mock_google_ads_server import MockDataset, ParsedQuery
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+CUSTOMER_ID = "1234567890"
+
+REPORT_QUERY = """
+    SELECT
+        campaign.id,
+        campaign.name,
+        campaign.status,
+        ad_group.id,
+        ad_group.name,
+        segments.date,
+        metrics.impressions,
+        metrics.clicks,
+        metrics.ctr,
+        metrics.cost_micros,
+        metrics.conversions,
+        metrics.average_cpc
+    FROM ad_group
+    WHERE segments.date DURING LAST_30_DAYS
+"""
+
+
+def response_body(size: int) -> str:
+    """A googleAds:search response body with `size` rows."""
+    query = ParsedQuery(REPORT_QUERY)
+    dataset = MockDataset(CUSTOMER_ID, query, size, "http://127.0.0.1")
+    return json.dumps({"results": dataset.rows(0, size), "fieldMask": query.field_mask})
+
+
+def best_time(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def available_backends() -> Dict[str, Any]:
+    backends = {"stdlib": None}
+    try:
+        import orjson
+        backends["orjson"] = orjson
+    except ImportError:
+        pass
+    return backends
+
+
+def run(sizes: List[int], repeat: int) -> List[Dict[str, Any]]:
+    results = []
+    for size in sizes:
+        body = response_body(size)
+        for name, module in available_backends().items():
+            fast_json._orjson = module
+            response = fast_json.loads(body)
+            timings = {
+                "decode": best_time(lambda: fast_json.loads(body), repeat),
+                "json": best_time(lambda: gaql_format.format_results(response, "json", CUSTOMER_ID), repeat),
+                "json_compact": best_time(lambda: gaql_format.format_results(response, "json_compact", CUSTOMER_ID), repeat),
+                "table": best_time(lambda: gaql_format.format_results(response, "table", CUSTOMER_ID), repeat),
+            }
+            results.append({
+                "backend": name,
+                "rows": size,
+                "body_mb": len(body) / 1e6,
+                **{f"{step}_ms": seconds * 1000 for step, seconds in timings.items()},
+                "decode_mb_per_sec": len(body) / 1e6 / timings["decode"],
+            })
+            print(f"  done: {name}/rows={size}", file=sys.stderr)
+    return results
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    header = (f"{'backend':<8} | {'rows':>8} | {'body MB':>8} | {'decode ms':>10} | {'MB/s':>7} | "
+              f"{'json ms':>9} | {'compact ms':>10} | {'table ms':>9}")
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(
+            f"{result['backend']:<8} | {result['rows']:>8} | {result['body_mb']:>8.1f} | {result['decode_ms']:>10.1f} | "
+            f"{result['decode_mb_per_sec']:>7.0f} | {result['json_ms']:>9.1f} | {result['json_compact_ms']:>10.1f} | "
+            f"{result['table_ms']:>9.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JSON decoding and output formats for Google Ads responses")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help=f"Rows per response (default: {DEFAULT_SIZES})")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the fastest is reported")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeat)
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Cold start benchmark for google_ads_server.py
+
+glm_client starts a fresh server process for every tool call, so the time it
+takes to import the server is paid on each invocation. This script measures
+that import time in fresh interpreters and fails when it regresses.
+
+Usage:
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --runs 20 --max-ms 400
+    python benchmarks/bench_startup.py --output startup.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Modules that must not be imported just to start the server
+LAZY_MODULES = [
+    "requests",
+    "google.auth.transport.requests",
+    "google.oauth2.credentials",
+    "google.oauth2.service_account",
+    "google_auth_oauthlib",
+    "gaql_format",
+    "account_hierarchy",
+    "period_comparison",
+    "anomaly_detection",
+    "pivot_table",
+    "local_sql",
+    "duckdb",
+    "report_jobs",
+    "prefetch",
+    "query_builder",
+    "numpy",
+    "fast_json",
+    "orjson",
+    "image_analysis",
+    "PIL",
+]
+
+PROBE = """
+import sys, time, json
+start = time.perf_counter()
+import google_ads_server
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    "import_ms": elapsed * 1000,
+    "eager_modules": [m for m in %r if m in sys.modules],
+}))
+""" % (LAZY_MODULES,)
+
+
+def measure_once() -> dict:
+    """Import the server in a fresh interpreter and return the probe result."""
+    env = os.environ.copy()
+    env["PYTHONDONTWRITEBYTECODE"] = "1"
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(runs: int) -> dict:
+    """Measure server import time over several fresh interpreters."""
+    # Warm the filesystem cache and bytecode so the first run isn't an outlier
+    measure_once()
+
+    samples = [measure_once() for _ in range(runs)]
+    timings = sorted(sample["import_ms"] for sample in samples)
+    eager_modules = sorted({module for sample in samples for module in sample["eager_modules"]})
+
+    return {
+        "runs": runs,
+        "median_ms": statistics.median(timings),
+        "min_ms": timings[0],
+        "max_ms": timings[-1],
+        "eager_modules": eager_modules,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure google_ads_server.py cold start time")
+    parser.add_argument("--runs", type=int, default=10, help="Number of fresh interpreters to measure")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if the median import time exceeds this")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.runs)
+
+    print(f"Server import time over {result['runs']} runs:")
+    print(f"  median: {result['median_ms']:.1f} ms")
+    print(f"  min:    {result['min_ms']:.1f} ms")
+    print(f"  max:    {result['max_ms']:.1f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+    failed = False
+    if result["eager_modules"]:
+        print(f"FAIL: modules imported at startup: {', '.join(result['eager_modules'])}")
+        failed = True
+    if args.max_ms is not None and result["median_ms"] > args.max_ms:
+        print(f"FAIL: median import time {result['median_ms']:.1f} ms exceeds {args.max_ms:.1f} ms")
+        failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
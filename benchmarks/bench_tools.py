@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Latency, throughput and memory benchmarks for the Google Ads MCP tools
+
+Runs the tool functions of google_ads_server.py against mock_google_ads_server.py
+(started as a separate process so it does not compete for the GIL) and reports,
+per scenario:
+
+- p50 / p95 / p99 latency of individual tool calls
+- rows/sec (rows returned by the API per second of wall time)
+- peak RSS of the process running the tool
+
+Each scenario runs in a fresh worker process, so peak RSS is attributable to
+that scenario alone. Scenarios vary the result size and the number of
+concurrent calls. Results are written as JSON and can be compared against a
+stored baseline; the script exits non-zero when a scenario regresses.
+
+Usage:
+    python benchmarks/bench_tools.py --quick
+    python benchmarks/bench_tools.py --sizes 10 1000 100000 1000000 --concurrency 1 8
+    python benchmarks/bench_tools.py --output results.json --save-baseline
+    python benchmarks/bench_tools.py --baseline benchmarks/baseline.json --tolerance 0.25
+
+Note: analyze_image_assets, get_asset_usage and list_accounts have fixed LIMITs
+(or no result size at all), so they are run once per concurrency level.
+
+The concurrent calls of a round send identical requests, which the server
+would coalesce into one API call (requests_in_flight). That is turned off so
+concurrency scenarios measure throughput and stay comparable with baselines;
+--coalesce keeps it on, and marks the scenarios "/coalesced".
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import asyncio
+import argparse
+import resource
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+DEFAULT_SIZES = [10, 1000, 10000, 100000]
+DEFAULT_CONCURRENCY = [1, 8]
+QUICK_SIZES = [10, 1000]
+QUICK_CONCURRENCY = [1, 4]
+
+# Upper bound on rows fetched per scenario, used to scale down iterations for big results
+MAX_ROWS_PER_SCENARIO = 2_000_000
+
+REPORT_QUERY = """
+    SELECT
+        campaign.id,
+        campaign.name,
+        campaign.status,
+        metrics.impressions,
+        metrics.clicks,
+        metrics.cost_micros,
+        metrics.conversions,
+        metrics.average_cpc
+    FROM campaign
+"""
+
+# Tools whose result size follows the account size
+SIZED_TOOLS = ["run_gaql[table]", "run_gaql[csv]", "run_gaql[json]", "run_gaql[json_compact]", "execute_gaql_query"]
+# Tools with fixed LIMITs, benchmarked against the largest account only
+FIXED_TOOLS = ["analyze_image_assets", "get_asset_usage", "list_accounts"]
+
+
+def customer_id_for_size(size: int) -> str:
+    """Mock account whose queries return `size` rows."""
+    return f"{size:010d}"
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+# Worker side: runs inside a fresh process for one scenario
+
+class NoCoalescing:
+    """Stand-in for shared_state.SingleFlight that sends every call, even identical concurrent ones."""
+
+    def do(self, key, function):
+        return function(), False
+
+
+def tool_call(server, tool: str, customer_id: str):
+    """Build a zero-argument coroutine factory for a tool invocation."""
+    if tool.startswith("run_gaql["):
+        output_format = tool[len("run_gaql["):-1]
+        return lambda: server.run_gaql(customer_id, REPORT_QUERY, output_format)
+    if tool == "execute_gaql_query":
+        return lambda: server.execute_gaql_query(customer_id, REPORT_QUERY)
+    if tool == "analyze_image_assets":
+        return lambda: server.analyze_image_assets(customer_id, 30)
+    if tool == "get_asset_usage":
+        return lambda: server.get_asset_usage(customer_id, None, "IMAGE")
+    if tool == "list_accounts":
+        return lambda: server.list_accounts()
+    raise ValueError(f"Unknown tool {tool}")
+
+
+async def run_scenario(scenario: Dict[str, Any]) -> Dict[str, Any]:
+    """Time concurrent calls of one tool and collect latency samples."""
+    import logging
+    import google_ads_server
+
+    logging.getLogger("google_ads_server").setLevel(logging.WARNING)
+    if not scenario.get("coalesce"):
+        google_ads_server.requests_in_flight = NoCoalescing()
+    call = tool_call(google_ads_server, scenario["tool"], customer_id_for_size(scenario["size"]))
+
+    async def timed() -> float:
+        start = time.perf_counter()
+        output = await call()
+        elapsed = time.perf_counter() - start
+        if output.startswith("Error"):
+            raise RuntimeError(output[:500])
+        return elapsed
+
+    # Warm up credentials, connections and imports
+    await timed()
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(scenario["iterations"]):
+        latencies.extend(await asyncio.gather(*(timed() for _ in range(scenario["concurrency"]))))
+    wall_time = time.perf_counter() - start
+
+    calls = len(latencies)
+    latencies.sort()
+    return {
+        **scenario,
+        "calls": calls,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000,
+        "calls_per_sec": calls / wall_time,
+        "rows_per_sec": calls * scenario["rows"] / wall_time,
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024),
+    }
+
+
+def worker_main(scenario_json: str) -> None:
+    sys.path.insert(0, str(REPO_ROOT))
+    result = asyncio.run(run_scenario(json.loads(scenario_json)))
+    print(json.dumps(result))
+
+
+# Orchestrator side
+
+def scenario_key(scenario: Dict[str, Any]) -> str:
+    key = f"{scenario['tool']}/rows={scenario['rows']}/concurrency={scenario['concurrency']}"
+    return key + "/coalesced" if scenario.get("coalesce") else key
+
+
+def build_scenarios(sizes: List[int], concurrency_levels: List[int], iterations: int, tools: Optional[List[str]],
+                    coalesce: bool = False) -> List[Dict[str, Any]]:
+    scenarios = []
+    for tool in SIZED_TOOLS + FIXED_TOOLS:
+        if tools and tool not in tools and tool.split("[")[0] not in tools:
+            continue
+        tool_sizes = sizes if tool in SIZED_TOOLS else [max(sizes)]
+        for size in tool_sizes:
+            # Rows the tool actually receives: fixed-limit tools cap their own results
+            rows = size if tool in SIZED_TOOLS else {"analyze_image_assets": min(size, 200), "get_asset_usage": min(size, 100) + 2 * min(size, 500)}.get(tool, 0)
+            for concurrency in concurrency_levels:
+                scaled = max(1, min(iterations, MAX_ROWS_PER_SCENARIO // max(1, size * concurrency)))
+                scenarios.append({
+                    "tool": tool,
+                    "size": size,
+                    "rows": rows,
+                    "concurrency": concurrency,
+                    "iterations": scaled,
+                    "coalesce": coalesce,
+                })
+    return scenarios
+
+
+def start_mock(sizes: List[int], latency_ms: float) -> subprocess.Popen:
+    """Start the mock API in its own process with one account per result size."""
+    port = free_port()
+    accounts = [f"{customer_id_for_size(size)}={size}" for size in sizes]
+    process = subprocess.Popen(
+        [
+            sys.executable, str(REPO_ROOT / "mock_google_ads_server.py"),
+            "--port", str(port),
+            "--page-size", str(max(sizes)),
+            "--latency-ms", str(latency_ms),
+            "--accounts", *accounts,
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        text=True,
+    )
+    # Wait for the listening banner
+    process.stdout.readline()
+    process.base_url = f"http://127.0.0.1:{port}"
+    return process
+
+
+def run_worker(scenario: Dict[str, Any], env: Dict[str, str]) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, __file__, "--worker", json.dumps(scenario)],
+        cwd=REPO_ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{scenario_key(scenario)} failed:\n{completed.stderr[-2000:]}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare_to_baseline(results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Return descriptions of scenarios that are slower or larger than the baseline allows."""
+    regressions = []
+    for result in results:
+        previous = baseline.get(scenario_key(result))
+        if not previous:
+            continue
+        for metric in ("p50_ms", "p95_ms", "peak_rss_mb"):
+            if result[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(
+                    f"{scenario_key(result)}: {metric} {result[metric]:.1f} vs baseline {previous[metric]:.1f}"
+                )
+        if result["rows_per_sec"] and result["rows_per_sec"] < previous["rows_per_sec"] / (1 + tolerance):
+            regressions.append(
+                f"{scenario_key(result)}: rows_per_sec {result['rows_per_sec']:.0f} vs baseline {previous['rows_per_sec']:.0f}"
+            )
+    return regressions
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    header = f"{'scenario':<58} | {'p50 ms':>9} | {'p95 ms':>9} | {'p99 ms':>9} | {'rows/sec':>11} | {'RSS MB':>7}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        print(
+            f"{scenario_key(result):<58} | {result['p50_ms']:>9.1f} | {result['p95_ms']:>9.1f} | "
+            f"{result['p99_ms']:>9.1f} | {result['rows_per_sec']:>11.0f} | {result['peak_rss_mb']:>7.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Google Ads MCP tools against the local mock API")
+    parser.add_argument("--sizes", type=int, nargs="+", help=f"Result sizes in rows (default: {DEFAULT_SIZES})")
+    parser.add_argument("--concurrency", type=int, nargs="+", help=f"Concurrent calls (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--iterations", type=int, default=20, help="Rounds of concurrent calls per scenario")
+    parser.add_argument("--tools", nargs="+", help="Only run these tools, e.g. run_gaql list_accounts")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated API latency")
+    parser.add_argument("--quick", action="store_true", help="Small sizes and few iterations, for a smoke run")
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown vs baseline (0.25 = 25%%)")
+    parser.add_argument("--coalesce", action="store_true",
+                        help="Let identical concurrent calls share one API call, as the server does")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker_main(args.worker)
+        return
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    concurrency_levels = args.concurrency or (QUICK_CONCURRENCY if args.quick else DEFAULT_CONCURRENCY)
+    iterations = 3 if args.quick else args.iterations
+    scenarios = build_scenarios(sizes, concurrency_levels, iterations, args.tools, args.coalesce)
+
+    mock = start_mock(sizes, args.latency_ms)
+    try:
+        sys.path.insert(0, str(REPO_ROOT))
+        from mock_google_ads_server import write_mock_credentials
+
+        with tempfile.TemporaryDirectory() as tmp:
+            credentials_path = os.path.join(tmp, "google_ads_token.json")
+            write_mock_credentials(credentials_path, mock.base_url)
+            env = os.environ.copy()
+            env.update({
+                "GOOGLE_ADS_API_BASE_URL": mock.base_url,
+                "GOOGLE_ADS_OAUTH_TOKEN_URI": f"{mock.base_url}/token",
+                "GOOGLE_ADS_CREDENTIALS_PATH": credentials_path,
+                "GOOGLE_ADS_DEVELOPER_TOKEN": "benchmark-developer-token",
+                "GOOGLE_ADS_AUTH_TYPE": "oauth",
+                "GOOGLE_ADS_LOGIN_CUSTOMER_ID": "",
+            })
+
+            results = []
+            for scenario in scenarios:
+                results.append(run_worker(scenario, env))
+                print(f"  done: {scenario_key(scenario)}", file=sys.stderr)
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    print_results(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+
+    regressions = []
+    baseline_path = Path(args.baseline)
+    if baseline_path.exists() and not args.save_baseline:
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        print(f"\nCompared against {baseline_path} (tolerance {args.tolerance:.0%})")
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if not regressions:
+            print("No regressions.")
+
+    if args.save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump({scenario_key(result): result for result in results}, f, indent=2)
+        print(f"\nBaseline saved to {baseline_path}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Record/replay of Google Ads REST API traffic.
+
+In record mode every request made through google_ads_server.api_request() is
+saved together with its response as a gzip-compressed JSON cassette. In replay
+mode the same requests are answered from those files without touching the
+network, so profiling and benchmark runs can use real payloads from our own
+accounts while staying offline and deterministic.
+
+Cassettes are keyed by the HTTP method, the API path and the JSON request body
+(with the GAQL query whitespace-normalized), so paginated requests with
+different page tokens get separate files. Credentials are never written: the
+Authorization and developer-token headers are replaced before saving.
+"""
+
+import os
+import re
+import gzip
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+CASSETTE_MODES = ("record", "replay")
+CASSETTE_SUFFIX = ".json.gz"
+
+# Request headers that carry credentials and must not reach disk
+SENSITIVE_HEADERS = {"authorization", "developer-token"}
+REDACTED = "REDACTED"
+
+
+def normalize_payload(payload: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Collapse whitespace in the GAQL query so formatting changes do not change the key."""
+    if not payload or "query" not in payload:
+        return payload
+    return {**payload, "query": re.sub(r"\s+", " ", payload["query"]).strip()}
+
+
+def cassette_key(method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> str:
+    """Stable identifier of a request, used as the cassette file name."""
+    request = json.dumps([method.upper(), path, normalize_payload(payload)], sort_keys=True)
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+
+def cassette_path(directory: str, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Path:
+    return Path(directory) / f"{cassette_key(method, path, payload)}{CASSETTE_SUFFIX}"
+
+
+def scrub_headers(headers: Dict[str, str]) -> Dict[str, str]:
+    """Copy request headers with credential values replaced."""
+    return {
+        name: REDACTED if name.lower() in SENSITIVE_HEADERS else value
+        for name, value in headers.items()
+    }
+
+
+def save_cassette(
+    directory: str,
+    method: str,
+    path: str,
+    headers: Dict[str, str],
+    payload: Optional[Dict[str, Any]],
+    status_code: int,
+    body: str
+) -> Path:
+    """
+    Write one request/response pair to a compressed cassette.
+
+    Error responses are recorded too, so replay reproduces them.
+
+    Returns:
+        Path of the cassette file
+    """
+    target = cassette_path(directory, method, path, payload)
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    cassette = {
+        "request": {
+            "method": method.upper(),
+            "path": path,
+            "headers": scrub_headers(headers),
+            "payload": normalize_payload(payload),
+        },
+        "response": {
+            "status_code": status_code,
+            "body": body,
+        },
+    }
+
+    # Write to a temporary name first so concurrent readers never see a partial file
+    partial = target.with_name(f".{target.name}.part")
+    with gzip.open(partial, "wt", encoding="utf-8") as f:
+        json.dump(cassette, f)
+    os.replace(partial, target)
+    return target
+
+
+def load_cassette(
+    directory: str,
+    method: str,
+    path: str,
+    payload: Optional[Dict[str, Any]] = None
+) -> Optional[Tuple[int, str]]:
+    """
+    Look up the recorded response for a request.
+
+    Returns:
+        Tuple of (status code, response body), or None if nothing was recorded
+    """
+    target = cassette_path(directory, method, path, payload)
+    try:
+        with gzip.open(target, "rt", encoding="utf-8") as f:
+            response = json.load(f)["response"]
+    except FileNotFoundError:
+        return None
+    return response["status_code"], response["body"]
@@ -0,0 +1,72 @@
+"""
+JSON encoding and decoding with an optional fast backend.
+
+Google Ads responses are large and deeply nested, and decoding them with the
+standard library is the biggest CPU cost of a big report. When orjson is
+installed it is used instead; otherwise the stdlib json module is. Both
+backends produce the same text for the JSON types the Google Ads API returns,
+so tool output does not depend on which one is installed.
+
+GOOGLE_ADS_JSON_BACKEND selects the backend: "auto" (default, orjson if
+importable), "orjson" or "stdlib".
+"""
+
+import os
+import json
+from typing import Any, Union
+
+JSON_BACKENDS = ("auto", "orjson", "stdlib")
+
+# Raised by loads() for invalid input; orjson.JSONDecodeError is a subclass
+JSONDecodeError = json.JSONDecodeError
+
+
+def _load_orjson():
+    choice = os.environ.get("GOOGLE_ADS_JSON_BACKEND", "auto").lower()
+    if choice == "stdlib":
+        return None
+    try:
+        import orjson
+    except ImportError:
+        if choice == "orjson":
+            raise
+        return None
+    return orjson
+
+
+_orjson = _load_orjson()
+
+
+def backend() -> str:
+    """Name of the backend in use: "orjson" or "stdlib"."""
+    return "orjson" if _orjson is not None else "stdlib"
+
+
+def loads(data: Union[str, bytes]) -> Any:
+    """Decode a JSON document from text or UTF-8 bytes."""
+    if _orjson is not None:
+        return _orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(value: Any, indent: bool = False) -> str:
+    """
+    Encode a value as JSON text.
+
+    Args:
+        value: The value to encode
+        indent: Indent nested values by two spaces; otherwise the output is compact,
+                with no whitespace between tokens
+
+    Returns:
+        The JSON text, with non-ASCII characters left unescaped
+    """
+    if _orjson is not None:
+        try:
+            return _orjson.dumps(value, option=_orjson.OPT_INDENT_2 if indent else 0).decode("utf-8")
+        except TypeError:
+            # Values orjson rejects (e.g. integers beyond 64 bits) fall back to the stdlib
+            pass
+    if indent:
+        return json.dumps(value, indent=2, ensure_ascii=False)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,132 @@
+"""
+Formatting of Google Ads search results for MCP tool output.
+
+Turns the 'results' rows of a googleAds:search response into the table, CSV or
+JSON text returned by run_gaql() and run_gaql_batch(), and the simple table of
+execute_gaql_query(). JSON goes through fast_json, so orjson is used when it is
+installed.
+
+render_response_body() decodes and formats in one step, taking and returning
+plain strings, so the server can run it in a process pool for large responses.
+"""
+
+from typing import Any, Dict, List, Tuple
+
+import fast_json
+import tracing
+
+OUTPUT_FORMATS = ("table", "json", "json_compact", "csv")
+
+
+def result_fields(first_result: Dict[str, Any]) -> List[str]:
+    """Get field names (resource.field) from the first result row."""
+    fields = []
+    for key, value in first_result.items():
+        if isinstance(value, dict):
+            for subkey in value:
+                fields.append(f"{key}.{subkey}")
+        else:
+            fields.append(key)
+    return fields
+
+
+def field_value(result: Dict[str, Any], field: str) -> str:
+    """Get the string value of a resource.field name from a result row."""
+    if "." in field:
+        parent, child = field.split(".")
+        return str(result.get(parent, {}).get(child, ""))
+    return str(result.get(field, ""))
+
+
+def format_csv(rows: List[Dict[str, Any]]) -> str:
+    """Render result rows as CSV, replacing embedded commas with semicolons."""
+    fields = result_fields(rows[0])
+
+    csv_lines = [",".join(fields)]
+    for result in rows:
+        csv_lines.append(",".join(field_value(result, field).replace(",", ";") for field in fields))
+
+    return "\n".join(csv_lines)
+
+
+def format_simple_table(rows: List[Dict[str, Any]], customer_id: str) -> str:
+    """Render result rows as " | "-separated lines without column padding."""
+    fields = result_fields(rows[0])
+
+    result_lines = [f"Query Results for Account {customer_id}:"]
+    result_lines.append("-" * 80)
+    result_lines.append(" | ".join(fields))
+    result_lines.append("-" * 80)
+
+    for result in rows:
+        result_lines.append(" | ".join(field_value(result, field) for field in fields))
+
+    return "\n".join(result_lines)
+
+
+def format_table(rows: List[Dict[str, Any]], customer_id: str) -> str:
+    """Render result rows as a fixed-width text table."""
+    result_lines = [f"Query Results for Account {customer_id}:"]
+    result_lines.append("-" * 100)
+
+    # Get field names and maximum widths
+    fields = result_fields(rows[0])
+    field_widths = {field: len(field) for field in fields}
+
+    # Calculate maximum field widths
+    for result in rows:
+        for field in fields:
+            field_widths[field] = max(field_widths[field], len(field_value(result, field)))
+
+    # Create formatted header
+    header = " | ".join(f"{field:{field_widths[field]}}" for field in fields)
+    result_lines.append(header)
+    result_lines.append("-" * len(header))
+
+    # Add data rows
+    for result in rows:
+        row_data = [f"{field_value(result, field):{field_widths[field]}}" for field in fields]
+        result_lines.append(" | ".join(row_data))
+
+    return "\n".join(result_lines)
+
+
+@tracing.traced("gaql_format.format_results")
+def format_results(response: Dict[str, Any], format: str, customer_id: str) -> str:
+    """
+    Format a googleAds:search response in the requested output format.
+
+    Args:
+        response: Parsed response with a non-empty 'results' list
+        format: Output format ("table", "json", "json_compact", "csv", or "simple");
+                unknown values fall back to table
+        customer_id: The formatted customer ID, shown in the table header
+
+    Returns:
+        The formatted results
+    """
+    format = format.lower()
+    if format == "json":
+        return fast_json.dumps(response, indent=True)
+    elif format == "json_compact":
+        return fast_json.dumps(response)
+    elif format == "csv":
+        return format_csv(response['results'])
+    elif format == "simple":
+        return format_simple_table(response['results'], customer_id)
+    else:  # default table format
+        return format_table(response['results'], customer_id)
+
+
+def render_response_body(body: str, format: str, customer_id: str) -> Tuple[int, str]:
+    """
+    Decode a raw googleAds:search response body and format it.
+
+    Returns:
+        Tuple of (number of result rows, formatted output); the output is empty when there are no rows
+    """
+    response = fast_json.loads(body)
+    rows = response.get('results') or []
+    if not rows:
+        return 0, ""
+    return len(rows), format_results(response, format, customer_id)
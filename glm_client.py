@@ -20,6 +20,21 @@ except ImportError:
     print("  pip install httpx")
     sys.exit(1)
 
+import tracing
+
+
+MCP_INITIALIZE_REQUEST = {
+    "jsonrpc": "2.0",
+    "id": 0,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "glm-client", "version": "1.0"},
+    },
+}
+MCP_INITIALIZED_NOTIFICATION = {"jsonrpc": "2.0", "method": "notifications/initialized"}
+
 
 class DirectGLMClient:
     """GLM client using direct HTTP API calls (bypassing zai-sdk)"""
@@ -53,7 +68,7 @@ class DirectGLMClient:
                 "type": "function",
                 "function": {
                     "name": "list_accounts",
-                    "description": "List all accessible Google Ads accounts",
+                    "description": "List all accessible Google Ads accounts with name, currency, time zone and manager flag",
                     "parameters": {"type": "object", "properties": {}, "required": []},
                 },
             },
@@ -61,7 +76,7 @@ class DirectGLMClient:
                 "type": "function",
                 "function": {
                     "name": "get_account_currency",
-                    "description": "Get the default currency code for a Google Ads account",
+                    "description": "Get the default currency code and time zone of a Google Ads account",
                     "parameters": {
                         "type": "object",
                         "properties": {
@@ -74,6 +89,29 @@ class DirectGLMClient:
                     },
                 },
             },
+            {
+                "type": "function",
+                "function": {
+                    "name": "get_account_hierarchy",
+                    "description": "Show the manager (MCC) account tree, or all accounts under one manager",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "manager_id": {
+                                "type": "string",
+                                "description": "Manager account ID to show the subtree of (10 digits, no dashes); omit for all",
+                                "default": "",
+                            },
+                            "refresh": {
+                                "type": "boolean",
+                                "description": "Re-query every manager instead of reusing recent results",
+                                "default": False,
+                            },
+                        },
+                        "required": [],
+                    },
+                },
+            },
             {
                 "type": "function",
                 "function": {
@@ -144,6 +182,223 @@ class DirectGLMClient:
                     },
                 },
             },
+            {
+                "type": "function",
+                "function": {
+                    "name": "run_gaql_batch",
+                    "description": (
+                        "Execute several related GAQL queries concurrently in one call. "
+                        "Prefer this over multiple run_gaql calls."
+                    ),
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "queries": {
+                                "type": "array",
+                                "description": "Queries to run",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "customer_id": {
+                                            "type": "string",
+                                            "description": "Google Ads customer ID (10 digits, no dashes)",
+                                        },
+                                        "query": {
+                                            "type": "string",
+                                            "description": "Valid GAQL query string",
+                                        },
+                                        "format": {
+                                            "type": "string",
+                                            "description": "Output format: 'table', 'json', or 'csv'",
+                                            "default": "table",
+                                        },
+                                    },
+                                    "required": ["customer_id", "query"],
+                                },
+                            },
+                            "max_concurrency": {
+                                "type": "integer",
+                                "description": "Maximum number of queries running at the same time",
+                                "default": 5,
+                            },
+                        },
+                        "required": ["queries"],
+                    },
+                },
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "compare_periods",
+                    "description": (
+                        "Compare metrics between the current and the previous period and return "
+                        "totals plus the entities that changed the most"
+                    ),
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "customer_id": {
+                                "type": "string",
+                                "description": "Google Ads customer ID (10 digits, no dashes)",
+                            },
+                            "level": {
+                                "type": "string",
+                                "description": "'campaign', 'ad_group' or 'keyword'",
+                                "default": "campaign",
+                            },
+                            "days": {
+                                "type": "integer",
+                                "description": "Days per period",
+                                "default": 7,
+                            },
+                            "metric": {
+                                "type": "string",
+                                "description": "Metric to rank changes by: 'impressions', 'clicks', 'cost', 'conversions' or 'conversions_value'",
+                                "default": "cost",
+                            },
+                            "top_n": {
+                                "type": "integer",
+                                "description": "Number of top movers to return",
+                                "default": 10,
+                            },
+                        },
+                        "required": ["customer_id"],
+                    },
+                },
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "detect_anomalies",
+                    "description": (
+                        "Flag days where a campaign's or ad group's spend, CTR, CPC or conversions "
+                        "broke from its recent baseline"
+                    ),
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "customer_id": {
+                                "type": "string",
+                                "description": "Google Ads customer ID (10 digits, no dashes)",
+                            },
+                            "level": {
+                                "type": "string",
+                                "description": "'campaign' or 'ad_group'",
+                                "default": "campaign",
+                            },
+                            "days": {
+                                "type": "integer",
+                                "description": "Number of recent days to check",
+                                "default": 14,
+                            },
+                            "threshold": {
+                                "type": "number",
+                                "description": "Robust z-score at or above which a value is flagged",
+                                "default": 3.5,
+                            },
+                        },
+                        "required": ["customer_id"],
+                    },
+                },
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "pivot_report",
+                    "description": (
+                        "Pivot metrics by campaign, ad_group, date, week, month, day_of_week, device or "
+                        "network with subtotals; follow-up pivots of the same window use cached data"
+                    ),
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "customer_id": {
+                                "type": "string",
+                                "description": "Google Ads customer ID (10 digits, no dashes)",
+                            },
+                            "rows": {
+                                "type": "string",
+                                "description": "Comma-separated row dimensions, outermost first",
+                                "default": "campaign",
+                            },
+                            "columns": {
+                                "type": "string",
+                                "description": "Optional dimension whose values become columns",
+                                "default": "",
+                            },
+                            "metrics": {
+                                "type": "string",
+                                "description": "Comma-separated metrics: impressions, clicks, cost, conversions, conversions_value, ctr, cpc, cpa, roas",
+                                "default": "cost,clicks",
+                            },
+                            "days": {
+                                "type": "integer",
+                                "description": "Days in the report",
+                                "default": 30,
+                            },
+                            "filters": {
+                                "type": "string",
+                                "description": "Comma-separated dimension=value filters, e.g. 'device=MOBILE'",
+                                "default": "",
+                            },
+                        },
+                        "required": ["customer_id"],
+                    },
+                },
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "load_sql_table",
+                    "description": (
+                        "Load the rows of a GAQL query, or a named table (campaigns, ad_groups, assets, "
+                        "campaign_assets, ad_group_assets, campaign_metrics, ad_group_metrics), into a local SQL table"
+                    ),
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "customer_id": {
+                                "type": "string",
+                                "description": "Google Ads customer ID (10 digits, no dashes)",
+                            },
+                            "table_name": {
+                                "type": "string",
+                                "description": "Table to create or replace",
+                            },
+                            "query": {
+                                "type": "string",
+                                "description": "GAQL query; leave empty for a named table",
+                                "default": "",
+                            },
+                        },
+                        "required": ["customer_id", "table_name"],
+                    },
+                },
+            },
+            {
+                "type": "function",
+                "function": {
+                    "name": "run_sql",
+                    "description": "Run a SQL SELECT with joins and aggregations over the tables loaded with load_sql_table",
+                    "parameters": {
+                        "type": "object",
+                        "properties": {
+                            "sql": {
+                                "type": "string",
+                                "description": "SELECT statement; columns are snake_case field paths such as campaign_id or metrics_cost_micros",
+                            },
+                            "max_rows": {
+                                "type": "integer",
+                                "description": "Maximum number of rows to return",
+                                "default": 200,
+                            },
+                        },
+                        "required": ["sql"],
+                    },
+                },
+            },
+            # start_report and the other background job tools are left out: call_mcp_server starts a
+            # server per call, and a job's thread ends with that process
             {
                 "type": "function",
                 "function": {
@@ -207,6 +462,7 @@ class DirectGLMClient:
             },
         ]
 
+    @tracing.traced("glm.chat")
     async def chat(
         self, user_message: str, conversation_history: Optional[List[Dict]] = None
     ) -> str:
@@ -247,11 +503,12 @@ class DirectGLMClient:
                     "max_tokens": 2000,
                 }
 
-                response = await client.post(
-                    f"{self.base_url}/chat/completions",
-                    headers=self.headers,
-                    json=payload,
-                )
+                with tracing.span("zai.chat_completions", model=self.model):
+                    response = await client.post(
+                        f"{self.base_url}/chat/completions",
+                        headers=self.headers,
+                        json=payload,
+                    )
 
                 if response.status_code != 200:
                     return f"Error from Z.ai API: HTTP {response.status_code}"
@@ -287,16 +544,17 @@ class DirectGLMClient:
                             )
 
                         # Get final response
-                        final_response = await client.post(
-                            f"{self.base_url}/chat/completions",
-                            headers=self.headers,
-                            json={
-                                "model": self.model,
-                                "messages": messages,
-                                "temperature": 0.7,
-                                "max_tokens": 2000,
-                            },
-                        )
+                        with tracing.span("zai.chat_completions", model=self.model):
+                            final_response = await client.post(
+                                f"{self.base_url}/chat/completions",
+                                headers=self.headers,
+                                json={
+                                    "model": self.model,
+                                    "messages": messages,
+                                    "temperature": 0.7,
+                                    "max_tokens": 2000,
+                                },
+                            )
 
                         if final_response.status_code == 200:
                             final_result = final_response.json()
@@ -346,43 +604,56 @@ class DirectGLMClient:
         }
 
         try:
-            # Set environment variables for Google Ads credentials
-            env = os.environ.copy()
-
-            # Run MCP server as subprocess and communicate via stdio
-            process = await asyncio.create_subprocess_exec(
-                sys.executable,
-                [server_path],
-                stdin=asyncio.subprocess.PIPE,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                env=env,
-            )
-
-            # Send request
-            request_json = json.dumps(request) + "\n"
-            process.stdin.write(request_json.encode())
-            await process.stdin.drain()
-            process.stdin.close()
-
-            # Read response
-            response_data = await process.stdout.read()
-
-            # Wait for process to finish
-            await process.wait()
-
-            if not response_data:
-                return "No response from MCP server"
-
-            # Parse response
-            response = json.loads(response_data.decode())
+            with tracing.span("mcp.tools/call", **{"mcp.tool": tool_name}):
+                # Set environment variables for Google Ads credentials
+                env = os.environ.copy()
+
+                # Propagate the trace context so server spans join this trace
+                traceparent = tracing.current_traceparent()
+                if traceparent:
+                    env[tracing.TRACEPARENT_ENV] = traceparent
+                    request["params"]["_meta"] = {"traceparent": traceparent}
+
+                # Run MCP server as subprocess and communicate via stdio
+                process = await asyncio.create_subprocess_exec(
+                    sys.executable,
+                    server_path,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                    env=env,
+                )
 
-            if "result" in response:
-                return response["result"]["content"][0]["text"]
-            elif "error" in response:
-                return f"MCP Server Error: {response['error']}"
-            else:
-                return "Unknown error from MCP server"
+                # The server only accepts tools/call after the initialize handshake
+                for message in (MCP_INITIALIZE_REQUEST, MCP_INITIALIZED_NOTIFICATION, request):
+                    process.stdin.write((json.dumps(message) + "\n").encode())
+                await process.stdin.drain()
+
+                # Read until the tools/call response; closing stdin earlier stops the server
+                response = None
+                while True:
+                    line = await process.stdout.readline()
+                    if not line:
+                        break
+                    message = json.loads(line.decode())
+                    if message.get("id") == request["id"]:
+                        response = message
+                        break
+
+                process.stdin.close()
+
+                # Wait for process to finish
+                await process.wait()
+
+                if response is None:
+                    return "No response from MCP server"
+
+                if "result" in response:
+                    return response["result"]["content"][0]["text"]
+                elif "error" in response:
+                    return f"MCP Server Error: {response['error']}"
+                else:
+                    return "Unknown error from MCP server"
 
         except Exception as e:
             return f"Error calling MCP server: {str(e)}"
@@ -1,21 +1,29 @@
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from pydantic import Field
 import os
+import sys
 import json
-import requests
+import asyncio
+import hashlib
+import threading
+import contextvars
+import time
 from datetime import datetime, timedelta
 from pathlib import Path
-
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.oauth2.credentials import Credentials
-from google.oauth2 import service_account
-from google.auth.transport.requests import Request
-from google.auth.exceptions import RefreshError
 import logging
 
+# google-auth, requests, the OAuth flow, the formatters and the image tooling are
+# imported on first use: the server is started per tool call by glm_client, so
+# everything loaded here is paid on every invocation.
+
 # MCP
 from mcp.server.fastmcp import FastMCP
 
+import metrics
+import tracing
+import profiling
+import shared_state
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('google_ads_server')
@@ -30,6 +38,35 @@ mcp = FastMCP(
     ]
 )
 
+def request_meta(key: str) -> Any:
+    """Value of a _meta field of the current tools/call request, or None outside a request."""
+    try:
+        meta = mcp.get_context().request_context.meta
+    except (LookupError, ValueError):
+        return None
+    return getattr(meta, key, None)
+
+def request_traceparent() -> Optional[str]:
+    """
+    W3C traceparent of the caller of the current tool call.
+
+    Taken from the tools/call request's _meta, falling back to the TRACEPARENT
+    environment variable that glm_client sets for the server subprocess.
+    """
+    return request_meta('traceparent') or os.environ.get(tracing.TRACEPARENT_ENV)
+
+def request_profile() -> Optional[bool]:
+    """Per-call profiling request from the tools/call _meta ("profile": true/false), if any."""
+    return request_meta('profile')
+
+def tool():
+    """Register an MCP tool, with call metrics (metrics.py), a trace span (tracing.py) and opt-in profiling (profiling.py)."""
+    def decorator(func):
+        func = profiling.instrument_tool(func, request_profile)
+        func = tracing.instrument_tool(func, request_traceparent)
+        return mcp.tool()(metrics.instrument_tool(func))
+    return decorator
+
 # Constants and configuration
 SCOPES = ['https://www.googleapis.com/auth/adwords']
 API_VERSION = "v19"  # Google Ads API version
@@ -48,6 +85,44 @@ GOOGLE_ADS_CREDENTIALS_PATH = os.environ.get("GOOGLE_ADS_CREDENTIALS_PATH")
 GOOGLE_ADS_DEVELOPER_TOKEN = os.environ.get("GOOGLE_ADS_DEVELOPER_TOKEN")
 GOOGLE_ADS_LOGIN_CUSTOMER_ID = os.environ.get("GOOGLE_ADS_LOGIN_CUSTOMER_ID", "")
 GOOGLE_ADS_AUTH_TYPE = os.environ.get("GOOGLE_ADS_AUTH_TYPE", "oauth")  # oauth or service_account
+# Base URL of the Google Ads REST API; point it at mock_google_ads_server.py for offline runs
+GOOGLE_ADS_API_BASE_URL = os.environ.get("GOOGLE_ADS_API_BASE_URL", "https://googleads.googleapis.com")
+# Optional override of the OAuth token endpoint used to refresh saved user credentials
+GOOGLE_ADS_OAUTH_TOKEN_URI = os.environ.get("GOOGLE_ADS_OAUTH_TOKEN_URI", "")
+# Record API responses to cassettes ("record") or serve them from cassettes ("replay"); see cassettes.py
+GOOGLE_ADS_CASSETTE_MODE = os.environ.get("GOOGLE_ADS_CASSETTE_MODE", "").lower()
+GOOGLE_ADS_CASSETTE_DIR = os.environ.get("GOOGLE_ADS_CASSETTE_DIR", "./cassettes")
+# Seconds to reuse identical API responses (0 disables; HTTP transports default to SHARED_RESULT_CACHE_TTL)
+GOOGLE_ADS_RESULT_CACHE_TTL = float(os.environ.get("GOOGLE_ADS_RESULT_CACHE_TTL", "0"))
+GOOGLE_ADS_RESULT_CACHE_SIZE = int(os.environ.get("GOOGLE_ADS_RESULT_CACHE_SIZE", "256"))
+# Maximum Google Ads API requests per second for the whole process (0 = unlimited)
+GOOGLE_ADS_MAX_QPS = float(os.environ.get("GOOGLE_ADS_MAX_QPS", "0"))
+# Maximum Google Ads API requests per UTC day (0 = unlimited)
+GOOGLE_ADS_DAILY_REQUEST_LIMIT = int(os.environ.get("GOOGLE_ADS_DAILY_REQUEST_LIMIT", "0"))
+# Seconds to keep account metadata (name, currency, time zone, manager flag)
+GOOGLE_ADS_ACCOUNT_CACHE_TTL = float(os.environ.get("GOOGLE_ADS_ACCOUNT_CACHE_TTL", str(24 * 3600)))
+# Seconds before a manager's client list is queried again when the hierarchy is refreshed
+GOOGLE_ADS_HIERARCHY_TTL = float(os.environ.get("GOOGLE_ADS_HIERARCHY_TTL", "3600"))
+# Seconds pivot_report keeps a fetched report table for re-slicing
+GOOGLE_ADS_PIVOT_CACHE_TTL = float(os.environ.get("GOOGLE_ADS_PIVOT_CACHE_TTL", "1800"))
+# Seconds canned reports reuse entity attributes (names, image sizes, ...) fetched apart from their metrics
+GOOGLE_ADS_ATTRIBUTE_CACHE_TTL = float(os.environ.get("GOOGLE_ADS_ATTRIBUTE_CACHE_TTL", "3600"))
+# Directory of background report job spools (see report_jobs.py) and accounts each job pulls at once
+GOOGLE_ADS_JOB_DIR = os.environ.get("GOOGLE_ADS_JOB_DIR", "./report_jobs")
+GOOGLE_ADS_JOB_WORKERS = int(os.environ.get("GOOGLE_ADS_JOB_WORKERS", "4"))
+# JSON file of reports to prefetch into the result cache at startup and on a schedule (see prefetch.py)
+GOOGLE_ADS_PREFETCH_CONFIG = os.environ.get("GOOGLE_ADS_PREFETCH_CONFIG", "")
+# SQLite file holding the result, account and rate limiter state shared by processes (empty = in memory)
+GOOGLE_ADS_SHARED_STATE_DB = os.environ.get("GOOGLE_ADS_SHARED_STATE_DB", "")
+# Database file of load_sql_table/run_sql tables (":memory:" = per process; see sql_database_path)
+GOOGLE_ADS_SQL_DB = os.environ.get("GOOGLE_ADS_SQL_DB", "")
+# Search responses at least this large are decoded and formatted in a process pool
+GOOGLE_ADS_CPU_OFFLOAD_MIN_BYTES = int(os.environ.get("GOOGLE_ADS_CPU_OFFLOAD_MIN_BYTES", str(1024 * 1024)))
+# Size of that process pool (0 = min(4, CPU count))
+GOOGLE_ADS_CPU_WORKERS = int(os.environ.get("GOOGLE_ADS_CPU_WORKERS", "0"))
+# Serve Prometheus metrics on this port (disabled if empty); SIGUSR1 dumps them to this file or stderr
+GOOGLE_ADS_METRICS_PORT = os.environ.get("GOOGLE_ADS_METRICS_PORT", "")
+GOOGLE_ADS_METRICS_FILE = os.environ.get("GOOGLE_ADS_METRICS_FILE", "")
 
 def format_customer_id(customer_id: str) -> str:
     """Format customer ID to ensure it's 10 digits without dashes."""
@@ -63,6 +138,11 @@ def format_customer_id(customer_id: str) -> str:
     # Ensure it's 10 digits with leading zeros if needed
     return customer_id.zfill(10)
 
+# Loaded credentials by (auth type, credentials path, token URI); guarded by _credentials_lock
+_credentials_cache = {}
+_credentials_lock = threading.RLock()
+
+@tracing.traced("google_ads.get_credentials")
 def get_credentials():
     """
     Get and refresh OAuth credentials or service account credentials based on the auth type.
@@ -72,24 +152,42 @@ def get_credentials():
     2. Service Account (Server-to-Server Authentication) - For automated systems
 
     Returns:
-        Valid credentials object to use with Google Ads API
+        Valid credentials object to use with Google Ads API, or None when
+        replaying cassettes (no credentials are needed offline)
     """
+    if GOOGLE_ADS_CASSETTE_MODE == "replay":
+        return None
+
     if not GOOGLE_ADS_CREDENTIALS_PATH:
         raise ValueError("GOOGLE_ADS_CREDENTIALS_PATH environment variable not set")
     
     auth_type = GOOGLE_ADS_AUTH_TYPE.lower()
-    logger.info(f"Using authentication type: {auth_type}")
-    
-    # Service Account authentication
-    if auth_type == "service_account":
-        try:
-            return get_service_account_credentials()
-        except Exception as e:
-            logger.error(f"Error with service account authentication: {str(e)}")
-            raise
+
+    # Reuse loaded credentials while their token is valid, so concurrent tool calls
+    # neither re-read the token file nor refresh the same token twice
+    cache_key = (auth_type, GOOGLE_ADS_CREDENTIALS_PATH, GOOGLE_ADS_OAUTH_TOKEN_URI)
+    with _credentials_lock:
+        cached = _credentials_cache.get(cache_key)
+        if cached is not None and cached.valid:
+            metrics.CACHE_REQUESTS.inc(cache="credentials", result="hit")
+            return cached
+        metrics.CACHE_REQUESTS.inc(cache="credentials", result="miss")
+
+        logger.info(f"Using authentication type: {auth_type}")
     
-    # OAuth 2.0 authentication (default)
-    return get_oauth_credentials()
+        # Service Account authentication
+        if auth_type == "service_account":
+            try:
+                creds = get_service_account_credentials()
+            except Exception as e:
+                logger.error(f"Error with service account authentication: {str(e)}")
+                raise
+        else:
+            # OAuth 2.0 authentication (default)
+            creds = get_oauth_credentials()
+
+        _credentials_cache[cache_key] = creds
+        return creds
 
 def get_service_account_credentials():
     """Get credentials using a service account key file."""
@@ -98,6 +196,8 @@ def get_service_account_credentials():
     if not os.path.exists(GOOGLE_ADS_CREDENTIALS_PATH):
         raise FileNotFoundError(f"Service account key file not found at {GOOGLE_ADS_CREDENTIALS_PATH}")
     
+    from google.oauth2 import service_account
+
     try:
         credentials = service_account.Credentials.from_service_account_file(
             GOOGLE_ADS_CREDENTIALS_PATH, 
@@ -118,6 +218,10 @@ def get_service_account_credentials():
 
 def get_oauth_credentials():
     """Get and refresh OAuth user credentials."""
+    from google.oauth2.credentials import Credentials
+    from google.auth.transport.requests import Request
+    from google.auth.exceptions import RefreshError
+
     creds = None
     client_config = None
     
@@ -141,6 +245,11 @@ def get_oauth_credentials():
                 else:
                     logger.info("Found existing OAuth token")
                     creds = Credentials.from_authorized_user_info(creds_data, SCOPES)
+                    if GOOGLE_ADS_OAUTH_TOKEN_URI:
+                        # The copy made by with_token_uri() drops the expiry, so carry it over
+                        expiry = creds.expiry
+                        creds = creds.with_token_uri(GOOGLE_ADS_OAUTH_TOKEN_URI)
+                        creds.expiry = expiry
         except json.JSONDecodeError:
             logger.warning(f"Invalid JSON in token file: {token_path}")
             creds = None
@@ -154,8 +263,10 @@ def get_oauth_credentials():
             try:
                 logger.info("Refreshing expired token")
                 creds.refresh(Request())
+                metrics.TOKEN_REFRESHES.inc(result="success")
                 logger.info("Token successfully refreshed")
             except RefreshError as e:
+                metrics.TOKEN_REFRESHES.inc(result="failure")
                 logger.warning(f"Error refreshing token: {str(e)}, will try to get new token")
                 creds = None
             except Exception as e:
@@ -185,6 +296,7 @@ def get_oauth_credentials():
             
             # Run the OAuth flow
             logger.info("Starting OAuth authentication flow")
+            from google_auth_oauthlib.flow import InstalledAppFlow
             flow = InstalledAppFlow.from_client_config(client_config, SCOPES)
             creds = flow.run_local_server(port=0)
             logger.info("OAuth flow completed successfully")
@@ -194,42 +306,61 @@ def get_oauth_credentials():
             logger.info(f"Saving credentials to {token_path}")
             # Ensure directory exists
             os.makedirs(os.path.dirname(token_path), exist_ok=True)
-            with open(token_path, 'w') as f:
+            # Write then rename, so other server processes never read a partial token file
+            partial_path = f"{token_path}.{os.getpid()}.part"
+            with open(partial_path, 'w') as f:
                 f.write(creds.to_json())
+            os.replace(partial_path, token_path)
         except Exception as e:
             logger.warning(f"Could not save credentials: {str(e)}")
     
     return creds
 
+@tracing.traced("google_ads.get_headers")
 def get_headers(creds):
     """Get headers for Google Ads API requests."""
+    if GOOGLE_ADS_CASSETTE_MODE == "replay":
+        return {'content-type': 'application/json'}
+
     if not GOOGLE_ADS_DEVELOPER_TOKEN:
         raise ValueError("GOOGLE_ADS_DEVELOPER_TOKEN environment variable not set")
     
-    # Handle different credential types
-    if isinstance(creds, service_account.Credentials):
-        # For service account, we need to get a new bearer token
-        auth_req = Request()
-        creds.refresh(auth_req)
-        token = creds.token
+    from google.auth.transport.requests import Request
+    from google.auth.exceptions import RefreshError
+
+    # Handle different credential types. Service account credentials can only exist
+    # if their module was imported, so avoid importing it just for this check.
+    service_account = sys.modules.get('google.oauth2.service_account')
+    if service_account and isinstance(creds, service_account.Credentials):
+        # Service accounts get a bearer token on first use and again once it expires;
+        # the lock keeps concurrent calls from refreshing the shared credentials twice
+        with _credentials_lock:
+            if not creds.valid:
+                auth_req = Request()
+                creds.refresh(auth_req)
+                metrics.TOKEN_REFRESHES.inc(result="success")
+            token = creds.token
     else:
         # For OAuth credentials, check if token needs refresh
-        if not creds.valid:
-            if creds.expired and creds.refresh_token:
-                try:
-                    logger.info("Refreshing expired OAuth token in get_headers")
-                    creds.refresh(Request())
-                    logger.info("Token successfully refreshed in get_headers")
-                except RefreshError as e:
-                    logger.error(f"Error refreshing token in get_headers: {str(e)}")
-                    raise ValueError(f"Failed to refresh OAuth token: {str(e)}")
-                except Exception as e:
-                    logger.error(f"Unexpected error refreshing token in get_headers: {str(e)}")
-                    raise
-            else:
-                raise ValueError("OAuth credentials are invalid and cannot be refreshed")
-        
-        token = creds.token
+        with _credentials_lock:
+            if not creds.valid:
+                if creds.expired and creds.refresh_token:
+                    try:
+                        logger.info("Refreshing expired OAuth token in get_headers")
+                        creds.refresh(Request())
+                        metrics.TOKEN_REFRESHES.inc(result="success")
+                        logger.info("Token successfully refreshed in get_headers")
+                    except RefreshError as e:
+                        metrics.TOKEN_REFRESHES.inc(result="failure")
+                        logger.error(f"Error refreshing token in get_headers: {str(e)}")
+                        raise ValueError(f"Failed to refresh OAuth token: {str(e)}")
+                    except Exception as e:
+                        logger.error(f"Unexpected error refreshing token in get_headers: {str(e)}")
+                        raise
+                else:
+                    raise ValueError("OAuth credentials are invalid and cannot be refreshed")
+
+            token = creds.token
         
     headers = {
         'Authorization': f'Bearer {token}',
@@ -239,16 +370,583 @@ def get_headers(creds):
     
     if GOOGLE_ADS_LOGIN_CUSTOMER_ID:
         headers['login-customer-id'] = format_customer_id(GOOGLE_ADS_LOGIN_CUSTOMER_ID)
-    
+
     return headers
 
-@mcp.tool()
+HTTP_POOL_SIZE = 32
+SHARED_RESULT_CACHE_TTL = 300
+
+# Set when serving sse or streamable-http, where the process outlives a tool call; a stdio
+# server may be started for a single call, as glm_client.py does
+long_running_server = False
+
+# Attributes of single entities for query_builder.Projection reports
+ATTRIBUTE_CACHE_SIZE = 20000
+
+# Shared by every tool call in the process, or by all workers when backed by SQLite (see shared_state.py)
+if GOOGLE_ADS_SHARED_STATE_DB:
+    result_cache = shared_state.SqliteResultCache(GOOGLE_ADS_SHARED_STATE_DB, GOOGLE_ADS_RESULT_CACHE_SIZE)
+    account_cache = shared_state.SqliteAccountCache(GOOGLE_ADS_SHARED_STATE_DB)
+    rate_limiter = shared_state.SqliteRateLimiter(
+        GOOGLE_ADS_SHARED_STATE_DB, GOOGLE_ADS_MAX_QPS, daily_limit=GOOGLE_ADS_DAILY_REQUEST_LIMIT
+    )
+    entity_attributes = shared_state.SqliteAttributeCache(GOOGLE_ADS_SHARED_STATE_DB, ATTRIBUTE_CACHE_SIZE)
+else:
+    result_cache = shared_state.ResultCache(GOOGLE_ADS_RESULT_CACHE_SIZE)
+    account_cache = shared_state.AccountCache()
+    rate_limiter = shared_state.RateLimiter(GOOGLE_ADS_MAX_QPS, daily_limit=GOOGLE_ADS_DAILY_REQUEST_LIMIT)
+    entity_attributes = shared_state.ResultCache(ATTRIBUTE_CACHE_SIZE)
+
+# API requests being sent right now, by request key (see shared_state.SingleFlight); per process
+requests_in_flight = shared_state.SingleFlight()
+
+# pivot_table.Table objects by report window; always in memory, as tables are not serializable
+PIVOT_CACHE_SIZE = 16
+pivot_tables = shared_state.ResultCache(PIVOT_CACHE_SIZE)
+
+# prefetch.PrefetchBudget charged for the API requests of the running prefetch job, if any
+prefetch_budget: contextvars.ContextVar = contextvars.ContextVar("prefetch_budget", default=None)
+
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def http_session():
+    """
+    Get the shared requests session used for all HTTP calls.
+
+    Reusing one session keeps connections to the Google Ads API alive between
+    calls. The session (and the requests library) is created on first use.
+    """
+    global _http_session
+    if _http_session is None:
+        with _http_session_lock:
+            if _http_session is None:
+                import requests
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _http_session = session
+    return _http_session
+
+class GoogleAdsApiError(Exception):
+    """Raised when the Google Ads API returns a non-200 response."""
+
+    def __init__(self, status_code: int, text: str):
+        super().__init__(f"HTTP {status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
+
+class ImageDownloadError(OSError):
+    """Raised when an image URL (the image CDN, not the Google Ads API) does not return HTTP 200."""
+
+    def __init__(self, status_code: int, url: str):
+        super().__init__(f"HTTP {status_code} downloading {url}")
+        self.status_code = status_code
+        self.url = url
+
+def endpoint_labels(path: str) -> Tuple[str, str]:
+    """Split an API path into (endpoint, customer ID) for metrics, e.g. ("googleAds:search", "123")."""
+    segments = path.split('/')
+    customer_id = segments[1] if len(segments) > 2 and segments[0] == 'customers' else ''
+    return segments[-1], customer_id
+
+_hierarchy_index = None
+_hierarchy_index_lock = threading.Lock()
+
+def hierarchy_index():
+    """Get the process-wide account_hierarchy.HierarchyIndex, created on first use."""
+    global _hierarchy_index
+    if _hierarchy_index is None:
+        with _hierarchy_index_lock:
+            if _hierarchy_index is None:
+                import account_hierarchy
+                _hierarchy_index = account_hierarchy.HierarchyIndex()
+    return _hierarchy_index
+
+_local_database = None
+_local_database_lock = threading.Lock()
+
+def sql_database_path(engine: str) -> str:
+    """
+    Database of the local SQL tables: GOOGLE_ADS_SQL_DB if set, else a file next to
+    GOOGLE_ADS_SHARED_STATE_DB, else memory for a long-running server and
+    ./google_ads_sql.<engine> for a stdio server, whose process may end after one call.
+    """
+    if GOOGLE_ADS_SQL_DB:
+        return GOOGLE_ADS_SQL_DB
+    if GOOGLE_ADS_SHARED_STATE_DB:
+        return f"{os.path.splitext(GOOGLE_ADS_SHARED_STATE_DB)[0]}_sql.{engine}"
+    if long_running_server:
+        return ":memory:"
+    return os.path.abspath(f"google_ads_sql.{engine}")
+
+def local_database():
+    """Get the process-wide local_sql.LocalDatabase, created on first use."""
+    global _local_database
+    if _local_database is None:
+        with _local_database_lock:
+            if _local_database is None:
+                import local_sql
+                engine = local_sql.select_engine()
+                _local_database = local_sql.LocalDatabase(engine, sql_database_path(engine))
+    return _local_database
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+def job_manager():
+    """Get the process-wide report_jobs.JobManager, created on first use."""
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                import report_jobs
+                _job_manager = report_jobs.JobManager(GOOGLE_ADS_JOB_DIR, GOOGLE_ADS_JOB_WORKERS)
+    return _job_manager
+
+def routed_headers(customer_id: str, headers: Dict[str, str]) -> Dict[str, str]:
+    """
+    Use the login-customer-id recorded for an account, if it has one.
+
+    The hierarchy index of this process is consulted first, then the account
+    cache, which keeps what earlier crawls found (across processes when it is
+    backed by GOOGLE_ADS_SHARED_STATE_DB).
+    """
+    if not customer_id:
+        return headers
+    login_customer_id = _hierarchy_index.login_customer_id(customer_id) if _hierarchy_index is not None else None
+    if login_customer_id is None:
+        login_customer_id = account_cache.login_customer_id(customer_id)
+    if login_customer_id is None or headers.get('login-customer-id') == login_customer_id:
+        return headers
+    return {**headers, 'login-customer-id': login_customer_id}
+
+# Set while a crawl looks for a login-customer-id, so the crawl's own requests do not start another
+discovering_routes: contextvars.ContextVar = contextvars.ContextVar("discovering_routes", default=False)
+# customer ID -> time.monotonic() of a crawl that did not find the account
+_undiscoverable: Dict[str, float] = {}
+
+def discover_login_customer_id(customer_id: str, headers: Dict[str, str]) -> Optional[str]:
+    """
+    Crawl the account hierarchy for the login-customer-id of an account the API refused.
+
+    Only runs for accounts the hierarchy index does not know yet, from a worker
+    thread (api_request_body() is never awaited on the event loop), and at most
+    once per GOOGLE_ADS_HIERARCHY_TTL for an account the crawl does not find.
+
+    Returns:
+        The login-customer-id, or None if it is unknown or discovery does not apply
+    """
+    if not customer_id or discovering_routes.get() or GOOGLE_ADS_CASSETTE_MODE == "replay":
+        return None
+    if _hierarchy_index is not None and _hierarchy_index.login_customer_id(customer_id) is not None:
+        return None
+    failed_at = _undiscoverable.get(customer_id)
+    if failed_at is not None and time.monotonic() - failed_at < GOOGLE_ADS_HIERARCHY_TTL:
+        return None
+    try:
+        asyncio.get_running_loop()
+        return None
+    except RuntimeError:
+        pass
+
+    token = discovering_routes.set(True)
+    try:
+        index = asyncio.run(crawl_hierarchy(headers))
+    except GoogleAdsApiError as e:
+        logger.warning(f"Could not crawl the account hierarchy for account {customer_id}: {e.text[:200]}")
+        return None
+    finally:
+        discovering_routes.reset(token)
+
+    login_customer_id = index.login_customer_id(customer_id)
+    if login_customer_id is None:
+        _undiscoverable[customer_id] = time.monotonic()
+    return login_customer_id
+
+def api_request_body(method: str, path: str, headers: Dict[str, str], payload: Optional[Dict[str, Any]] = None) -> str:
+    """
+    Send a request to the Google Ads REST API and return the raw JSON response body.
+
+    Every Google Ads API call goes through this function, so pointing
+    GOOGLE_ADS_API_BASE_URL at another server (e.g. mock_google_ads_server.py)
+    redirects all of them, and GOOGLE_ADS_CASSETTE_MODE records or replays them.
+    Accounts found by get_account_hierarchy() get the login-customer-id of the
+    manager that grants access to them. If the API refuses an account that is
+    not indexed yet, the hierarchy is crawled once and the request retried with
+    the login-customer-id found. Concurrent identical requests share one
+    API call and its response body; each caller decodes its own copy, as
+    callers modify the decoded rows.
+
+    Args:
+        method: HTTP method ("GET" or "POST")
+        path: Path below the API version, e.g. "customers:listAccessibleCustomers"
+        headers: Request headers as returned by get_headers()
+        payload: Optional JSON request body
+
+    Returns:
+        The JSON response body as text, so callers can decode it where it is cheapest
+
+    Raises:
+        GoogleAdsApiError: If the API returns a non-200 response, or with status 429
+            if the daily request budget (GOOGLE_ADS_DAILY_REQUEST_LIMIT) is used up
+    """
+    _, customer_id = endpoint_labels(path)
+    routed = routed_headers(customer_id, headers)
+    try:
+        return send_api_request(method, path, routed, payload)
+    except GoogleAdsApiError as e:
+        if e.status_code != 403:
+            raise
+        login_customer_id = discover_login_customer_id(customer_id, headers)
+        if login_customer_id is None or login_customer_id == routed.get('login-customer-id'):
+            raise
+        logger.info(f"Retrying the request for account {customer_id} with login-customer-id {login_customer_id}")
+        return send_api_request(method, path, {**headers, 'login-customer-id': login_customer_id}, payload)
+
+def send_api_request(method: str, path: str, headers: Dict[str, str], payload: Optional[Dict[str, Any]]) -> str:
+    """Send one request for api_request_body() with final headers: result cache, budgets, cassettes and metrics."""
+    if GOOGLE_ADS_CASSETTE_MODE in ("record", "replay"):
+        import cassettes
+
+    endpoint, customer_id = endpoint_labels(path)
+    span_attributes = {"http.method": method, "google_ads.endpoint": endpoint, "google_ads.customer_id": customer_id}
+    with tracing.span("google_ads.api_request", **span_attributes) as request_span:
+        # Recording must reach the API, so it bypasses the result cache
+        cache_key = None
+        if GOOGLE_ADS_RESULT_CACHE_TTL > 0 and GOOGLE_ADS_CASSETTE_MODE != "record":
+            cache_key = shared_state.request_key(
+                GOOGLE_ADS_API_BASE_URL, method, path, payload, headers.get('login-customer-id')
+            )
+            cached = result_cache.get(cache_key)
+            metrics.CACHE_REQUESTS.inc(cache="result", result="hit" if cached is not None else "miss")
+            request_span.set_attribute("google_ads.cache_hit", cached is not None)
+            if cached is not None:
+                return cached
+
+        # Reserved before joining a flight, so an interactive request never shares this error
+        budget = prefetch_budget.get() if GOOGLE_ADS_CASSETTE_MODE != "replay" else None
+        if budget is not None and not budget.spend():
+            raise GoogleAdsApiError(429, "The prefetch request budget for today is used up")
+        sent = False
+
+        def fetch() -> str:
+            nonlocal sent
+            sent = True
+            if budget is not None:
+                metrics.PREFETCH_REQUESTS.inc()
+            start = time.perf_counter()
+
+            if GOOGLE_ADS_CASSETTE_MODE == "replay":
+                recorded = cassettes.load_cassette(GOOGLE_ADS_CASSETTE_DIR, method, path, payload)
+                if recorded is None:
+                    raise GoogleAdsApiError(404, f"No cassette recorded for {method} {path} in {GOOGLE_ADS_CASSETTE_DIR}")
+                status_code, body = recorded
+                body_size = len(body)
+            else:
+                if rate_limiter.enabled:
+                    try:
+                        metrics.LIMITER_WAIT.observe(rate_limiter.acquire(), limiter="api_qps")
+                    except shared_state.QuotaExhausted as e:
+                        raise GoogleAdsApiError(429, str(e))
+                url = f"{GOOGLE_ADS_API_BASE_URL.rstrip('/')}/{API_VERSION}/{path}"
+                response = http_session().request(method, url, headers=headers, json=payload)
+                status_code, body = response.status_code, response.text
+                body_size = len(response.content)
+                if GOOGLE_ADS_CASSETTE_MODE == "record":
+                    cassettes.save_cassette(GOOGLE_ADS_CASSETTE_DIR, method, path, headers, payload, status_code, body)
+
+            metrics.API_LATENCY.observe(time.perf_counter() - start, endpoint=endpoint, status=status_code, customer_id=customer_id)
+            metrics.API_BYTES.inc(body_size, endpoint=endpoint)
+            request_span.set_attribute("http.status_code", status_code)
+            request_span.set_attribute("http.response.body.size", body_size)
+
+            if status_code != 200:
+                raise GoogleAdsApiError(status_code, body)
+            if cache_key is not None:
+                result_cache.set(cache_key, body, GOOGLE_ADS_RESULT_CACHE_TTL)
+            return body
+
+        # An identical request already in flight answers this one too, success or error
+        flight_key = cache_key or shared_state.request_key(
+            GOOGLE_ADS_API_BASE_URL, method, path, payload, headers.get('login-customer-id')
+        )
+        try:
+            body, coalesced = requests_in_flight.do(flight_key, fetch)
+        finally:
+            # Answered by an identical request already in flight: the reserved request is not spent
+            if budget is not None and not sent:
+                budget.refund()
+        request_span.set_attribute("google_ads.coalesced", coalesced)
+        if coalesced:
+            metrics.COALESCED_REQUESTS.inc(endpoint=endpoint)
+        return body
+
+def record_rows(path: str, row_count: int) -> None:
+    """Count result rows returned for an API path in metrics."""
+    endpoint, customer_id = endpoint_labels(path)
+    metrics.API_ROWS.inc(row_count, endpoint=endpoint, customer_id=customer_id)
+
+def api_request(method: str, path: str, headers: Dict[str, str], payload: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Send a request to the Google Ads REST API and decode the JSON response.
+
+    Every Google Ads API call goes through api_request_body(); see it for caching,
+    rate limiting and cassettes.
+
+    Returns:
+        The decoded JSON response body
+
+    Raises:
+        GoogleAdsApiError: If the API returns a non-200 response
+    """
+    import fast_json
+
+    decoded = fast_json.loads(api_request_body(method, path, headers, payload))
+    if 'results' in decoded:
+        record_rows(path, len(decoded['results']))
+    return decoded
+
+def search_path(customer_id: str) -> str:
+    return f"customers/{format_customer_id(customer_id)}/googleAds:search"
+
+def search_page_body(customer_id: str, query: str, headers: Dict[str, str], page_token: Optional[str] = None) -> str:
+    """Fetch one page of a GAQL query like search_page(), returning the undecoded JSON body."""
+    payload = {"query": query}
+    if page_token:
+        payload["pageToken"] = page_token
+    return api_request_body("POST", search_path(customer_id), headers, payload)
+
+def search_page(customer_id: str, query: str, headers: Dict[str, str], page_token: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Fetch one page of a GAQL query with googleAds:search.
+
+    Args:
+        customer_id: The Google Ads customer ID (any format accepted by format_customer_id)
+        query: The GAQL query to execute
+        headers: Request headers as returned by get_headers()
+        page_token: nextPageToken of the previous page, if any
+
+    Returns:
+        The decoded response, with 'results' and possibly 'nextPageToken'
+
+    Raises:
+        GoogleAdsApiError: If the API returns a non-200 response
+    """
+    payload = {"query": query}
+    if page_token:
+        payload["pageToken"] = page_token
+    return api_request("POST", search_path(customer_id), headers, payload)
+
+def search_all(customer_id: str, query: str, headers: Dict[str, str]) -> List[Dict[str, Any]]:
+    """
+    Run a GAQL query with googleAds:search and follow nextPageToken until exhausted.
+
+    Args:
+        customer_id: The Google Ads customer ID (any format accepted by format_customer_id)
+        query: The GAQL query to execute
+        headers: Request headers as returned by get_headers()
+
+    Returns:
+        The concatenated 'results' rows of every page
+
+    Raises:
+        GoogleAdsApiError: If any page request returns a non-200 response
+    """
+    rows = []
+    page_token = None
+    while True:
+        page = search_page(customer_id, query, headers, page_token)
+        rows.extend(page.get('results', []))
+
+        page_token = page.get('nextPageToken')
+        if not page_token:
+            return rows
+
+async def run_projection(customer_id: str, projection, headers: Dict[str, str]) -> List[Dict[str, Any]]:
+    """
+    Run a query_builder.Projection: its metrics query, then the attributes of the entities in it.
+
+    Attributes come from entity_attributes where cached; the lookups for
+    different entity resources run concurrently. When entity_attributes is in
+    memory and the server may exit after this call (stdio), nothing would be
+    reused, so the projection runs as its single combined query instead.
+
+    Returns:
+        Metric rows with the attributes joined in, shaped like rows of the combined query
+
+    Raises:
+        GoogleAdsApiError: If the API returns a non-200 response
+    """
+    import query_builder
+
+    if not GOOGLE_ADS_SHARED_STATE_DB and not long_running_server:
+        return await asyncio.to_thread(search_all, customer_id, projection.combined_query(), headers)
+
+    rows = await asyncio.to_thread(search_all, customer_id, projection.metrics_query(), headers)
+
+    def search(query: str) -> List[Dict[str, Any]]:
+        return search_all(customer_id, query, headers)
+
+    entity_ids = projection.entity_ids(rows)
+    lookups = await asyncio.gather(*(
+        asyncio.to_thread(
+            query_builder.cached_attributes, entity_attributes, GOOGLE_ADS_ATTRIBUTE_CACHE_TTL,
+            customer_id, entity, fields, entity_ids[entity], search
+        )
+        for entity, fields in projection.attributes.items()
+    ))
+    attributes = {}
+    for entity, (found, hits) in zip(projection.attributes, lookups):
+        attributes[entity] = found
+        metrics.CACHE_REQUESTS.inc(hits, cache="attributes", result="hit")
+        metrics.CACHE_REQUESTS.inc(len(entity_ids[entity]) - hits, cache="attributes", result="miss")
+    return projection.join(rows, attributes)
+
+_cpu_pool = None
+_cpu_pool_lock = threading.Lock()
+
+
+def cpu_pool():
+    """
+    Get the process pool for CPU-heavy decoding and formatting, created on first use.
+
+    Work done in threads still holds the GIL and stalls the event loop, so large
+    responses are handled in separate processes instead. Workers are started
+    with forkserver (spawn where it is unavailable), never fork: by now the
+    server runs threads, and a forked child could inherit a lock one of them
+    holds, such as a logging lock or _credentials_lock.
+    """
+    global _cpu_pool
+    if _cpu_pool is None:
+        with _cpu_pool_lock:
+            if _cpu_pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                _cpu_pool = ProcessPoolExecutor(
+                    max_workers=GOOGLE_ADS_CPU_WORKERS or min(4, os.cpu_count() or 1),
+                    mp_context=multiprocessing.get_context(start_method),
+                )
+    return _cpu_pool
+
+async def render_search_body(body: str, format: str, customer_id: str) -> Tuple[int, str]:
+    """
+    Decode a googleAds:search response body and format its rows off the event loop.
+
+    Bodies of GOOGLE_ADS_CPU_OFFLOAD_MIN_BYTES or more go to the process pool as
+    one string, and only the rendered text comes back, so no dict trees are
+    pickled between processes. Smaller bodies are handled in a worker thread.
+
+    Args:
+        body: Raw JSON body from search_page_body()
+        format: Output format understood by gaql_format.format_results()
+        customer_id: The formatted customer ID
+
+    Returns:
+        Tuple of (number of result rows, formatted output); the output is empty when there are no rows
+    """
+    import gaql_format
+
+    offload = len(body) >= GOOGLE_ADS_CPU_OFFLOAD_MIN_BYTES
+    with tracing.span("gaql_format.render", **{"body.size": len(body), "process_pool": offload}):
+        if offload:
+            loop = asyncio.get_running_loop()
+            row_count, output = await loop.run_in_executor(
+                cpu_pool(), gaql_format.render_response_body, body, format, customer_id
+            )
+        else:
+            row_count, output = await asyncio.to_thread(gaql_format.render_response_body, body, format, customer_id)
+    record_rows(search_path(customer_id), row_count)
+    return row_count, output
+
+ACCOUNT_METADATA_QUERY = """
+    SELECT
+        customer_client.id,
+        customer_client.descriptive_name,
+        customer_client.currency_code,
+        customer_client.time_zone,
+        customer_client.manager,
+        customer_client.level
+    FROM customer_client
+"""
+
+def load_account_metadata(customer_id: str, headers: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Fetch metadata of an account and, for a manager account, of every account below it.
+
+    One customer_client query returns the account itself (level 0) and all of its
+    client accounts, so a single request per MCC fills the account cache for the
+    whole hierarchy.
+
+    Returns:
+        Customer ID -> {"name", "currency", "time_zone", "manager"} for every returned account
+    """
+    return cache_client_metadata(search_all(customer_id, ACCOUNT_METADATA_QUERY, headers))
+
+def cache_client_metadata(rows: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Store the metadata of customer_client result rows in the account cache and return it."""
+    from account_hierarchy import client_metadata
+
+    accounts = {
+        format_customer_id(row['customerClient']['id']): client_metadata(row['customerClient'])
+        for row in rows if row.get('customerClient', {}).get('id')
+    }
+    account_cache.set_many(accounts, GOOGLE_ADS_ACCOUNT_CACHE_TTL)
+    return accounts
+
+async def account_metadata(customer_ids: List[str], headers: Dict[str, str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Get cached account metadata, loading what is missing.
+
+    The login customer (MCC) is loaded first when it is configured, since it usually
+    covers every other account; remaining accounts are loaded concurrently. Accounts
+    that cannot be loaded (e.g. canceled ones) map to None.
+
+    Returns:
+        Formatted customer ID -> metadata or None, for every requested ID
+    """
+    found = {}
+    for customer_id in customer_ids:
+        metadata = account_cache.get(customer_id)
+        metrics.CACHE_REQUESTS.inc(cache="account", result="hit" if metadata is not None else "miss")
+        if metadata is not None:
+            found[customer_id] = metadata
+
+    async def load(customer_id: str) -> None:
+        try:
+            found.update(await asyncio.to_thread(load_account_metadata, customer_id, headers))
+        except GoogleAdsApiError as e:
+            logger.warning(f"Could not load metadata of account {customer_id}: {e.text[:200]}")
+
+    missing = [customer_id for customer_id in customer_ids if customer_id not in found]
+    manager_id = format_customer_id(GOOGLE_ADS_LOGIN_CUSTOMER_ID) if GOOGLE_ADS_LOGIN_CUSTOMER_ID else None
+    if missing and manager_id and manager_id not in found:
+        await load(manager_id)
+        missing = [customer_id for customer_id in missing if customer_id not in found]
+    await asyncio.gather(*(load(customer_id) for customer_id in missing))
+
+    return {customer_id: found.get(customer_id) for customer_id in customer_ids}
+
+def describe_account(customer_id: str, metadata: Optional[Dict[str, Any]]) -> str:
+    """One list_accounts line: ID, then name, currency, time zone and manager flag if known."""
+    if not metadata:
+        return f"Account ID: {customer_id}"
+    details = [metadata.get('name') or "(unnamed)", metadata.get('currency') or "?", metadata.get('time_zone') or "?"]
+    if metadata.get('manager'):
+        details.append("manager")
+    return f"Account ID: {customer_id} | " + " | ".join(details)
+
+@tool()
 async def list_accounts() -> str:
     """
     Lists all accessible Google Ads accounts.
     
     This is typically the first command you should run to identify which accounts 
     you have access to. The returned account IDs can be used in subsequent commands.
+    Each account is listed with its name, currency, time zone and whether it is a
+    manager account, so get_account_currency() is not needed afterwards.
     
     Returns:
         A formatted list of all Google Ads accounts accessible with your credentials
@@ -257,31 +955,154 @@ async def list_accounts() -> str:
         creds = get_credentials()
         headers = get_headers(creds)
         
-        url = f"https://googleads.googleapis.com/{API_VERSION}/customers:listAccessibleCustomers"
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code != 200:
-            return f"Error accessing accounts: {response.text}"
+        try:
+            customers = await asyncio.to_thread(api_request, "GET", "customers:listAccessibleCustomers", headers)
+        except GoogleAdsApiError as e:
+            return f"Error accessing accounts: {e.text}"
         
-        customers = response.json()
         if not customers.get('resourceNames'):
             return "No accessible accounts found."
         
+        customer_ids = [format_customer_id(resource_name.split('/')[-1]) for resource_name in customers['resourceNames']]
+        accounts = await account_metadata(customer_ids, headers)
+        
         # Format the results
         result_lines = ["Accessible Google Ads Accounts:"]
         result_lines.append("-" * 50)
         
-        for resource_name in customers['resourceNames']:
-            customer_id = resource_name.split('/')[-1]
-            formatted_id = format_customer_id(customer_id)
-            result_lines.append(f"Account ID: {formatted_id}")
+        for customer_id in customer_ids:
+            result_lines.append(describe_account(customer_id, accounts[customer_id]))
         
         return "\n".join(result_lines)
     
     except Exception as e:
         return f"Error listing accounts: {str(e)}"
 
-@mcp.tool()
+HIERARCHY_CONCURRENCY = 8
+
+async def crawl_hierarchy(headers: Dict[str, str], refresh: bool = False):
+    """
+    Build or refresh the hierarchy index from the accessible accounts down.
+
+    Managers are queried one level at a time, with sub-managers crawled
+    concurrently. Managers crawled within GOOGLE_ADS_HIERARCHY_TTL are not queried
+    again unless refresh is set; their known sub-managers are still visited.
+    The crawl also fills the account metadata cache, including the
+    login-customer-id of every account found.
+
+    Returns:
+        The hierarchy index
+
+    Raises:
+        GoogleAdsApiError: If the accessible accounts cannot be listed
+    """
+    import account_hierarchy
+
+    index = hierarchy_index()
+    customers = await asyncio.to_thread(api_request, "GET", "customers:listAccessibleCustomers", headers)
+    index.set_roots([format_customer_id(name.split('/')[-1]) for name in customers.get('resourceNames', [])])
+
+    ttl = 0 if refresh else GOOGLE_ADS_HIERARCHY_TTL
+    semaphore = asyncio.Semaphore(HIERARCHY_CONCURRENCY)
+
+    async def crawl(customer_id: str) -> None:
+        if index.needs_crawl(customer_id, ttl):
+            try:
+                async with metrics.timed_wait(semaphore, "account_hierarchy"):
+                    rows = await asyncio.to_thread(search_all, customer_id, account_hierarchy.HIERARCHY_QUERY, headers)
+            except GoogleAdsApiError as e:
+                logger.warning(f"Could not list clients of account {customer_id}: {e.text[:200]}")
+                return
+            managers = index.update_manager(customer_id, rows)
+            cache_client_metadata(rows)
+        else:
+            managers = [child for child in index.children(customer_id) if index.nodes.get(child, {}).get("manager")]
+        await asyncio.gather(*(crawl(manager_id) for manager_id in managers))
+
+    await asyncio.gather(*(crawl(customer_id) for customer_id in index.roots))
+    # Later processes route requests to these accounts without crawling again
+    account_cache.set_login_customer_ids(index.login_customer_ids(), GOOGLE_ADS_ACCOUNT_CACHE_TTL)
+    return index
+
+@tool()
+async def get_account_hierarchy(
+    manager_id: str = Field(default="", description="Only show this manager account and the accounts below it (10 digits, no dashes); empty for all"),
+    refresh: bool = Field(default=False, description="Query every manager again instead of reusing recently crawled client lists")
+) -> str:
+    """
+    Show the manager (MCC) hierarchy of the accessible accounts as a tree.
+
+    Use this to find all accounts under a manager. Afterwards, requests for any
+    account in the tree automatically use the login-customer-id of the manager
+    that grants access to it.
+
+    Args:
+        manager_id: Optional manager account to show the subtree of
+        refresh: Re-query all managers (default: only those not crawled within the last hour)
+
+    Returns:
+        Indented tree with each account's ID, name, currency, time zone and manager flag
+
+    Example:
+        manager_id: "1234567890"
+    """
+    try:
+        headers = get_headers(get_credentials())
+        try:
+            index = await crawl_hierarchy(headers, refresh)
+        except GoogleAdsApiError as e:
+            return f"Error accessing accounts: {e.text}"
+
+        if manager_id:
+            tops = [format_customer_id(manager_id)]
+            if tops[0] not in index.nodes:
+                return f"Account {tops[0]} was not found below any accessible account."
+        else:
+            tops = index.top_level()
+        if not tops:
+            return "No accessible accounts found."
+
+        customer_ids = [customer_id for top in tops for customer_id in index.subtree(top)]
+        metadata = {customer_id: account_cache.get(customer_id) for customer_id in customer_ids}
+        managers = sum(1 for customer_id in customer_ids if index.nodes[customer_id]["manager"])
+
+        result_lines = ["Account Hierarchy:"]
+        result_lines.append("-" * 50)
+        for top in tops:
+            result_lines.extend(index.render(top, metadata))
+        result_lines.append("")
+        result_lines.append(f"{len(customer_ids)} accounts ({managers} managers)")
+        return "\n".join(result_lines)
+
+    except Exception as e:
+        return f"Error building account hierarchy: {str(e)}"
+
+async def _execute_gaql_query(customer_id: str, query: str, format: str) -> str:
+    """
+    Run one page of a GAQL query and render it, for execute_gaql_query() and run_gaql().
+
+    Tools that run a canned query call this rather than another tool, so one
+    user call records one tool call in metrics and traces.
+    """
+    try:
+        creds = get_credentials()
+        headers = get_headers(creds)
+        
+        formatted_customer_id = format_customer_id(customer_id)
+        try:
+            body = await asyncio.to_thread(search_page_body, formatted_customer_id, query, headers)
+        except GoogleAdsApiError as e:
+            return f"Error executing query: {e.text}"
+        
+        row_count, output = await render_search_body(body, format, formatted_customer_id)
+        if not row_count:
+            return "No results found for the query."
+        return output
+    
+    except Exception as e:
+        return f"Error executing GAQL query: {str(e)}"
+
+@tool()
 async def execute_gaql_query(
     customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'"),
     query: str = Field(description="Valid GAQL query string following Google Ads Query Language syntax")
@@ -302,59 +1123,9 @@ async def execute_gaql_query(
         customer_id: "1234567890"
         query: "SELECT campaign.id, campaign.name FROM campaign LIMIT 10"
     """
-    try:
-        creds = get_credentials()
-        headers = get_headers(creds)
-        
-        formatted_customer_id = format_customer_id(customer_id)
-        url = f"https://googleads.googleapis.com/{API_VERSION}/customers/{formatted_customer_id}/googleAds:search"
-        
-        payload = {"query": query}
-        response = requests.post(url, headers=headers, json=payload)
-        
-        if response.status_code != 200:
-            return f"Error executing query: {response.text}"
-        
-        results = response.json()
-        if not results.get('results'):
-            return "No results found for the query."
-        
-        # Format the results as a table
-        result_lines = [f"Query Results for Account {formatted_customer_id}:"]
-        result_lines.append("-" * 80)
-        
-        # Get field names from the first result
-        fields = []
-        first_result = results['results'][0]
-        for key in first_result:
-            if isinstance(first_result[key], dict):
-                for subkey in first_result[key]:
-                    fields.append(f"{key}.{subkey}")
-            else:
-                fields.append(key)
-        
-        # Add header
-        result_lines.append(" | ".join(fields))
-        result_lines.append("-" * 80)
-        
-        # Add data rows
-        for result in results['results']:
-            row_data = []
-            for field in fields:
-                if "." in field:
-                    parent, child = field.split(".")
-                    value = str(result.get(parent, {}).get(child, ""))
-                else:
-                    value = str(result.get(field, ""))
-                row_data.append(value)
-            result_lines.append(" | ".join(row_data))
-        
-        return "\n".join(result_lines)
-    
-    except Exception as e:
-        return f"Error executing GAQL query: {str(e)}"
+    return await _execute_gaql_query(customer_id, query, "simple")
 
-@mcp.tool()
+@tool()
 async def get_campaign_performance(
     customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'"),
     days: int = Field(default=30, description="Number of days to look back (7, 30, 90, etc.)")
@@ -364,7 +1135,7 @@ async def get_campaign_performance(
     
     RECOMMENDED WORKFLOW:
     1. First run list_accounts() to get available account IDs
-    2. Then run get_account_currency() to see what currency the account uses
+    2. Check the account's currency in the list_accounts() output
     3. Finally run this command to get campaign performance
     
     Args:
@@ -398,9 +1169,9 @@ async def get_campaign_performance(
         LIMIT 50
     """
     
-    return await execute_gaql_query(customer_id, query)
+    return await _execute_gaql_query(customer_id, query, "simple")
 
-@mcp.tool()
+@tool()
 async def get_ad_performance(
     customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'"),
     days: int = Field(default=30, description="Number of days to look back (7, 30, 90, etc.)")
@@ -410,7 +1181,7 @@ async def get_ad_performance(
     
     RECOMMENDED WORKFLOW:
     1. First run list_accounts() to get available account IDs
-    2. Then run get_account_currency() to see what currency the account uses
+    2. Check the account's currency in the list_accounts() output
     3. Finally run this command to get ad performance
     
     Args:
@@ -445,13 +1216,13 @@ async def get_ad_performance(
         LIMIT 50
     """
     
-    return await execute_gaql_query(customer_id, query)
+    return await _execute_gaql_query(customer_id, query, "simple")
 
-@mcp.tool()
+@tool()
 async def run_gaql(
     customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'"),
     query: str = Field(description="Valid GAQL query string following Google Ads Query Language syntax"),
-    format: str = Field(default="table", description="Output format: 'table', 'json', or 'csv'")
+    format: str = Field(default="table", description="Output format: 'table', 'json', 'json_compact' (JSON without indentation, smaller for large results), or 'csv'")
 ) -> str:
     """
     Execute any arbitrary GAQL (Google Ads Query Language) query with custom formatting options.
@@ -461,7 +1232,7 @@ async def run_gaql(
     Args:
         customer_id: The Google Ads customer ID as a string (10 digits, no dashes)
         query: The GAQL query to execute (any valid GAQL query)
-        format: Output format ("table", "json", or "csv")
+        format: Output format ("table", "json", "json_compact", or "csv")
     
     Returns:
         Query results in the requested format
@@ -507,104 +1278,660 @@ async def run_gaql(
         Cost values are in micros (millionths) of the account currency
         (e.g., 1000000 = 1 USD in a USD account)
     """
-    try:
-        creds = get_credentials()
-        headers = get_headers(creds)
-        
-        formatted_customer_id = format_customer_id(customer_id)
-        url = f"https://googleads.googleapis.com/{API_VERSION}/customers/{formatted_customer_id}/googleAds:search"
-        
-        payload = {"query": query}
-        response = requests.post(url, headers=headers, json=payload)
-        
-        if response.status_code != 200:
-            return f"Error executing query: {response.text}"
-        
-        results = response.json()
-        if not results.get('results'):
-            return "No results found for the query."
-        
-        if format.lower() == "json":
-            return json.dumps(results, indent=2)
-        
-        elif format.lower() == "csv":
-            # Get field names from the first result
-            fields = []
-            first_result = results['results'][0]
-            for key, value in first_result.items():
-                if isinstance(value, dict):
-                    for subkey in value:
-                        fields.append(f"{key}.{subkey}")
-                else:
-                    fields.append(key)
-            
-            # Create CSV string
-            csv_lines = [",".join(fields)]
-            for result in results['results']:
-                row_data = []
-                for field in fields:
-                    if "." in field:
-                        parent, child = field.split(".")
-                        value = str(result.get(parent, {}).get(child, "")).replace(",", ";")
-                    else:
-                        value = str(result.get(field, "")).replace(",", ";")
-                    row_data.append(value)
-                csv_lines.append(",".join(row_data))
-            
-            return "\n".join(csv_lines)
-        
-        else:  # default table format
-            result_lines = [f"Query Results for Account {formatted_customer_id}:"]
-            result_lines.append("-" * 100)
-            
-            # Get field names and maximum widths
-            fields = []
-            field_widths = {}
-            first_result = results['results'][0]
-            
-            for key, value in first_result.items():
-                if isinstance(value, dict):
-                    for subkey in value:
-                        field = f"{key}.{subkey}"
-                        fields.append(field)
-                        field_widths[field] = len(field)
-                else:
-                    fields.append(key)
-                    field_widths[key] = len(key)
-            
-            # Calculate maximum field widths
-            for result in results['results']:
-                for field in fields:
-                    if "." in field:
-                        parent, child = field.split(".")
-                        value = str(result.get(parent, {}).get(child, ""))
-                    else:
-                        value = str(result.get(field, ""))
-                    field_widths[field] = max(field_widths[field], len(value))
-            
-            # Create formatted header
-            header = " | ".join(f"{field:{field_widths[field]}}" for field in fields)
-            result_lines.append(header)
-            result_lines.append("-" * len(header))
-            
-            # Add data rows
-            for result in results['results']:
-                row_data = []
-                for field in fields:
-                    if "." in field:
-                        parent, child = field.split(".")
-                        value = str(result.get(parent, {}).get(child, ""))
-                    else:
-                        value = str(result.get(field, ""))
-                    row_data.append(f"{value:{field_widths[field]}}")
-                result_lines.append(" | ".join(row_data))
-            
-            return "\n".join(result_lines)
-    
+    return await _execute_gaql_query(customer_id, query, format)
+
+MAX_BATCH_QUERIES = 25
+
+@tool()
+async def run_gaql_batch(
+    queries: List[Dict[str, str]] = Field(description="List of queries to run, each an object with 'customer_id', 'query' and optional 'format' ('table', 'json', 'json_compact', or 'csv'); the response is compact JSON when every query asks for json_compact"),
+    max_concurrency: int = Field(default=5, description="Maximum number of queries running at the same time (1-10)")
+) -> str:
+    """
+    Execute several GAQL queries in one call and return all results together.
+
+    Use this instead of calling run_gaql() repeatedly when an answer needs several
+    related queries (e.g. campaigns, ad groups, keywords and assets). The queries run
+    concurrently and a failing query does not affect the others. Like run_gaql(), each
+    query returns its first page of results; use start_report() for larger pulls.
+
+    Args:
+        queries: List of {"customer_id": ..., "query": ..., "format": ...} objects
+                 (format defaults to "table")
+        max_concurrency: Maximum number of queries in flight (default: 5)
+
+    Returns:
+        JSON object with a "results" list in the same order as the input. Each entry has
+        "customer_id", "status" ("ok" or "error"), "row_count" and either "output"
+        (table/csv text), "rows" (json and json_compact formats) or "error". The object
+        is indented, or compact when every query asks for json_compact.
+
+    Example:
+        queries: [
+            {"customer_id": "1234567890", "query": "SELECT campaign.id, campaign.name FROM campaign"},
+            {"customer_id": "1234567890", "query": "SELECT ad_group.id, ad_group.name FROM ad_group", "format": "csv"}
+        ]
+
+    Note:
+        Cost values are in micros (millionths) of the account currency
+    """
+    if not queries:
+        return "No queries provided."
+    if len(queries) > MAX_BATCH_QUERIES:
+        return f"Too many queries in one batch: {len(queries)} (maximum is {MAX_BATCH_QUERIES})"
+
+    import fast_json
+    import gaql_format
+
+    try:
+        creds = get_credentials()
+        headers = get_headers(creds)
     except Exception as e:
-        return f"Error executing GAQL query: {str(e)}"
+        return f"Error executing GAQL batch: {str(e)}"
+
+    semaphore = asyncio.Semaphore(max(1, min(int(max_concurrency), 10)))
+
+    async def run_item(item: Dict[str, str]) -> Dict[str, Any]:
+        if not isinstance(item, dict) or not item.get('customer_id') or not item.get('query'):
+            return {"status": "error", "error": "Each query needs 'customer_id' and 'query'"}
+
+        formatted_customer_id = format_customer_id(item['customer_id'])
+        output_format = str(item.get('format') or "table").lower()
+        entry = {"customer_id": formatted_customer_id, "format": output_format}
+        if output_format not in gaql_format.OUTPUT_FORMATS:
+            return {**entry, "status": "error", "error": f"Unknown format '{output_format}'"}
+
+        try:
+            async with metrics.timed_wait(semaphore, "run_gaql_batch"):
+                body = await asyncio.to_thread(search_page_body, formatted_customer_id, item['query'], headers)
+            # Decoding and formatting stay off the event loop, as in run_gaql()
+            if output_format in ("json", "json_compact"):
+                rows = (await asyncio.to_thread(fast_json.loads, body)).get('results', [])
+                record_rows(search_path(formatted_customer_id), len(rows))
+                entry.update({"status": "ok", "row_count": len(rows), "rows": rows})
+                return entry
+            row_count, output = await render_search_body(body, output_format, formatted_customer_id)
+        except GoogleAdsApiError as e:
+            return {**entry, "status": "error", "error": e.text}
+        except Exception as e:
+            return {**entry, "status": "error", "error": str(e)}
+
+        entry.update({"status": "ok", "row_count": row_count, "output": output or "No results found for the query."})
+        return entry
+
+    results = await asyncio.gather(*(run_item(item) for item in queries))
+    # All the rows share one document, so its layout follows the formats asked for
+    compact = all(isinstance(item, dict) and str(item.get('format') or "").lower() == "json_compact" for item in queries)
+    return await asyncio.to_thread(fast_json.dumps, {"results": results}, indent=not compact)
+
+@tool()
+async def compare_periods(
+    customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'"),
+    level: str = Field(default="campaign", description="Entities to compare: 'campaign', 'ad_group' or 'keyword'"),
+    days: int = Field(default=7, description="Length of each period in days; the current period is compared with the same number of days just before it"),
+    metric: str = Field(default="cost", description="Metric to rank changes by: 'impressions', 'clicks', 'cost', 'conversions' or 'conversions_value'"),
+    top_n: int = Field(default=10, description="Number of entities with the largest changes to return (1-100)"),
+    end_date: str = Field(default="", description="Last day of the current period as YYYY-MM-DD (default: yesterday)")
+) -> str:
+    """
+    Compare metrics between the current period and the previous period of the same length.
+
+    Use this for "what changed vs last week/month" questions instead of running two
+    queries and comparing them. Both periods are fetched concurrently and joined by
+    entity ID. The result has the account totals for both periods and the entities
+    whose chosen metric changed the most, with absolute and percent changes of
+    every metric.
+
+    Args:
+        customer_id: The Google Ads customer ID as a string (10 digits, no dashes)
+        level: "campaign" (default), "ad_group" or "keyword"
+        days: Days per period (default: 7)
+        metric: Metric to rank by (default: "cost")
+        top_n: Number of top movers to show (default: 10)
+        end_date: Last day of the current period (default: yesterday)
+
+    Returns:
+        Totals per period and a table of the top movers
+
+    Example:
+        customer_id: "1234567890"
+        level: "campaign"
+        days: 7
+        metric: "conversions"
+
+    Note:
+        Cost is shown in the account currency (converted from micros)
+    """
+    import period_comparison
+
+    if level not in period_comparison.LEVELS:
+        return f"Unknown level '{level}'. Use one of: {', '.join(period_comparison.LEVELS)}"
+    if metric not in period_comparison.METRICS:
+        return f"Unknown metric '{metric}'. Use one of: {', '.join(period_comparison.METRICS)}"
+    days = max(1, int(days))
+    top_n = max(1, min(int(top_n), 100))
+
+    try:
+        end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else (datetime.now() - timedelta(days=1)).date()
+    except ValueError:
+        return f"Invalid end_date '{end_date}'. Use the format YYYY-MM-DD."
+    current_window, previous_window = period_comparison.windows(days, end)
+
+    try:
+        creds = get_credentials()
+        headers = get_headers(creds)
+
+        formatted_customer_id = format_customer_id(customer_id)
+        try:
+            current_rows, previous_rows = await asyncio.gather(*(
+                asyncio.to_thread(search_all, formatted_customer_id, period_comparison.build_query(level, *window), headers)
+                for window in (current_window, previous_window)
+            ))
+        except GoogleAdsApiError as e:
+            return f"Error comparing periods: {e.text}"
+
+        result = await asyncio.to_thread(period_comparison.compare, current_rows, previous_rows, level, metric, top_n)
+        return period_comparison.format_comparison(
+            result, level, metric, formatted_customer_id, current_window, previous_window
+        )
+
+    except Exception as e:
+        return f"Error comparing periods: {str(e)}"
+
+@tool()
+async def detect_anomalies(
+    customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'"),
+    level: str = Field(default="campaign", description="Entities to check: 'campaign' or 'ad_group'"),
+    days: int = Field(default=14, description="Number of recent days to check for anomalies (1-90)"),
+    baseline_days: int = Field(default=7, description="Days of history before each day that form its baseline (3-60)"),
+    threshold: float = Field(default=3.5, description="Robust z-score at or above which a value is flagged"),
+    top_n: int = Field(default=25, description="Maximum number of anomalies to return (1-200)"),
+    end_date: str = Field(default="", description="Last day to check as YYYY-MM-DD (default: yesterday)")
+) -> str:
+    """
+    Find days where a campaign's or ad group's spend, CTR, CPC or conversions broke from its recent pattern.
+
+    Use this for "anything unusual?" questions instead of pulling daily rows. The
+    daily metrics of every entity are fetched in one query and scored locally:
+    each day is compared with the median of the baseline_days before it, and the
+    distance is measured in robust standard deviations (median absolute
+    deviation). Only the flagged entity/day cells are returned, strongest first.
+
+    Args:
+        customer_id: The Google Ads customer ID as a string (10 digits, no dashes)
+        level: "campaign" (default) or "ad_group"
+        days: Days to check (default: 14)
+        baseline_days: History per day (default: 7)
+        threshold: Minimum |robust z-score| to flag (default: 3.5)
+        top_n: Number of anomalies to show (default: 25)
+        end_date: Last day to check (default: yesterday)
+
+    Returns:
+        A summary line and a table of date, entity, metric, value, baseline and z-score
+
+    Example:
+        customer_id: "1234567890"
+        level: "campaign"
+        days: 7
+
+    Note:
+        Requires numpy. Spend and CPC are in the account currency (converted from micros)
+    """
+    try:
+        import anomaly_detection
+    except ImportError:
+        return "Error detecting anomalies: numpy is not installed. Install it with: pip install numpy"
+
+    if level not in anomaly_detection.LEVELS:
+        return f"Unknown level '{level}'. Use one of: {', '.join(anomaly_detection.LEVELS)}"
+    days = max(1, min(int(days), 90))
+    baseline_days = max(3, min(int(baseline_days), 60))
+    top_n = max(1, min(int(top_n), 200))
+
+    try:
+        end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else (datetime.now() - timedelta(days=1)).date()
+    except ValueError:
+        return f"Invalid end_date '{end_date}'. Use the format YYYY-MM-DD."
+    start = end - timedelta(days=days + baseline_days - 1)
+
+    try:
+        creds = get_credentials()
+        headers = get_headers(creds)
+
+        formatted_customer_id = format_customer_id(customer_id)
+        try:
+            rows = await asyncio.to_thread(
+                search_all, formatted_customer_id, anomaly_detection.build_query(level, start, end), headers
+            )
+        except GoogleAdsApiError as e:
+            return f"Error detecting anomalies: {e.text}"
+
+        dates = anomaly_detection.date_range(start, end)
+        result = await asyncio.to_thread(anomaly_detection.detect, rows, level, dates, baseline_days, float(threshold))
+        return anomaly_detection.format_anomalies(result, level, formatted_customer_id, float(threshold), top_n)
+
+    except Exception as e:
+        return f"Error detecting anomalies: {str(e)}"
+
+def split_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+@tool()
+async def pivot_report(
+    customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'"),
+    rows: str = Field(default="campaign", description="Comma-separated row dimensions: campaign, campaign_id, ad_group, ad_group_id, date, week, month, day_of_week, device, network"),
+    columns: str = Field(default="", description="Optional dimension whose values become columns, e.g. 'device'"),
+    metrics: str = Field(default="cost,clicks", description="Comma-separated metrics: impressions, clicks, cost, conversions, conversions_value, ctr, cpc, cpa, roas"),
+    days: int = Field(default=30, description="Number of days to report, ending on end_date (1-365)"),
+    filters: str = Field(default="", description="Comma-separated dimension=value filters, e.g. 'device=MOBILE'"),
+    subtotals: bool = Field(default=True, description="Add a subtotal row per value of the first row dimension"),
+    max_rows: int = Field(default=100, description="Maximum number of data rows to show (1-1000)"),
+    end_date: str = Field(default="", description="Last day of the report as YYYY-MM-DD (default: yesterday)"),
+    refresh: bool = Field(default=False, description="Fetch the data again even if a cached copy exists")
+) -> str:
+    """
+    Pivot daily performance by any mix of campaign, ad group, date, device and network, with subtotals.
+
+    The data for the window is fetched once at the finest grain (entity x day x device
+    x network) and cached in the server process, so follow-up pivots of the same
+    account, window and level, such as a different split, filter or metric, are
+    computed locally without API calls. That needs a long-running server (an MCP
+    client that keeps it open, or --transport); a server started per call fetches again.
+    Ratio metrics (ctr, cpc, cpa, roas) are computed from summed clicks, cost,
+    conversions and value, so subtotals and totals are exact.
+
+    Args:
+        customer_id: The Google Ads customer ID as a string (10 digits, no dashes)
+        rows: Row dimensions, outermost first (default: "campaign")
+        columns: Column dimension (default: none, one column per metric)
+        metrics: Metrics to show (default: "cost,clicks")
+        days: Days in the report (default: 30)
+        filters: Equality filters on dimensions (default: none)
+        subtotals: Subtotal rows for the first row dimension (default: true)
+        max_rows: Data rows to show (default: 100)
+        end_date: Last day of the report (default: yesterday)
+        refresh: Ignore the cached table (default: false)
+
+    Returns:
+        A header naming the window and data source, then the pivot table with a Total row
+
+    Example:
+        customer_id: "1234567890"
+        rows: "campaign,week"
+        columns: "device"
+        metrics: "cost"
+
+    Note:
+        Ad group dimensions fetch an ad group table and campaign-level pivots a campaign
+        table, which also counts campaigns without ad groups. Cost is in the account currency.
+    """
+    import pivot_table
+
+    row_dimensions = split_list(rows)
+    column_dimension = columns.strip()
+    metric_names = split_list(metrics)
+    try:
+        filter_values = dict(item.split('=', 1) for item in split_list(filters))
+    except ValueError:
+        return f"Invalid filters '{filters}'. Use dimension=value pairs separated by commas."
+    filter_values = {dimension.strip(): value.strip() for dimension, value in filter_values.items()}
+
+    if not row_dimensions:
+        return "At least one row dimension is required."
+    dimensions = row_dimensions + ([column_dimension] if column_dimension else []) + list(filter_values)
+    level = pivot_table.level_for(dimensions)
+    if level is None:
+        known = list(pivot_table.GRAINS["ad_group"][1]) + list(pivot_table.DATE_DIMENSIONS)
+        return f"Unknown dimension in '{', '.join(dimensions)}'. Use any of: {', '.join(known)}"
+    unknown = [metric for metric in metric_names if metric not in pivot_table.METRICS]
+    if unknown or not metric_names:
+        return f"Unknown metric '{', '.join(unknown)}'. Use any of: {', '.join(pivot_table.METRICS)}"
+    days = max(1, min(int(days), 365))
+    max_rows = max(1, min(int(max_rows), 1000))
+
+    try:
+        end = datetime.strptime(end_date, "%Y-%m-%d").date() if end_date else (datetime.now() - timedelta(days=1)).date()
+    except ValueError:
+        return f"Invalid end_date '{end_date}'. Use the format YYYY-MM-DD."
+    start = end - timedelta(days=days - 1)
+
+    try:
+        formatted_customer_id = format_customer_id(customer_id)
+        window = f"{formatted_customer_id}:{start.isoformat()}:{end.isoformat()}"
+
+        # Only a table of the same level is reused: the ad_group resource has no rows for
+        # campaigns without ad groups (e.g. Performance Max), so it undercounts campaign totals
+        table = None if refresh else pivot_tables.get(f"{window}:{level}")
+        source = "cached"
+        if table is None:
+            creds = get_credentials()
+            headers = get_headers(creds)
+            try:
+                result_rows = await asyncio.to_thread(
+                    search_all, formatted_customer_id, pivot_table.build_query(level, start, end), headers
+                )
+            except GoogleAdsApiError as e:
+                return f"Error building pivot report: {e.text}"
+            table = await asyncio.to_thread(pivot_table.Table.from_rows, result_rows, level)
+            pivot_tables.set(f"{window}:{level}", table, GOOGLE_ADS_PIVOT_CACHE_TTL)
+            source = "fetched"
+
+        cells, row_count = await asyncio.to_thread(
+            pivot_table.pivot, table, row_dimensions, column_dimension, metric_names, filter_values, subtotals, max_rows
+        )
+
+        lines = [
+            f"Pivot report for account {formatted_customer_id}, {start.isoformat()} to {end.isoformat()} "
+            f"({table.level} table, {len(table)} rows, {source})"
+        ]
+        if filter_values:
+            lines.append("Filters: " + ", ".join(f"{dimension}={value}" for dimension, value in filter_values.items()))
+        lines.append("-" * 80)
+        lines.extend(pivot_table.format_pivot(cells, row_count, max_rows))
+        return "\n".join(lines)
+
+    except Exception as e:
+        return f"Error building pivot report: {str(e)}"
+
+@tool()
+async def load_sql_table(
+    customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'"),
+    table_name: str = Field(description="Name of the local table: a named table (campaigns, ad_groups, assets, campaign_assets, ad_group_assets, campaign_metrics, ad_group_metrics) or your own name"),
+    query: str = Field(default="", description="GAQL query whose rows fill the table; leave empty to load a named table")
+) -> str:
+    """
+    Load the rows of a GAQL query into a local SQL table for run_sql().
+
+    GAQL cannot join resources; load each resource into its own table, then join and
+    aggregate them with run_sql(). Loading a table again replaces it. Named tables
+    need no query; campaign_metrics and ad_group_metrics hold the last 30 days by date.
+
+    Nested fields become snake_case columns: campaign.id -> campaign_id,
+    metrics.cost_micros -> metrics_cost_micros. Every table has a customer_id column.
+
+    Args:
+        customer_id: The Google Ads customer ID as a string (10 digits, no dashes)
+        table_name: Table to create or replace (lowercase letters, digits, underscores)
+        query: GAQL query (default: the named table's query)
+
+    Returns:
+        The number of rows loaded and the table's columns with their types
+
+    Example:
+        customer_id: "1234567890"
+        table_name: "campaigns"
+    """
+    import local_sql
+
+    table_name = table_name.strip().lower()
+    query = query.strip() or local_sql.NAMED_QUERIES.get(table_name, "")
+    if not query:
+        return (
+            f"No query given and '{table_name}' is not a named table. "
+            f"Named tables: {', '.join(local_sql.NAMED_QUERIES)}"
+        )
+    if not local_sql.TABLE_NAME_PATTERN.match(table_name):
+        return f"Invalid table name '{table_name}'. Use lowercase letters, digits and underscores."
+
+    try:
+        creds = get_credentials()
+        headers = get_headers(creds)
+
+        formatted_customer_id = format_customer_id(customer_id)
+        try:
+            rows = await asyncio.to_thread(search_all, formatted_customer_id, query, headers)
+        except GoogleAdsApiError as e:
+            return f"Error loading table: {e.text}"
+
+        database = local_database()
+        columns = await asyncio.to_thread(database.load, table_name, formatted_customer_id, query, rows)
+        lines = [f"Loaded {len(rows)} rows from account {formatted_customer_id} into table {table_name} ({database.engine})."]
+        lines.append("Columns: " + ", ".join(f"{column} {sql_type}" for column, sql_type in columns))
+        return "\n".join(lines)
+
+    except Exception as e:
+        return f"Error loading table: {str(e)}"
+
+@tool()
+async def run_sql(
+    sql: str = Field(description="SELECT statement over tables loaded with load_sql_table"),
+    max_rows: int = Field(default=200, description="Maximum number of result rows to return (1-5000)"),
+    format: str = Field(default="table", description="Output format: 'table' or 'csv'")
+) -> str:
+    """
+    Run a SQL SELECT over the local tables loaded with load_sql_table(), without API calls.
+
+    Use this for joins and aggregations GAQL cannot do, e.g. spend per asset across
+    campaigns. The engine is DuckDB when installed and SQLite otherwise; both accept
+    standard SELECT, JOIN, GROUP BY, ORDER BY and WITH. Cost columns are in micros.
+
+    Args:
+        sql: The SELECT statement
+        max_rows: Rows to return (default: 200)
+        format: "table" (default) or "csv"
+
+    Returns:
+        The result rows, or the loaded tables and their columns if the statement fails
+
+    Example:
+        sql: "SELECT c.campaign_name, SUM(m.metrics_cost_micros) / 1e6 AS cost
+              FROM campaign_metrics m JOIN campaigns c USING (campaign_id)
+              GROUP BY 1 ORDER BY 2 DESC"
+    """
+    if format not in ("table", "csv"):
+        return f"Unknown format '{format}'. Use 'table' or 'csv'."
+    max_rows = max(1, min(int(max_rows), 5000))
+
+    try:
+        import local_sql
+
+        database = local_database()
+        try:
+            columns, rows, truncated = await asyncio.to_thread(database.query, sql, max_rows)
+        except Exception as e:
+            lines = [f"Error running SQL: {str(e)}"]
+            lines.extend(["", "Loaded tables:"] + (database.describe() or ["(none, use load_sql_table first)"]))
+            return "\n".join(lines)
+
+        if not rows:
+            return "The query returned no rows."
+        output = local_sql.format_rows(columns, rows, format)
+        if truncated:
+            output += f"\n... more rows not shown (max_rows={max_rows})"
+        return output
+
+    except Exception as e:
+        return f"Error running SQL: {str(e)}"
+
+@tool()
+async def list_sql_tables() -> str:
+    """
+    List the local tables loaded with load_sql_table() and their columns.
+
+    Returns:
+        One entry per table with its account, row count, load time and columns
+    """
+    import local_sql
+
+    lines = local_database().describe()
+    if not lines:
+        return f"No tables loaded. Named tables for load_sql_table: {', '.join(local_sql.NAMED_QUERIES)}"
+    return "\n".join(["Local SQL tables:"] + lines)
+
+async def report_progress(progress: float, total: Optional[float], message: str) -> None:
+    """Send an MCP progress notification for the current request if the client asked for them."""
+    try:
+        await mcp.get_context().report_progress(progress, total, message)
+    except (LookupError, ValueError):
+        pass
+
+def fetch_report_page(customer_id: str, query: str, page_token: Optional[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of a background report job; credentials are reloaded so long jobs survive token expiry."""
+    headers = get_headers(get_credentials())
+    response = search_page(customer_id, query, headers, page_token)
+    return response.get('results', []), response.get('nextPageToken')
+
+@tool()
+async def start_report(
+    customer_ids: str = Field(description="Comma-separated Google Ads customer IDs (10 digits, no dashes)"),
+    query: str = Field(description="GAQL query to run for every account"),
+    include_sub_accounts: bool = Field(default=False, description="Also run the query for every non-manager account below the given manager accounts")
+) -> str:
+    """
+    Start a large report in the background and return its job ID immediately.
 
-@mcp.tool()
+    Use this instead of run_gaql for pulls that may take minutes, such as all search
+    terms for 90 days across a manager account. The query runs for every account,
+    several accounts at a time, with all pages fetched and rows spooled to a local
+    file. Follow up with get_report_status(job_id) and get_report_result(job_id).
+
+    Args:
+        customer_ids: Accounts to query, comma-separated
+        query: The GAQL query
+        include_sub_accounts: Expand manager accounts to the client accounts below them (default: false)
+
+    Returns:
+        The job ID and the number of accounts it covers
+
+    Example:
+        customer_ids: "1234567890"
+        query: "SELECT search_term_view.search_term, metrics.clicks FROM search_term_view WHERE segments.date DURING LAST_30_DAYS"
+        include_sub_accounts: true
+    """
+    requested = [format_customer_id(customer_id) for customer_id in split_list(customer_ids)]
+    if not requested:
+        return "At least one customer ID is required."
+    if not query.strip():
+        return "A GAQL query is required."
+
+    try:
+        accounts = requested
+        if include_sub_accounts:
+            headers = get_headers(get_credentials())
+            try:
+                index = await crawl_hierarchy(headers)
+            except GoogleAdsApiError as e:
+                return f"Error accessing accounts: {e.text}"
+            accounts = []
+            for customer_id in requested:
+                below = [
+                    account for account in index.subtree(customer_id)
+                    if not index.nodes[account]["manager"]
+                ]
+                accounts.extend(below or [customer_id])
+            accounts = list(dict.fromkeys(accounts))
+
+        job = job_manager().start(accounts, query, fetch_report_page)
+        return (
+            f"Started job {job.job_id} for {len(accounts)} account(s).\n"
+            f"Check progress with get_report_status(job_id=\"{job.job_id}\") and read rows with "
+            f"get_report_result(job_id=\"{job.job_id}\")."
+        )
+
+    except Exception as e:
+        return f"Error starting report: {str(e)}"
+
+@tool()
+async def get_report_status(
+    job_id: str = Field(description="Job ID returned by start_report"),
+    wait_seconds: int = Field(default=0, description="Wait up to this many seconds (max 60) for the job to finish, sending progress notifications meanwhile")
+) -> str:
+    """
+    Show the progress of a background report job.
+
+    With wait_seconds, the call returns as soon as the job finishes or the time is up,
+    and sends MCP progress notifications (accounts done out of total) while it waits.
+
+    Args:
+        job_id: The job ID from start_report
+        wait_seconds: Seconds to wait for completion (default: 0, return at once)
+
+    Returns:
+        Status (queued, running, done, failed, cancelled or interrupted), accounts done,
+        rows spooled, elapsed time and per-account errors
+    """
+    import report_jobs
+
+    manager = job_manager()
+    job = manager.get(job_id.strip())
+    if job is None:
+        return f"Unknown job '{job_id}'."
+
+    deadline = time.monotonic() + max(0, min(int(wait_seconds), 60))
+    while job.status not in report_jobs.FINISHED and time.monotonic() < deadline:
+        await report_progress(job.accounts_done, len(job.customer_ids), f"{job.rows:,} rows")
+        await asyncio.sleep(0.5)
+        # A job run by another worker process is a snapshot of its state file, so read it again
+        job = await asyncio.to_thread(manager.get, job.job_id) or job
+    return "\n".join(report_jobs.describe(job))
+
+@tool()
+async def get_report_result(
+    job_id: str = Field(description="Job ID returned by start_report"),
+    offset: int = Field(default=0, description="Index of the first row to return"),
+    limit: int = Field(default=100, description="Number of rows to return (1-1000)"),
+    format: str = Field(default="table", description="Output format: 'table', 'json', 'json_compact' or 'csv'")
+) -> str:
+    """
+    Read a page of the rows a background report job has spooled.
+
+    Rows can be read while the job is still running; rows of several accounts carry
+    customer.id. Page through large results with offset and limit.
+
+    Args:
+        job_id: The job ID from start_report
+        offset: First row (default: 0)
+        limit: Rows per page (default: 100)
+        format: "table" (default), "json", "json_compact" or "csv"
+
+    Returns:
+        The rows with a line naming the range shown and the next offset, if any
+    """
+    import gaql_format
+
+    if format not in gaql_format.OUTPUT_FORMATS:
+        return f"Unknown format '{format}'. Use one of: {', '.join(gaql_format.OUTPUT_FORMATS)}"
+    offset = max(0, int(offset))
+    limit = max(1, min(int(limit), 1000))
+
+    try:
+        manager = job_manager()
+        job = manager.get(job_id.strip())
+        if job is None:
+            return f"Unknown job '{job_id}'."
+        rows = await asyncio.to_thread(manager.read, job, offset, limit)
+        if not rows:
+            return f"No rows at offset {offset} (job {job.job_id} is {job.status} with {job.rows:,} rows)."
+
+        header = f"Rows {offset}-{offset + len(rows) - 1} of {job.rows:,} (job {job.job_id} is {job.status})"
+        customer_id = job.customer_ids[0] if len(job.customer_ids) == 1 else "multiple accounts"
+        output = gaql_format.format_results({"results": rows}, format, customer_id)
+        lines = [header, output]
+        if offset + len(rows) < job.rows:
+            lines.append(f"Next page: get_report_result(job_id=\"{job.job_id}\", offset={offset + len(rows)})")
+        return "\n".join(lines)
+
+    except Exception as e:
+        return f"Error reading report: {str(e)}"
+
+@tool()
+async def cancel_report(
+    job_id: str = Field(description="Job ID returned by start_report")
+) -> str:
+    """
+    Stop a running background report job; rows spooled so far stay readable.
+
+    Args:
+        job_id: The job ID from start_report
+
+    Returns:
+        Whether the job was cancelled
+    """
+    if job_manager().cancel(job_id.strip()):
+        return f"Job {job_id} is being cancelled."
+    return f"Job '{job_id}' is not running in this server."
+
+@tool()
 async def get_ad_creatives(
     customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'")
 ) -> str:
@@ -649,15 +1976,11 @@ async def get_ad_creatives(
         headers = get_headers(creds)
         
         formatted_customer_id = format_customer_id(customer_id)
-        url = f"https://googleads.googleapis.com/{API_VERSION}/customers/{formatted_customer_id}/googleAds:search"
-        
-        payload = {"query": query}
-        response = requests.post(url, headers=headers, json=payload)
-        
-        if response.status_code != 200:
-            return f"Error retrieving ad creatives: {response.text}"
+        try:
+            results = await asyncio.to_thread(search_page, formatted_customer_id, query, headers)
+        except GoogleAdsApiError as e:
+            return f"Error retrieving ad creatives: {e.text}"
         
-        results = response.json()
         if not results.get('results'):
             return "No ad creatives found for this customer ID."
         
@@ -702,65 +2025,45 @@ async def get_ad_creatives(
     except Exception as e:
         return f"Error retrieving ad creatives: {str(e)}"
 
-@mcp.tool()
+@tool()
 async def get_account_currency(
     customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'")
 ) -> str:
     """
     Retrieve the default currency code used by the Google Ads account.
     
-    IMPORTANT: Run this first before analyzing cost data to understand which currency
-    the account uses. Cost values are always displayed in the account's currency.
+    Cost values are always displayed in the account's currency. list_accounts()
+    already shows each account's currency; use this for accounts not listed there.
+    Answers come from the account metadata cache when possible.
     
     Args:
         customer_id: The Google Ads customer ID as a string (10 digits, no dashes)
     
     Returns:
-        The account's default currency code (e.g., 'USD', 'EUR', 'GBP')
+        The account's default currency code (e.g., 'USD', 'EUR', 'GBP') and time zone
         
     Example:
         customer_id: "1234567890"
-    """
-    query = """
-        SELECT
-            customer.id,
-            customer.currency_code
-        FROM customer
-        LIMIT 1
-    """
-    
-    try:
-        creds = get_credentials()
-        
-        # Force refresh if needed
-        if not creds.valid:
-            logger.info("Credentials not valid, attempting refresh...")
-            if hasattr(creds, 'refresh_token') and creds.refresh_token:
-                creds.refresh(Request())
-                logger.info("Credentials refreshed successfully")
-            else:
-                raise ValueError("Invalid credentials and no refresh token available")
-        
-        headers = get_headers(creds)
-        
+    """
+    try:
         formatted_customer_id = format_customer_id(customer_id)
-        url = f"https://googleads.googleapis.com/{API_VERSION}/customers/{formatted_customer_id}/googleAds:search"
+        metadata = account_cache.get(formatted_customer_id)
+        metrics.CACHE_REQUESTS.inc(cache="account", result="hit" if metadata is not None else "miss")
         
-        payload = {"query": query}
-        response = requests.post(url, headers=headers, json=payload)
-        
-        if response.status_code != 200:
-            return f"Error retrieving account currency: {response.text}"
+        if metadata is None:
+            headers = get_headers(get_credentials())
+            try:
+                accounts = await asyncio.to_thread(load_account_metadata, formatted_customer_id, headers)
+            except GoogleAdsApiError as e:
+                return f"Error retrieving account currency: {e.text}"
+            metadata = accounts.get(formatted_customer_id)
         
-        results = response.json()
-        if not results.get('results'):
+        if not metadata:
             return "No account information found for this customer ID."
         
-        # Extract the currency code from the results
-        customer = results['results'][0].get('customer', {})
-        currency_code = customer.get('currencyCode', 'Not specified')
-        
-        return f"Account {formatted_customer_id} uses currency: {currency_code}"
+        currency_code = metadata.get('currency') or 'Not specified'
+        time_zone = metadata.get('time_zone') or 'Not specified'
+        return f"Account {formatted_customer_id} uses currency: {currency_code} (time zone: {time_zone})"
     
     except Exception as e:
         logger.error(f"Error retrieving account currency: {str(e)}")
@@ -831,8 +2134,9 @@ def google_ads_workflow() -> str:
     1. First, let's list all the accounts you have access to:
        - Run the `list_accounts()` tool to get available account IDs
     
-    2. Before analyzing cost data, let's check which currency the account uses:
-       - Run `get_account_currency(customer_id="ACCOUNT_ID")` with your selected account
+    2. Before analyzing cost data, check which currency the account uses:
+       - It is shown next to each account in the `list_accounts()` output
+       - For other accounts, run `get_account_currency(customer_id="ACCOUNT_ID")`
     
     3. Now we can explore the account data:
        - For campaign performance: `get_campaign_performance(customer_id="ACCOUNT_ID", days=30)`
@@ -841,6 +2145,8 @@ def google_ads_workflow() -> str:
     
     4. For custom queries, use the GAQL query tool:
        - `run_gaql(customer_id="ACCOUNT_ID", query="YOUR_QUERY", format="table")`
+       - When you need several related queries, send them together with
+         `run_gaql_batch(queries=[{"customer_id": "ACCOUNT_ID", "query": "QUERY_1"}, ...])`
     
     5. Let me know if you have specific questions about:
        - Campaign performance
@@ -918,7 +2224,7 @@ def gaql_help() -> str:
     - Check the account currency before analyzing cost data
     """
 
-@mcp.tool()
+@tool()
 async def get_image_assets(
     customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'"),
     limit: int = Field(default=50, description="Maximum number of image assets to return")
@@ -965,15 +2271,11 @@ async def get_image_assets(
         headers = get_headers(creds)
         
         formatted_customer_id = format_customer_id(customer_id)
-        url = f"https://googleads.googleapis.com/{API_VERSION}/customers/{formatted_customer_id}/googleAds:search"
-        
-        payload = {"query": query}
-        response = requests.post(url, headers=headers, json=payload)
-        
-        if response.status_code != 200:
-            return f"Error retrieving image assets: {response.text}"
+        try:
+            results = await asyncio.to_thread(search_page, formatted_customer_id, query, headers)
+        except GoogleAdsApiError as e:
+            return f"Error retrieving image assets: {e.text}"
         
-        results = response.json()
         if not results.get('results'):
             return "No image assets found for this customer ID."
         
@@ -1006,7 +2308,296 @@ async def get_image_assets(
     except Exception as e:
         return f"Error retrieving image assets: {str(e)}"
 
-@mcp.tool()
+# Leading "magic" bytes of the image formats Google Ads serves, mapped to file extensions
+IMAGE_SIGNATURES = [
+    (b'\xff\xd8\xff', '.jpg'),
+    (b'\x89PNG\r\n\x1a\n', '.png'),
+    (b'GIF87a', '.gif'),
+    (b'GIF89a', '.gif'),
+]
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_TIMEOUT = 60
+IMAGE_MANIFEST_NAME = "manifest.jsonl"
+
+def detect_image_extension(head: bytes, content_type: Optional[str] = None) -> str:
+    """
+    Work out the real file extension of an image from its first bytes.
+
+    Falls back to the Content-Type header and finally to '.bin' when the
+    format cannot be recognised.
+    """
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return '.webp'
+
+    if content_type:
+        import mimetypes
+        extension = mimetypes.guess_extension(content_type.split(';')[0].strip())
+        if extension:
+            return '.jpg' if extension in ('.jpe', '.jpeg') else extension
+
+    return '.bin'
+
+def resolve_output_dir(output_dir: str) -> Path:
+    """
+    Resolve and create a download directory, keeping it under the current working directory.
+
+    Paths outside the working directory (e.g. "../../../etc") fall back to ./ad_images
+    to prevent path traversal.
+    """
+    # Get the base directory (current working directory)
+    base_dir = Path.cwd()
+    # Resolve the output directory to an absolute path
+    resolved_output_dir = Path(output_dir).resolve()
+
+    # Ensure the resolved path is within or under the current working directory
+    try:
+        resolved_output_dir.relative_to(base_dir)
+    except ValueError:
+        # If the path is not relative to base_dir, use the default safe directory
+        resolved_output_dir = base_dir / "ad_images"
+        logger.warning(f"Invalid output directory '{output_dir}' - using default './ad_images'")
+
+    # Create output directory if it doesn't exist
+    resolved_output_dir.mkdir(parents=True, exist_ok=True)
+    return resolved_output_dir
+
+@tracing.traced("google_ads.image_download")
+def stream_image_download(image_url: str, dest_dir: Path, partial_name: str) -> Dict[str, Any]:
+    """
+    Stream an image to a temporary file in dest_dir, hashing it on the way.
+
+    The body is written in DOWNLOAD_CHUNK_SIZE chunks so memory use stays flat
+    regardless of image size.
+
+    Returns:
+        Dict with the temporary 'path', hex 'sha256', detected 'extension' and 'size' in bytes
+
+    Raises:
+        ImageDownloadError: If the image URL does not return HTTP 200
+    """
+    partial_path = dest_dir / partial_name
+    digest = hashlib.sha256()
+    size = 0
+    extension = None
+
+    with http_session().get(image_url, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        if response.status_code != 200:
+            raise ImageDownloadError(response.status_code, image_url)
+
+        try:
+            with open(partial_path, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if not chunk:
+                        continue
+                    if extension is None:
+                        extension = detect_image_extension(chunk, response.headers.get('content-type'))
+                    digest.update(chunk)
+                    size += len(chunk)
+                    f.write(chunk)
+                    metrics.DOWNLOAD_BYTES.inc(len(chunk))
+        except BaseException:
+            partial_path.unlink(missing_ok=True)
+            raise
+
+    return {
+        'path': partial_path,
+        'sha256': digest.hexdigest(),
+        'extension': extension or '.bin',
+        'size': size
+    }
+
+def load_image_manifest(store_dir: Path) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the asset ID -> stored file mapping of a content-addressed image store.
+
+    Entries whose file no longer exists are dropped so they get downloaded again.
+    """
+    manifest_path = store_dir / IMAGE_MANIFEST_NAME
+    manifest = {}
+    if not manifest_path.exists():
+        return manifest
+
+    with open(manifest_path, 'r') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # A partially written last line from an interrupted run
+                continue
+            manifest[str(entry['asset_id'])] = entry
+
+    return {asset_id: entry for asset_id, entry in manifest.items() if (store_dir / entry['file']).exists()}
+
+def download_image_to_store(asset_id: str, image_url: str, store_dir: Path) -> Dict[str, Any]:
+    """
+    Download one image into a content-addressed store named <sha256><extension>.
+
+    Returns:
+        Manifest entry for the asset, with 'deduplicated' set when identical
+        content was already present in the store
+    """
+    download = stream_image_download(image_url, store_dir, f".{asset_id}.part")
+    filename = f"{download['sha256']}{download['extension']}"
+    file_path = store_dir / filename
+
+    deduplicated = file_path.exists()
+    if deduplicated:
+        download['path'].unlink()
+    else:
+        os.replace(download['path'], file_path)
+
+    return {
+        'asset_id': asset_id,
+        'file': filename,
+        'sha256': download['sha256'],
+        'size': download['size'],
+        'url': image_url,
+        'deduplicated': deduplicated
+    }
+
+@tool()
+async def download_image_assets(
+    customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'"),
+    asset_ids: Optional[List[str]] = Field(default=None, description="Image asset IDs to download (leave empty to download every image asset in the account)"),
+    output_dir: str = Field(default="./ad_images", description="Directory of the content-addressed image store"),
+    max_concurrency: int = Field(default=8, description="Maximum number of images downloaded in parallel (1-32)")
+) -> str:
+    """
+    Download many image assets at once into a content-addressed image store.
+
+    All download URLs are resolved with a single GAQL query, then images are
+    streamed to disk in parallel. Each file is named after the SHA-256 of its
+    content with the extension of its real format, so identical images are stored
+    once. Assets already in the store are skipped, which makes an interrupted
+    backup resumable by simply running the command again.
+
+    RECOMMENDED WORKFLOW:
+    1. First run list_accounts() to get available account IDs
+    2. Optionally run get_image_assets() to pick specific asset IDs
+    3. Run this command to back up the images
+
+    Args:
+        customer_id: The Google Ads customer ID as a string (10 digits, no dashes)
+        asset_ids: Optional list of image asset IDs (default: all image assets)
+        output_dir: Directory of the image store (default: ./ad_images)
+        max_concurrency: Number of parallel downloads (default: 8)
+
+    Returns:
+        Summary of downloaded, skipped, deduplicated and failed assets
+
+    Example:
+        customer_id: "1234567890"
+        asset_ids: ["12345", "67890"]
+        output_dir: "./ad_image_backup"
+    """
+    where_clause = "asset.type = 'IMAGE'"
+    if asset_ids:
+        id_list = [''.join(char for char in str(asset_id) if char.isdigit()) for asset_id in asset_ids]
+        id_list = [asset_id for asset_id in dict.fromkeys(id_list) if asset_id]
+        if not id_list:
+            return "No valid asset IDs provided."
+        where_clause += f" AND asset.id IN ({', '.join(id_list)})"
+
+    query = f"""
+        SELECT
+            asset.id,
+            asset.image_asset.full_size.url
+        FROM
+            asset
+        WHERE
+            {where_clause}
+    """
+
+    try:
+        creds = get_credentials()
+        headers = get_headers(creds)
+        formatted_customer_id = format_customer_id(customer_id)
+
+        try:
+            rows = await asyncio.to_thread(search_all, formatted_customer_id, query, headers)
+        except GoogleAdsApiError as e:
+            return f"Error retrieving image assets: {e.text}"
+
+        if not rows:
+            return "No image assets found for this customer ID."
+
+        try:
+            store_dir = resolve_output_dir(output_dir)
+        except Exception as e:
+            return f"Error creating output directory: {str(e)}"
+
+        manifest = load_image_manifest(store_dir)
+        pending = []
+        missing_url = []
+        skipped = 0
+        for row in rows:
+            asset = row.get('asset', {})
+            asset_id = str(asset.get('id'))
+            image_url = asset.get('imageAsset', {}).get('fullSize', {}).get('url')
+            if asset_id in manifest:
+                skipped += 1
+            elif not image_url:
+                missing_url.append(asset_id)
+            else:
+                pending.append((asset_id, image_url))
+
+        semaphore = asyncio.Semaphore(max(1, min(int(max_concurrency), 32)))
+        manifest_path = store_dir / IMAGE_MANIFEST_NAME
+
+        async def download(asset_id: str, image_url: str) -> Dict[str, Any]:
+            async with metrics.timed_wait(semaphore, "download_image_assets"):
+                entry = await asyncio.to_thread(download_image_to_store, asset_id, image_url, store_dir)
+            # Record each completed download immediately so an interrupted run can resume
+            with open(manifest_path, 'a') as f:
+                f.write(json.dumps(entry) + "\n")
+            return entry
+
+        outcomes = await asyncio.gather(
+            *(download(asset_id, image_url) for asset_id, image_url in pending),
+            return_exceptions=True
+        )
+
+        downloaded = 0
+        deduplicated = 0
+        total_bytes = 0
+        failures = []
+        for (asset_id, _), outcome in zip(pending, outcomes):
+            if isinstance(outcome, BaseException):
+                failures.append(f"{asset_id}: {str(outcome)}")
+            elif outcome['deduplicated']:
+                deduplicated += 1
+            else:
+                downloaded += 1
+                total_bytes += outcome['size']
+
+        output_lines = [f"Image Asset Download for Customer ID {formatted_customer_id}:"]
+        output_lines.append("=" * 80)
+        output_lines.append(f"Image store: {store_dir}")
+        output_lines.append(f"Assets resolved: {len(rows)}")
+        output_lines.append(f"Downloaded: {downloaded} ({total_bytes / 1024:.2f} KB)")
+        output_lines.append(f"Identical content already stored: {deduplicated}")
+        output_lines.append(f"Skipped (already downloaded): {skipped}")
+
+        if missing_url:
+            output_lines.append(f"No download URL: {len(missing_url)} ({', '.join(missing_url[:10])})")
+
+        if failures:
+            output_lines.append(f"Failed: {len(failures)}")
+            for failure in failures[:10]:
+                output_lines.append(f"  - {failure}")
+            if len(failures) > 10:
+                output_lines.append(f"  - ... and {len(failures) - 10} more")
+
+        output_lines.append(f"Asset ID to file mapping: {manifest_path}")
+        return "\n".join(output_lines)
+
+    except Exception as e:
+        return f"Error downloading image assets: {str(e)}"
+
+@tool()
 async def download_image_asset(
     customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'"),
     asset_id: str = Field(description="The ID of the image asset to download"),
@@ -1054,15 +2645,11 @@ async def download_image_asset(
         headers = get_headers(creds)
         
         formatted_customer_id = format_customer_id(customer_id)
-        url = f"https://googleads.googleapis.com/{API_VERSION}/customers/{formatted_customer_id}/googleAds:search"
-        
-        payload = {"query": query}
-        response = requests.post(url, headers=headers, json=payload)
-        
-        if response.status_code != 200:
-            return f"Error retrieving image asset: {response.text}"
+        try:
+            results = await asyncio.to_thread(search_page, formatted_customer_id, query, headers)
+        except GoogleAdsApiError as e:
+            return f"Error retrieving image asset: {e.text}"
         
-        results = response.json()
         if not results.get('results'):
             return f"No image asset found with ID {asset_id}"
         
@@ -1076,46 +2663,160 @@ async def download_image_asset(
         
         # Validate and sanitize the output directory to prevent path traversal
         try:
-            # Get the base directory (current working directory)
-            base_dir = Path.cwd()
-            # Resolve the output directory to an absolute path
-            resolved_output_dir = Path(output_dir).resolve()
-            
-            # Ensure the resolved path is within or under the current working directory
-            # This prevents path traversal attacks like "../../../etc"
-            try:
-                resolved_output_dir.relative_to(base_dir)
-            except ValueError:
-                # If the path is not relative to base_dir, use the default safe directory
-                resolved_output_dir = base_dir / "ad_images"
-                logger.warning(f"Invalid output directory '{output_dir}' - using default './ad_images'")
-            
-            # Create output directory if it doesn't exist
-            resolved_output_dir.mkdir(parents=True, exist_ok=True)
-            
+            resolved_output_dir = resolve_output_dir(output_dir)
         except Exception as e:
             return f"Error creating output directory: {str(e)}"
-        
-        # Download the image
-        image_response = requests.get(image_url)
-        if image_response.status_code != 200:
-            return f"Failed to download image: HTTP {image_response.status_code}"
-        
+
+        # Stream the image to disk
+        try:
+            download = await asyncio.to_thread(
+                stream_image_download, image_url, resolved_output_dir, f".{asset_id}.part"
+            )
+        except ImageDownloadError as e:
+            return f"Failed to download image: HTTP {e.status_code}"
+
         # Clean the filename to be safe for filesystem
         safe_name = ''.join(c for c in asset_name if c.isalnum() or c in ' ._-')
-        filename = f"{asset_id}_{safe_name}.jpg"
+        filename = f"{asset_id}_{safe_name}{download['extension']}"
         file_path = resolved_output_dir / filename
-        
-        # Save the image
-        with open(file_path, 'wb') as f:
-            f.write(image_response.content)
-        
+
+        # Move the completed download into place
+        os.replace(download['path'], file_path)
+
         return f"Successfully downloaded image asset {asset_id} to {file_path}"
     
     except Exception as e:
         return f"Error downloading image asset: {str(e)}"
 
-@mcp.tool()
+@tool()
+async def audit_image_assets(
+    output_dir: str = Field(default="./ad_images", description="Directory containing downloaded image assets"),
+    max_distance: int = Field(default=6, description="Maximum perceptual hash distance (0-64 bits) for two images to count as near-duplicates")
+) -> str:
+    """
+    Audit downloaded image assets for duplicates, near-duplicates and wrong aspect ratios.
+
+    Works entirely on local files produced by download_image_assets() or
+    download_image_asset(); nothing is downloaded again. For each image the real
+    format, pixel dimensions, byte size and a perceptual hash are computed in a
+    process pool and cached in an index keyed by content hash, so re-running an
+    audit only processes images added since the last run.
+
+    RECOMMENDED WORKFLOW:
+    1. First run download_image_assets() for each account to audit into the same directory
+    2. Then run this command on that directory
+
+    Args:
+        output_dir: Directory containing the downloaded images (default: ./ad_images)
+        max_distance: Near-duplicate threshold in differing hash bits (default: 6)
+
+    Returns:
+        Audit report with format breakdown, duplicate groups and aspect ratio issues
+
+    Example:
+        output_dir: "./ad_image_backup"
+        max_distance: 4
+    """
+    import image_analysis
+
+    try:
+        try:
+            store_dir = resolve_output_dir(output_dir)
+        except Exception as e:
+            return f"Error opening image directory: {str(e)}"
+
+        image_files = image_analysis.list_image_files(store_dir)
+        if not image_files:
+            return f"No downloaded images found in {store_dir}. Run download_image_assets() first."
+
+        # Map files back to asset IDs: the bulk store keeps a manifest, single
+        # downloads are named <asset_id>_<name><ext>
+        assets_by_file = {}
+        for asset_id, entry in load_image_manifest(store_dir).items():
+            assets_by_file.setdefault(entry['file'], []).append(asset_id)
+        for path in image_files:
+            if path.name not in assets_by_file and '_' in path.name:
+                prefix = path.name.split('_', 1)[0]
+                if prefix.isdigit():
+                    assets_by_file[path.name] = [prefix]
+
+        analyses, analyzed_count = await asyncio.to_thread(
+            image_analysis.analyze_images, image_files, store_dir / image_analysis.INDEX_NAME, cpu_pool()
+        )
+        metrics.CACHE_REQUESTS.inc(len(analyses) - analyzed_count, cache="image_index", result="hit")
+        metrics.CACHE_REQUESTS.inc(analyzed_count, cache="image_index", result="miss")
+
+        def describe(path: str) -> str:
+            name = Path(path).name
+            asset_ids = assets_by_file.get(name)
+            return f"asset {', '.join(asset_ids)} ({name})" if asset_ids else name
+
+        output_lines = [f"Image Asset Audit for {store_dir}:"]
+        output_lines.append("=" * 80)
+        output_lines.append(f"Images: {len(analyses)} ({analyzed_count} newly analyzed, {len(analyses) - analyzed_count} from cache)")
+
+        formats = {}
+        total_bytes = 0
+        for analysis in analyses.values():
+            formats[analysis['format'] or 'Unknown'] = formats.get(analysis['format'] or 'Unknown', 0) + 1
+            total_bytes += analysis['bytes']
+        output_lines.append(f"Total size: {total_bytes / 1024:.2f} KB")
+        output_lines.append("Formats: " + ", ".join(f"{name}: {count}" for name, count in sorted(formats.items())))
+
+        # Exact duplicates: several files or asset IDs sharing the same content
+        files_by_hash = {}
+        for path, analysis in analyses.items():
+            files_by_hash.setdefault(analysis['sha256'], []).append(path)
+        exact_groups = [
+            paths for paths in files_by_hash.values()
+            if len(paths) > 1 or len(assets_by_file.get(Path(paths[0]).name, [])) > 1
+        ]
+
+        output_lines.append(f"\nExact duplicates: {len(exact_groups)} group(s)")
+        for paths in exact_groups[:20]:
+            output_lines.append(f"  - {'; '.join(describe(path) for path in paths)}")
+
+        # Near duplicates by perceptual hash, one representative file per content hash
+        representatives = {analysis['sha256']: path for path, analysis in analyses.items()}
+        phashes = {sha256: analyses[path]['phash'] for sha256, path in representatives.items() if analyses[path]['phash']}
+        if image_analysis.Image is not None:
+            near_duplicates = image_analysis.find_near_duplicates(phashes, max(0, min(int(max_distance), 64)))
+            output_lines.append(f"\nNear duplicates (distance <= {max_distance}): {len(near_duplicates)} pair(s)")
+            for sha_a, sha_b, distance in near_duplicates[:20]:
+                output_lines.append(f"  - {describe(representatives[sha_a])} ~ {describe(representatives[sha_b])} (distance {distance})")
+            if len(near_duplicates) > 20:
+                output_lines.append(f"  - ... and {len(near_duplicates) - 20} more")
+        else:
+            output_lines.append("\nNear duplicates: not available (install Pillow to compute perceptual hashes)")
+
+        # Aspect ratios outside the Google Ads recommendations; files whose size could not be read are listed apart
+        wrong_ratio = [
+            (path, analysis) for path, analysis in analyses.items()
+            if analysis['width'] and analysis['height'] and not analysis['aspect_ratio_ok']
+        ]
+        output_lines.append(f"\nOff-spec aspect ratios: {len(wrong_ratio)}")
+        for path, analysis in wrong_ratio[:20]:
+            output_lines.append(
+                f"  - {describe(path)}: {analysis['width']} x {analysis['height']} px "
+                f"(closest: {analysis['aspect_ratio']})"
+            )
+        if len(wrong_ratio) > 20:
+            output_lines.append(f"  - ... and {len(wrong_ratio) - 20} more")
+
+        unknown_size = [path for path, analysis in analyses.items() if not analysis['width'] or not analysis['height']]
+        if unknown_size:
+            output_lines.append(f"\nUnknown dimensions: {len(unknown_size)}")
+            for path in unknown_size[:20]:
+                output_lines.append(f"  - {describe(path)}")
+            if len(unknown_size) > 20:
+                output_lines.append(f"  - ... and {len(unknown_size) - 20} more")
+
+        return "\n".join(output_lines)
+
+    except Exception as e:
+        return f"Error auditing image assets: {str(e)}"
+
+@tool()
 async def get_asset_usage(
     customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'"),
     asset_id: str = Field(default=None, description="Optional: specific asset ID to look up (leave empty to get all image assets)"),
@@ -1179,9 +2880,11 @@ async def get_asset_usage(
         LIMIT 500
     """
 
-    # Also try ad_group_asset for ad group level information
+    # And ad_group_asset for ad group level information
     ad_group_query = f"""
         SELECT
+            campaign.id,
+            campaign.name,
             ad_group.id,
             ad_group.name,
             asset.id,
@@ -1193,43 +2896,41 @@ async def get_asset_usage(
             {where_clause}
         LIMIT 500
     """
-    
+
     try:
         creds = get_credentials()
         headers = get_headers(creds)
-        
+
         formatted_customer_id = format_customer_id(customer_id)
-        
-        # First get the assets
-        url = f"https://googleads.googleapis.com/{API_VERSION}/customers/{formatted_customer_id}/googleAds:search"
-        payload = {"query": assets_query}
-        assets_response = requests.post(url, headers=headers, json=payload)
-        
-        if assets_response.status_code != 200:
-            return f"Error retrieving assets: {assets_response.text}"
-        
-        assets_results = assets_response.json()
-        if not assets_results.get('results'):
+
+        # Run the three queries concurrently so the latency is that of a single round trip
+        assets_results, assoc_results, ad_group_results = await asyncio.gather(
+            asyncio.to_thread(search_all, formatted_customer_id, assets_query, headers),
+            asyncio.to_thread(search_all, formatted_customer_id, associations_query, headers),
+            asyncio.to_thread(search_all, formatted_customer_id, ad_group_query, headers),
+            return_exceptions=True
+        )
+
+        if isinstance(assets_results, GoogleAdsApiError):
+            return f"Error retrieving assets: {assets_results.text}"
+        if isinstance(assoc_results, GoogleAdsApiError):
+            return f"Error retrieving asset associations: {assoc_results.text}"
+        if isinstance(ad_group_results, GoogleAdsApiError):
+            return f"Error retrieving ad group asset associations: {ad_group_results.text}"
+        for outcome in (assets_results, assoc_results, ad_group_results):
+            if isinstance(outcome, BaseException):
+                raise outcome
+
+        if not assets_results:
             return f"No {asset_type} assets found for this customer ID."
-        
-        # Now get the associations
-        payload = {"query": associations_query}
-        assoc_response = requests.post(url, headers=headers, json=payload)
-        
-        if assoc_response.status_code != 200:
-            return f"Error retrieving asset associations: {assoc_response.text}"
-        
-        assoc_results = assoc_response.json()
-        
+
         # Format the results in a readable way
         output_lines = [f"Asset Usage for Customer ID {formatted_customer_id}:"]
         output_lines.append("=" * 80)
-        
-        # Create a dictionary to organize asset usage by asset ID
+
+        # Index asset usage by asset ID, initialized with basic asset info
         asset_usage = {}
-        
-        # Initialize the asset usage dictionary with basic asset info
-        for result in assets_results.get('results', []):
+        for result in assets_results:
             asset = result.get('asset', {})
             asset_id = asset.get('id')
             if asset_id:
@@ -1238,55 +2939,53 @@ async def get_asset_usage(
                     'type': asset.get('type', 'Unknown'),
                     'usage': []
                 }
-        
-        # Add usage information from the associations
-        for result in assoc_results.get('results', []):
-            asset = result.get('asset', {})
-            asset_id = asset.get('id')
-            
-            if asset_id and asset_id in asset_usage:
+
+        # Join campaign level and ad group level links onto the index
+        for level, results in (('Campaign', assoc_results), ('Ad Group', ad_group_results)):
+            for result in results:
+                asset_id = result.get('asset', {}).get('id')
+                if not asset_id or asset_id not in asset_usage:
+                    continue
+
                 campaign = result.get('campaign', {})
                 ad_group = result.get('adGroup', {})
-                ad = result.get('adGroupAd', {}).get('ad', {}) if 'adGroupAd' in result else {}
-                asset_link = result.get('assetLink', {})
-                
-                usage_info = {
+                asset_usage[asset_id]['usage'].append({
+                    'level': level,
                     'campaign_id': campaign.get('id', 'N/A'),
                     'campaign_name': campaign.get('name', 'N/A'),
                     'ad_group_id': ad_group.get('id', 'N/A'),
-                    'ad_group_name': ad_group.get('name', 'N/A'),
-                    'ad_id': ad.get('id', 'N/A') if ad else 'N/A',
-                    'ad_name': ad.get('name', 'N/A') if ad else 'N/A'
-                }
-                
-                asset_usage[asset_id]['usage'].append(usage_info)
-        
+                    'ad_group_name': ad_group.get('name', 'N/A')
+                })
+
         # Format the output
         for asset_id, info in asset_usage.items():
             output_lines.append(f"\nAsset ID: {asset_id}")
             output_lines.append(f"Name: {info['name']}")
             output_lines.append(f"Type: {info['type']}")
-            
+
             if info['usage']:
                 output_lines.append("\nUsed in:")
-                output_lines.append("-" * 60)
-                output_lines.append(f"{'Campaign':<30} | {'Ad Group':<30}")
-                output_lines.append("-" * 60)
-                
+                output_lines.append("-" * 73)
+                output_lines.append(f"{'Level':<8} | {'Campaign':<30} | {'Ad Group':<30}")
+                output_lines.append("-" * 73)
+
                 for usage in info['usage']:
                     campaign_str = f"{usage['campaign_name']} ({usage['campaign_id']})"
-                    ad_group_str = f"{usage['ad_group_name']} ({usage['ad_group_id']})"
-                    
-                    output_lines.append(f"{campaign_str[:30]:<30} | {ad_group_str[:30]:<30}")
-            
+                    if usage['level'] == 'Campaign':
+                        ad_group_str = "All ad groups"
+                    else:
+                        ad_group_str = f"{usage['ad_group_name']} ({usage['ad_group_id']})"
+
+                    output_lines.append(f"{usage['level']:<8} | {campaign_str[:30]:<30} | {ad_group_str[:30]:<30}")
+
             output_lines.append("=" * 80)
-        
+
         return "\n".join(output_lines)
-    
+
     except Exception as e:
         return f"Error retrieving asset usage: {str(e)}"
 
-@mcp.tool()
+@tool()
 async def analyze_image_assets(
     customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'"),
     days: int = Field(default=30, description="Number of days to look back (7, 30, 90, etc.)")
@@ -1299,7 +2998,7 @@ async def analyze_image_assets(
     
     RECOMMENDED WORKFLOW:
     1. First run list_accounts() to get available account IDs
-    2. Then run get_account_currency() to see what currency the account uses
+    2. Check the account's currency in the list_accounts() output
     3. Finally run this command to analyze image asset performance
     
     Args:
@@ -1325,42 +3024,37 @@ async def analyze_image_assets(
         # Default to 30 days if not a standard range
         date_range = "LAST_30_DAYS"
         
-    query = f"""
-        SELECT
-            asset.id,
-            asset.name,
-            asset.image_asset.full_size.url,
-            asset.image_asset.full_size.width_pixels,
-            asset.image_asset.full_size.height_pixels,
-            campaign.name,
-            metrics.impressions,
-            metrics.clicks,
-            metrics.conversions,
-            metrics.cost_micros
-        FROM
-            campaign_asset
-        WHERE
-            asset.type = 'IMAGE'
-            AND segments.date DURING LAST_30_DAYS
-        ORDER BY
-            metrics.impressions DESC
-        LIMIT 200
-    """
+    import query_builder
+
+    # Image metadata and campaign names are fetched once per entity and cached, not repeated
+    # on every campaign_asset row
+    projection = query_builder.Projection(
+        resource="campaign_asset",
+        metrics=["metrics.impressions", "metrics.clicks", "metrics.conversions", "metrics.cost_micros"],
+        attributes={
+            "asset": [
+                "asset.name",
+                "asset.image_asset.full_size.url",
+                "asset.image_asset.full_size.width_pixels",
+                "asset.image_asset.full_size.height_pixels",
+            ],
+            "campaign": ["campaign.name"],
+        },
+        where="asset.type = 'IMAGE' AND segments.date DURING LAST_30_DAYS",
+        order_by="metrics.impressions DESC",
+        limit=200,
+    )
     
     try:
         creds = get_credentials()
         headers = get_headers(creds)
         
         formatted_customer_id = format_customer_id(customer_id)
-        url = f"https://googleads.googleapis.com/{API_VERSION}/customers/{formatted_customer_id}/googleAds:search"
-        
-        payload = {"query": query}
-        response = requests.post(url, headers=headers, json=payload)
-        
-        if response.status_code != 200:
-            return f"Error analyzing image assets: {response.text}"
+        try:
+            results = {'results': await run_projection(formatted_customer_id, projection, headers)}
+        except GoogleAdsApiError as e:
+            return f"Error analyzing image assets: {e.text}"
         
-        results = response.json()
         if not results.get('results'):
             return "No image asset performance data found for this customer ID and time period."
         
@@ -1440,7 +3134,7 @@ async def analyze_image_assets(
     except Exception as e:
         return f"Error analyzing image assets: {str(e)}"
 
-@mcp.tool()
+@tool()
 async def list_resources(
     customer_id: str = Field(description="Google Ads customer ID (10 digits, no dashes). Example: '9873186703'")
 ) -> str:
@@ -1468,9 +3162,143 @@ async def list_resources(
             google_ads_field.name
     """
     
-    # Use your existing run_gaql function to execute this query
-    return await run_gaql(customer_id, query)
+    return await _execute_gaql_query(customer_id, query, "table")
+
+# Tools a prefetch job may call: read-only reports whose results are worth caching
+PREFETCH_TOOLS = (
+    "list_accounts", "get_account_hierarchy", "get_account_currency", "get_campaign_performance",
+    "get_ad_performance", "get_ad_creatives", "run_gaql", "compare_periods", "get_image_assets",
+    "analyze_image_assets", "get_asset_usage",
+)
+
+async def run_prefetch_job(job, budget) -> None:
+    """
+    Run one prefetch.PrefetchJob for each of its accounts, charging API requests to budget.
+
+    Tools are called without the metrics and tracing wrappers, so prefetch does
+    not show up as interactive tool calls.
+
+    Raises:
+        RuntimeError: If the job failed for any account
+    """
+    import inspect
+    from pydantic.fields import FieldInfo
+    from pydantic_core import PydanticUndefined
+
+    token = prefetch_budget.set(budget)
+    failures = []
+    try:
+        for customer_id in job.accounts or [None]:
+            if job.query:
+                try:
+                    headers = get_headers(get_credentials())
+                    await asyncio.to_thread(search_all, format_customer_id(customer_id), job.query, headers)
+                except GoogleAdsApiError as e:
+                    failures.append(f"{customer_id}: {e.text[:200]}")
+                continue
+
+            if job.tool not in PREFETCH_TOOLS:
+                raise RuntimeError(f"Tool '{job.tool}' cannot be prefetched. Use one of: {', '.join(PREFETCH_TOOLS)}")
+            func = inspect.unwrap(globals()[job.tool])
+            arguments = dict(job.args)
+            if customer_id is not None:
+                arguments["customer_id"] = customer_id
+            # Tools are called directly, so Field() defaults must be resolved here
+            for name, parameter in inspect.signature(func).parameters.items():
+                if name in arguments:
+                    continue
+                default = parameter.default
+                if isinstance(default, FieldInfo):
+                    default = default.default
+                if default is inspect.Parameter.empty or default is PydanticUndefined:
+                    raise RuntimeError(f"Prefetch job {job.name} is missing argument '{name}' of {job.tool}")
+                arguments[name] = default
+            result = await func(**arguments)
+            if metrics.tool_status(result) == "error":
+                failures.append(f"{customer_id}: {result[:200]}")
+    finally:
+        prefetch_budget.reset(token)
+
+    metrics.PREFETCH_RUNS.inc(job=job.name, status="error" if failures else "ok")
+    if failures:
+        raise RuntimeError("; ".join(failures))
+
+def start_prefetch_scheduler(jobs: List[Any], budget_limit: int) -> None:
+    """Run prefetch.PrefetchJob jobs on their schedule in a daemon thread with its own event loop."""
+    import prefetch
+
+    budget = prefetch.PrefetchBudget(budget_limit)
+    scheduler = prefetch.PrefetchScheduler(jobs, lambda job: run_prefetch_job(job, budget))
+    threading.Thread(target=asyncio.run, args=(scheduler.run(),), name="prefetch", daemon=True).start()
+    logger.info(f"Prefetching {len(jobs)} jobs (budget: {budget_limit or 'unlimited'} requests/day)")
+
+def http_app():
+    """
+    ASGI app factory used by the worker processes of --workers.
+
+    Workers run in stateless mode: any worker may receive any request, so no
+    MCP session state can be kept between requests.
+    """
+    global long_running_server
+    long_running_server = True
+    mcp.settings.stateless_http = True
+    return mcp.streamable_http_app()
 
 if __name__ == "__main__":
-    # Start the MCP server on stdio transport
-    mcp.run(transport="stdio")
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Google Ads MCP server")
+    parser.add_argument("--transport", choices=["stdio", "sse", "streamable-http"],
+                        default=os.environ.get("GOOGLE_ADS_MCP_TRANSPORT", "stdio"),
+                        help="stdio for one client per process, sse or streamable-http to serve many clients")
+    parser.add_argument("--host", default=os.environ.get("GOOGLE_ADS_MCP_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("GOOGLE_ADS_MCP_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("GOOGLE_ADS_MCP_WORKERS", "1")),
+                        help="Worker processes for streamable-http; they share a SQLite cache and rate limiter")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        if args.transport != "streamable-http":
+            parser.error("--workers requires --transport streamable-http")
+        # Workers import this module afresh and configure themselves from the environment
+        os.environ.setdefault("GOOGLE_ADS_SHARED_STATE_DB", os.path.abspath("google_ads_shared_state.db"))
+        os.environ.setdefault("GOOGLE_ADS_RESULT_CACHE_TTL", str(SHARED_RESULT_CACHE_TTL))
+        logger.info(
+            f"Starting {args.workers} workers on http://{args.host}:{args.port}/mcp "
+            f"sharing {os.environ['GOOGLE_ADS_SHARED_STATE_DB']}"
+        )
+
+        if GOOGLE_ADS_PREFETCH_CONFIG:
+            logger.warning("GOOGLE_ADS_PREFETCH_CONFIG is ignored with --workers; run prefetch in a single-process server")
+
+        import uvicorn
+        uvicorn.run("google_ads_server:http_app", factory=True, host=args.host, port=args.port, workers=args.workers)
+        sys.exit(0)
+
+    if args.transport != "stdio":
+        long_running_server = True
+        mcp.settings.host = args.host
+        mcp.settings.port = args.port
+        # Clients of one long-running server share its caches, so turn the result cache on
+        if "GOOGLE_ADS_RESULT_CACHE_TTL" not in os.environ:
+            GOOGLE_ADS_RESULT_CACHE_TTL = SHARED_RESULT_CACHE_TTL
+        logger.info(f"Serving MCP over {args.transport} on http://{args.host}:{args.port}")
+
+    if GOOGLE_ADS_PREFETCH_CONFIG and args.transport == "stdio":
+        # A stdio server may live for one call (glm_client.py), which would fetch on_start jobs every time
+        logger.warning("GOOGLE_ADS_PREFETCH_CONFIG is ignored with --transport stdio; run prefetch in an HTTP server")
+    elif GOOGLE_ADS_PREFETCH_CONFIG:
+        import prefetch
+
+        prefetch_jobs, prefetch_budget_limit, prefetch_cache_ttl = prefetch.load_config(GOOGLE_ADS_PREFETCH_CONFIG)
+        # Prefetched responses are only useful if the result cache keeps them
+        if "GOOGLE_ADS_RESULT_CACHE_TTL" not in os.environ:
+            GOOGLE_ADS_RESULT_CACHE_TTL = prefetch_cache_ttl
+        start_prefetch_scheduler(prefetch_jobs, prefetch_budget_limit)
+
+    if GOOGLE_ADS_METRICS_PORT:
+        metrics.start_http_server(int(GOOGLE_ADS_METRICS_PORT))
+        logger.info(f"Serving metrics on http://127.0.0.1:{GOOGLE_ADS_METRICS_PORT}/metrics")
+    metrics.install_dump_signal(GOOGLE_ADS_METRICS_FILE or None)
+
+    mcp.run(transport=args.transport)
@@ -0,0 +1,388 @@
+"""
+Local analysis of downloaded Google Ads image assets.
+
+Computes format, true pixel dimensions, byte size and a perceptual hash for
+image files on disk, without going back to Google Ads. Results are cached in a
+JSON index keyed by the SHA-256 of the file content, so re-running an audit
+only processes images that have not been seen before.
+
+Dimensions are read straight from the file headers (JPEG, PNG, GIF, WebP).
+JPEG files can carry large metadata segments (EXIF, ICC profiles) before the
+frame header, so their segments are walked through the file with seeks; Pillow,
+when installed, is the fallback for any file whose header gives no size. The
+perceptual hash needs pixel data and therefore requires Pillow; without it the
+hash is left empty and only exact duplicates can be detected.
+"""
+
+import os
+import json
+import struct
+import hashlib
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+INDEX_NAME = "image_index.json"
+HASH_CHUNK_SIZE = 64 * 1024
+HEADER_READ_SIZE = 64 * 1024
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.webp'}
+
+# Aspect ratios accepted by Google Ads image assets (width / height)
+RECOMMENDED_ASPECT_RATIOS = {
+    '1.91:1': 1.91,
+    '1:1': 1.0,
+    '4:5': 0.8,
+    '4:1': 4.0,
+}
+ASPECT_RATIO_TOLERANCE = 0.02
+
+
+def file_sha256(path: Path) -> str:
+    """Hash a file in chunks and return the hex SHA-256 digest."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _jpeg_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """Walk JPEG markers until a start-of-frame segment carrying the size."""
+    offset = 2
+    while offset + 9 < len(data):
+        if data[offset] != 0xFF:
+            offset += 1
+            continue
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        segment_length = struct.unpack('>H', data[offset + 2:offset + 4])[0]
+        # SOF0-SOF15, except DHT (C4), JPG (C8) and DAC (CC)
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack('>HH', data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + segment_length
+    return None
+
+
+def jpeg_file_dimensions(f: BinaryIO) -> Optional[Tuple[int, int]]:
+    """
+    Walk the JPEG segments of an open file, seeking over their payloads, until a start-of-frame.
+
+    Unlike _jpeg_dimensions() this finds the frame header however far metadata
+    segments push it into the file.
+    """
+    f.seek(2)
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b'\xff':
+            continue
+        marker = f.read(1)
+        while marker == b'\xff':
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code in (0xD8, 0x01) or 0xD0 <= code <= 0xD7:
+            continue
+        if code == 0xD9:
+            return None
+        length = f.read(2)
+        if len(length) < 2:
+            return None
+        segment_length = struct.unpack('>H', length)[0]
+        if 0xC0 <= code <= 0xCF and code not in (0xC4, 0xC8, 0xCC):
+            frame = f.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack('>HH', frame[1:5])
+            return width, height
+        f.seek(segment_length - 2, os.SEEK_CUR)
+
+
+def pillow_dimensions(path: Path) -> Optional[Tuple[int, int]]:
+    """Pixel size as Pillow reads it, or None if Pillow is not installed or cannot open the file."""
+    if Image is None:
+        return None
+    try:
+        with Image.open(path) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def _webp_dimensions(data: bytes) -> Optional[Tuple[int, int]]:
+    """Read the canvas size from a VP8, VP8L or VP8X WebP chunk."""
+    chunk = data[12:16]
+    if chunk == b'VP8 ' and len(data) >= 30:
+        width, height = struct.unpack('<HH', data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b'VP8L' and len(data) >= 25:
+        bits = int.from_bytes(data[21:25], 'little')
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b'VP8X' and len(data) >= 30:
+        width = int.from_bytes(data[24:27], 'little') + 1
+        height = int.from_bytes(data[27:30], 'little') + 1
+        return width, height
+    return None
+
+
+def read_image_header(data: bytes) -> Tuple[Optional[str], Optional[int], Optional[int]]:
+    """
+    Identify an image format and its pixel dimensions from the leading bytes.
+
+    Args:
+        data: The first bytes of the file (HEADER_READ_SIZE covers PNG, GIF and WebP, and
+            JPEG unless metadata segments push the frame header further in)
+
+    Returns:
+        Tuple of (format, width, height); unknown values are None
+    """
+    if data.startswith(b'\x89PNG\r\n\x1a\n') and len(data) >= 24:
+        width, height = struct.unpack('>II', data[16:24])
+        return 'PNG', width, height
+
+    if data[:6] in (b'GIF87a', b'GIF89a') and len(data) >= 10:
+        width, height = struct.unpack('<HH', data[6:10])
+        return 'GIF', width, height
+
+    if data.startswith(b'\xff\xd8'):
+        dimensions = _jpeg_dimensions(data)
+        return ('JPEG',) + (dimensions or (None, None))
+
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        dimensions = _webp_dimensions(data)
+        return ('WEBP',) + (dimensions or (None, None))
+
+    return None, None, None
+
+
+def perceptual_hash(path: Path, hash_size: int = 8) -> Optional[str]:
+    """
+    Compute a difference hash (dHash) of an image.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale thumbnail and
+    each bit records whether a pixel is brighter than its right-hand neighbour.
+    Visually similar images produce hashes with a small Hamming distance.
+
+    Returns:
+        Hex string of hash_size * hash_size bits, or None if Pillow is not installed
+        or the image cannot be decoded
+    """
+    if Image is None:
+        return None
+
+    try:
+        with Image.open(path) as image:
+            thumbnail = image.convert('L').resize((hash_size + 1, hash_size), Image.LANCZOS)
+            pixels = thumbnail.tobytes()
+    except Exception:
+        return None
+
+    bits = 0
+    for row in range(hash_size):
+        for col in range(hash_size):
+            left = pixels[row * (hash_size + 1) + col]
+            right = pixels[row * (hash_size + 1) + col + 1]
+            bits = (bits << 1) | (1 if left > right else 0)
+
+    return f"{bits:0{hash_size * hash_size // 4}x}"
+
+
+def hamming_distance(hash_a: str, hash_b: str) -> int:
+    """Number of differing bits between two hex perceptual hashes."""
+    return bin(int(hash_a, 16) ^ int(hash_b, 16)).count('1')
+
+
+def closest_aspect_ratio(width: Optional[int], height: Optional[int]) -> Tuple[Optional[str], bool]:
+    """
+    Match image dimensions against the Google Ads recommended aspect ratios.
+
+    Returns:
+        Tuple of (closest ratio label, whether the image is within tolerance of it)
+    """
+    if not width or not height:
+        return None, False
+
+    ratio = width / height
+    label, target = min(RECOMMENDED_ASPECT_RATIOS.items(), key=lambda item: abs(item[1] - ratio))
+    return label, abs(ratio - target) / target <= ASPECT_RATIO_TOLERANCE
+
+
+def analyze_image_file(path: str, sha256: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Analyze a single image file. Runs in a worker process.
+
+    Args:
+        path: Path to the image file
+        sha256: Content hash if already known (e.g. from a content-addressed file name)
+
+    Returns:
+        Dict with sha256, format, width, height, bytes, aspect_ratio, aspect_ratio_ok and phash;
+        width and height are None if the size could not be read
+    """
+    file_path = Path(path)
+    with open(file_path, 'rb') as f:
+        header = f.read(HEADER_READ_SIZE)
+        image_format, width, height = read_image_header(header)
+        if image_format == 'JPEG' and width is None:
+            width, height = jpeg_file_dimensions(f) or (None, None)
+
+    if width is None:
+        width, height = pillow_dimensions(file_path) or (None, None)
+    aspect_ratio, aspect_ratio_ok = closest_aspect_ratio(width, height)
+
+    return {
+        'sha256': sha256 or file_sha256(file_path),
+        'format': image_format,
+        'width': width,
+        'height': height,
+        'bytes': file_path.stat().st_size,
+        'aspect_ratio': aspect_ratio,
+        'aspect_ratio_ok': aspect_ratio_ok,
+        'phash': perceptual_hash(file_path),
+    }
+
+
+def load_index(index_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Load the content hash -> analysis index, returning an empty one if missing or corrupt."""
+    if not index_path.exists():
+        return {}
+    try:
+        with open(index_path, 'r') as f:
+            return json.load(f)
+    except (json.JSONDecodeError, OSError):
+        return {}
+
+
+def save_index(index_path: Path, index: Dict[str, Dict[str, Any]]) -> None:
+    """Atomically write the analysis index."""
+    partial_path = index_path.with_suffix('.part')
+    with open(partial_path, 'w') as f:
+        json.dump(index, f)
+    os.replace(partial_path, index_path)
+
+
+def content_hash_from_name(path: Path) -> Optional[str]:
+    """Return the SHA-256 embedded in a content-addressed file name, if it is one."""
+    stem = path.stem
+    if len(stem) == 64 and all(c in '0123456789abcdef' for c in stem):
+        return stem
+    return None
+
+
+def analyze_images(
+    paths: Iterable[Path],
+    index_path: Path,
+    executor: Optional[Executor] = None,
+    max_workers: Optional[int] = None
+) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """
+    Analyze image files, reusing cached results from the index.
+
+    Files are identified by content hash. Hashes already present in the index with
+    known dimensions are not decoded again; the rest are analyzed in a process pool
+    and added to it.
+
+    Args:
+        paths: Image files to analyze
+        index_path: Location of the JSON analysis index
+        executor: Process pool to analyze in, such as google_ads_server.cpu_pool(); without
+            one a pool is started for this call with forkserver (spawn where unavailable),
+            as forking a process that runs threads can copy a held lock into the child
+        max_workers: Size of that pool (default: number of CPUs)
+
+    Returns:
+        Tuple of (mapping of file path -> analysis, number of newly analyzed images)
+    """
+    index = load_index(index_path)
+
+    file_hashes = {}
+    for path in paths:
+        file_hashes[str(path)] = content_hash_from_name(path) or file_sha256(path)
+
+    pending = {}
+    for path, sha256 in file_hashes.items():
+        # Entries without dimensions may come from an older, header-only analysis
+        cached = index.get(sha256)
+        if (cached is None or cached.get('width') is None) and sha256 not in pending:
+            pending[sha256] = path
+
+    if pending:
+        if len(pending) == 1:
+            results = [analyze_image_file(path, sha256) for sha256, path in pending.items()]
+        elif executor is not None:
+            results = list(executor.map(analyze_image_file, pending.values(), pending.keys()))
+        else:
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context(start_method)) as pool:
+                results = list(pool.map(analyze_image_file, pending.values(), pending.keys()))
+        for result in results:
+            index[result['sha256']] = result
+        save_index(index_path, index)
+
+    return {path: index[sha256] for path, sha256 in file_hashes.items()}, len(pending)
+
+
+def find_near_duplicates(hashes: Dict[str, str], max_distance: int = 6) -> List[Tuple[str, str, int]]:
+    """
+    Find pairs of images whose perceptual hashes differ by at most max_distance bits.
+
+    Uses the pigeonhole principle to avoid comparing every pair: the hash is split
+    into max_distance + 1 bands, and two hashes within max_distance bits of each
+    other must agree exactly on at least one band. Only images sharing a band are
+    compared.
+
+    Args:
+        hashes: Mapping of key (e.g. content hash) -> hex perceptual hash
+
+    Returns:
+        List of (key_a, key_b, distance) tuples sorted by distance
+    """
+    if not hashes:
+        return []
+
+    hash_bits = len(next(iter(hashes.values()))) * 4
+    band_count = max(1, min(max_distance + 1, hash_bits))
+    band_width = hash_bits // band_count
+
+    buckets = {}
+    for key, value in hashes.items():
+        bits = int(value, 16)
+        for band in range(band_count):
+            width = band_width if band < band_count - 1 else hash_bits - band_width * band
+            band_value = (bits >> (band * band_width)) & ((1 << width) - 1)
+            buckets.setdefault((band, band_value), []).append(key)
+
+    pairs = {}
+    for keys in buckets.values():
+        for i, key_a in enumerate(keys):
+            for key_b in keys[i + 1:]:
+                pair = (key_a, key_b) if key_a < key_b else (key_b, key_a)
+                if pair in pairs:
+                    continue
+                distance = hamming_distance(hashes[key_a], hashes[key_b])
+                if distance <= max_distance:
+                    pairs[pair] = distance
+
+    return sorted(((a, b, d) for (a, b), d in pairs.items()), key=lambda item: (item[2], item[0], item[1]))
+
+
+def list_image_files(directory: Path) -> List[Path]:
+    """List image files directly inside a directory, ignoring partial downloads."""
+    return sorted(
+        path for path in directory.iterdir()
+        if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS and not path.name.startswith('.')
+    )
@@ -0,0 +1,311 @@
+"""
+Local SQL over Google Ads result sets.
+
+GAQL selects from one resource at a time and cannot join or aggregate across
+resources. load_sql_table() in google_ads_server.py runs a GAQL query (or one
+of NAMED_QUERIES) and stores the rows as a table in an embedded database;
+run_sql() then answers joins and aggregations across those tables locally.
+The database is a file (GOOGLE_ADS_SQL_DB in google_ads_server.py), so tables
+stay loaded across server processes, including the one-call-per-process
+stdio servers glm_client.py starts, and an analysis over campaigns, ad
+groups, assets and metrics costs one API call per table.
+
+Nested result fields become snake_case columns: campaign.id is campaign_id,
+metrics.costMicros is metrics_cost_micros and ad_group_criterion.keyword.text
+is ad_group_criterion_keyword_text. Every table also has a customer_id column.
+
+The engine is DuckDB when it is installed and SQLite otherwise.
+GOOGLE_ADS_SQL_ENGINE selects it: "auto" (default), "duckdb" or "sqlite".
+Only single SELECT (and WITH ... SELECT) statements are accepted from
+run_sql(), and DuckDB runs without access to files other than its database.
+"""
+
+import os
+import re
+import contextlib
+import time
+import sqlite3
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import fast_json
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+SQL_ENGINES = ("auto", "duckdb", "sqlite")
+
+# Table of the loaded tables' account, query, row count and columns
+CATALOG_TABLE = "_tables"
+
+# Table name -> GAQL for tables that can be loaded by name alone
+NAMED_QUERIES = {
+    "campaigns": """
+        SELECT campaign.id, campaign.name, campaign.status, campaign.advertising_channel_type
+        FROM campaign
+    """,
+    "ad_groups": """
+        SELECT campaign.id, ad_group.id, ad_group.name, ad_group.status, ad_group.type
+        FROM ad_group
+    """,
+    "assets": """
+        SELECT asset.id, asset.name, asset.type, asset.image_asset.full_size.url,
+            asset.image_asset.full_size.width_pixels, asset.image_asset.full_size.height_pixels
+        FROM asset
+    """,
+    "campaign_assets": """
+        SELECT campaign.id, asset.id, campaign_asset.field_type, campaign_asset.status
+        FROM campaign_asset
+    """,
+    "ad_group_assets": """
+        SELECT campaign.id, ad_group.id, asset.id, ad_group_asset.field_type, ad_group_asset.status
+        FROM ad_group_asset
+    """,
+    "campaign_metrics": """
+        SELECT campaign.id, segments.date, metrics.impressions, metrics.clicks, metrics.cost_micros,
+            metrics.conversions, metrics.conversions_value
+        FROM campaign
+        WHERE segments.date DURING LAST_30_DAYS
+    """,
+    "ad_group_metrics": """
+        SELECT campaign.id, ad_group.id, segments.date, metrics.impressions, metrics.clicks,
+            metrics.cost_micros, metrics.conversions, metrics.conversions_value
+        FROM ad_group
+        WHERE segments.date DURING LAST_30_DAYS
+    """,
+}
+
+# Table names start with a letter, so they cannot collide with CATALOG_TABLE
+TABLE_NAME_PATTERN = re.compile(r"^[a-z][a-z0-9_]{0,62}$")
+READ_ONLY_PATTERN = re.compile(r"^\s*(select|with)\b", re.IGNORECASE)
+# String literals, quoted identifiers and comments, which may contain ";"
+SQL_NOISE_PATTERN = re.compile(r"'(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|--[^\n]*|/\*.*?\*/", re.DOTALL)
+INTEGER_PATTERN = re.compile(r"^-?\d+$")
+DECIMAL_PATTERN = re.compile(r"^-?\d+\.\d+$")
+
+CAMEL_BOUNDARY = re.compile(r"(?<!^)(?=[A-Z])")
+
+
+def snake_case(name: str) -> str:
+    return CAMEL_BOUNDARY.sub("_", name).lower()
+
+
+def flatten(row: Dict[str, Any], prefix: str = "") -> Dict[str, Any]:
+    """One flat snake_case column -> value dict of a REST result row."""
+    columns = {}
+    for key, value in row.items():
+        name = f"{prefix}{snake_case(key)}"
+        if isinstance(value, dict):
+            columns.update(flatten(value, f"{name}_"))
+        else:
+            columns[name] = value
+    return columns
+
+
+def column_type(values: List[Any]) -> str:
+    """SQL type of a column: BIGINT, DOUBLE, BOOLEAN or TEXT (int64 fields arrive as strings)."""
+    present = [value for value in values if value is not None]
+    if not present:
+        return "TEXT"
+    if all(isinstance(value, bool) for value in present):
+        return "BOOLEAN"
+    if any(isinstance(value, (bool, list, dict)) for value in present):
+        return "TEXT"
+    if all(isinstance(value, int) or (isinstance(value, str) and INTEGER_PATTERN.match(value)) for value in present):
+        return "BIGINT"
+    if all(
+        isinstance(value, (int, float)) or (isinstance(value, str) and (INTEGER_PATTERN.match(value) or DECIMAL_PATTERN.match(value)))
+        for value in present
+    ):
+        return "DOUBLE"
+    return "TEXT"
+
+
+def convert(value: Any, sql_type: str) -> Any:
+    if value is None:
+        return None
+    if sql_type == "BIGINT":
+        return int(value)
+    if sql_type == "DOUBLE":
+        return float(value)
+    if sql_type == "TEXT" and not isinstance(value, str):
+        return fast_json.dumps(value)
+    return value
+
+
+def single_statement(sql: str) -> bool:
+    """Whether sql holds one statement: no ";" outside literals and comments, except at the end."""
+    code = SQL_NOISE_PATTERN.sub(" ", sql).rstrip()
+    return ";" not in code.rstrip(";")
+
+
+def select_engine() -> str:
+    choice = os.environ.get("GOOGLE_ADS_SQL_ENGINE", "auto").lower()
+    if choice == "duckdb" and duckdb is None:
+        raise ImportError("GOOGLE_ADS_SQL_ENGINE is duckdb but duckdb is not installed")
+    if choice == "sqlite" or duckdb is None:
+        return "sqlite"
+    return "duckdb"
+
+
+class LocalDatabase:
+    """
+    Thread-safe database of loaded result sets.
+
+    With a file path, tables outlive the process and every process using the
+    same file sees them; each operation opens its own connection so no process
+    holds the file locked between calls. ":memory:" keeps one connection.
+    """
+
+    def __init__(self, engine: Optional[str] = None, path: str = ":memory:"):
+        self.engine = engine or select_engine()
+        self.path = path
+        self._lock = threading.Lock()
+        self._memory_connection = self._connect() if path == ":memory:" else None
+        with self._connection() as connection:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {CATALOG_TABLE} (name TEXT PRIMARY KEY, customer_id TEXT, "
+                f"query TEXT, row_count BIGINT, column_types TEXT, loaded_at DOUBLE)"
+            )
+            connection.commit()
+
+    def _connect(self):
+        if self.engine == "duckdb":
+            return duckdb.connect(self.path, config={"enable_external_access": False})
+        return sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+
+    @contextlib.contextmanager
+    def _connection(self):
+        with self._lock:
+            if self._memory_connection is not None:
+                yield self._memory_connection
+                return
+            connection = self._connect()
+            try:
+                yield connection
+            finally:
+                connection.close()
+
+    @property
+    def tables(self) -> Dict[str, Dict[str, Any]]:
+        """Table name -> {"customer_id", "query", "rows", "columns": [(name, type)], "loaded_at"}"""
+        with self._connection() as connection:
+            catalog = connection.execute(
+                f"SELECT name, customer_id, query, row_count, column_types, loaded_at FROM {CATALOG_TABLE}"
+            ).fetchall()
+        return {
+            name: {
+                "customer_id": customer_id,
+                "query": query,
+                "rows": row_count,
+                "columns": [tuple(column) for column in fast_json.loads(column_types)],
+                "loaded_at": loaded_at,
+            }
+            for name, customer_id, query, row_count, column_types, loaded_at in catalog
+        }
+
+    def load(self, name: str, customer_id: str, query: str, rows: List[Dict[str, Any]]) -> List[Tuple[str, str]]:
+        """
+        Replace a table with the result rows of a GAQL query.
+
+        Returns:
+            The (column name, SQL type) pairs of the table
+        """
+        if not TABLE_NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid table name '{name}'. Use lowercase letters, digits and underscores.")
+
+        flat_rows = [flatten(row) for row in rows]
+        # Columns in first-seen order; customer.id, if selected, is the customer_id column
+        seen = {"customer_id": None}
+        for flat_row in flat_rows:
+            seen.update(dict.fromkeys(flat_row))
+        names = list(seen)
+        values = {column: [flat_row.get(column) for flat_row in flat_rows] for column in names[1:]}
+        types = ["TEXT"] + [column_type(values[column]) for column in names[1:]]
+        records = [
+            [customer_id] + [convert(values[column][position], sql_type) for column, sql_type in zip(names[1:], types[1:])]
+            for position in range(len(flat_rows))
+        ]
+
+        definition = ", ".join(f'"{column}" {sql_type}' for column, sql_type in zip(names, types))
+        placeholders = ", ".join("?" for _ in names)
+        with self._connection() as connection:
+            # One transaction, so other processes see the old table or the new one, never neither
+            connection.execute("BEGIN")
+            try:
+                connection.execute(f'DROP TABLE IF EXISTS "{name}"')
+                connection.execute(f'CREATE TABLE "{name}" ({definition})')
+                if records:
+                    connection.executemany(f'INSERT INTO "{name}" VALUES ({placeholders})', records)
+                connection.execute(f"DELETE FROM {CATALOG_TABLE} WHERE name = ?", [name])
+                connection.execute(
+                    f"INSERT INTO {CATALOG_TABLE} VALUES (?, ?, ?, ?, ?, ?)",
+                    [name, customer_id, " ".join(query.split()), len(records),
+                     fast_json.dumps(list(zip(names, types))), time.time()],
+                )
+                connection.commit()
+            except Exception:
+                connection.rollback()
+                raise
+        return list(zip(names, types))
+
+    def query(self, sql: str, max_rows: int) -> Tuple[List[str], List[tuple], bool]:
+        """
+        Run a read-only statement.
+
+        Returns:
+            Tuple of (column names, up to max_rows result rows, whether more rows were left out)
+
+        Raises:
+            ValueError: If the statement is not a single SELECT
+        """
+        if not READ_ONLY_PATTERN.match(sql) or not single_statement(sql):
+            raise ValueError("Only a single SELECT statement is allowed.")
+        if self.engine == "duckdb":
+            # DuckDB has no query_only mode, so also check the statements its own parser finds
+            statements = duckdb.extract_statements(sql)
+            if len(statements) != 1 or statements[0].type != duckdb.StatementType.SELECT:
+                raise ValueError("Only a single SELECT statement is allowed.")
+        with self._connection() as connection:
+            if self.engine == "sqlite":
+                connection.execute("PRAGMA query_only = ON")
+            try:
+                cursor = connection.execute(sql)
+                columns = [description[0] for description in cursor.description or []]
+                rows = cursor.fetchmany(max_rows + 1)
+            finally:
+                if self.engine == "sqlite":
+                    connection.execute("PRAGMA query_only = OFF")
+        return columns, [tuple(row) for row in rows[:max_rows]], len(rows) > max_rows
+
+    def describe(self) -> List[str]:
+        """One line per table with its source account, row count and columns."""
+        lines = []
+        for name, table in sorted(self.tables.items()):
+            loaded = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(table["loaded_at"]))
+            lines.append(f"{name} ({table['rows']} rows from account {table['customer_id']}, loaded {loaded})")
+            lines.append("  " + ", ".join(f"{column} {sql_type}" for column, sql_type in table["columns"]))
+        return lines
+
+
+def format_value(value: Any) -> str:
+    if value is None:
+        return "NULL"
+    if isinstance(value, float):
+        return f"{value:.6f}".rstrip("0").rstrip(".")
+    return str(value)
+
+
+def format_rows(columns: List[str], rows: List[tuple], output_format: str) -> str:
+    """Render query results as an aligned table or as CSV."""
+    cells = [[format_value(value) for value in row] for row in rows]
+    if output_format == "csv":
+        return "\n".join(",".join(value.replace(",", ";") for value in row) for row in [columns] + cells)
+    widths = [max(len(row[column]) for row in [columns] + cells) for column in range(len(columns))]
+    lines = [" | ".join(f"{value:{widths[column]}}" for column, value in enumerate(columns))]
+    lines.append("-" * len(lines[0]))
+    for row in cells:
+        lines.append(" | ".join(f"{value:{widths[column]}}" for column, value in enumerate(row)))
+    return "\n".join(lines)
@@ -0,0 +1,273 @@
+"""
+Prometheus-style metrics for the Google Ads MCP server.
+
+A small, dependency-free registry of counters and histograms, rendered in the
+Prometheus text exposition format. The server records:
+
+- tool calls and tool latency, per tool (via instrument_tool)
+- Google Ads API request latency by endpoint, status and customer
+- rows returned and bytes received from the API
+- OAuth token refreshes
+- cache hits and misses, and requests coalesced with an identical one in flight
+- time spent waiting on concurrency or rate limiters
+- prefetch job runs and the API requests they made
+
+The metrics can be scraped from an HTTP endpoint (start_http_server, enabled
+with GOOGLE_ADS_METRICS_PORT) or dumped to stderr / a file on SIGUSR1
+(install_dump_signal). stdout is never used, since it carries the MCP stdio
+protocol.
+"""
+
+import sys
+import time
+import signal
+import functools
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, the Prometheus client defaults extended for slow reports
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """A monotonically increasing value per label combination."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}" for key, value in items]
+
+
+class Histogram:
+    """Observations counted into cumulative buckets per label combination."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [per-bucket counts, sum, count]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, **labels: Any) -> int:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return series[2] if series else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(series[0]), series[1], series[2])) for key, series in self._series.items())
+        lines = []
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, ("le", _format_number(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_number(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+TOOL_CALLS = REGISTRY.register(Counter(
+    "google_ads_mcp_tool_calls_total", "MCP tool calls by tool and outcome.", ("tool", "status")))
+TOOL_LATENCY = REGISTRY.register(Histogram(
+    "google_ads_mcp_tool_duration_seconds", "MCP tool call latency.", ("tool",)))
+API_LATENCY = REGISTRY.register(Histogram(
+    "google_ads_api_request_duration_seconds", "Google Ads API request latency.", ("endpoint", "status", "customer_id")))
+API_ROWS = REGISTRY.register(Counter(
+    "google_ads_api_rows_total", "Result rows returned by the Google Ads API.", ("endpoint", "customer_id")))
+API_BYTES = REGISTRY.register(Counter(
+    "google_ads_api_response_bytes_total", "Response bytes received from the Google Ads API.", ("endpoint",)))
+DOWNLOAD_BYTES = REGISTRY.register(Counter(
+    "google_ads_image_download_bytes_total", "Image bytes downloaded from asset URLs."))
+TOKEN_REFRESHES = REGISTRY.register(Counter(
+    "google_ads_token_refreshes_total", "OAuth / service account token refreshes by outcome.", ("result",)))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "google_ads_cache_requests_total", "Cache lookups by cache and result (hit or miss).", ("cache", "result")))
+LIMITER_WAIT = REGISTRY.register(Histogram(
+    "google_ads_limiter_wait_seconds", "Time spent waiting on a concurrency or rate limiter.", ("limiter",)))
+COALESCED_REQUESTS = REGISTRY.register(Counter(
+    "google_ads_api_coalesced_requests_total", "API requests answered by an identical request already in flight.", ("endpoint",)))
+PREFETCH_RUNS = REGISTRY.register(Counter(
+    "google_ads_prefetch_runs_total", "Scheduled prefetch job runs by job and outcome.", ("job", "status")))
+PREFETCH_REQUESTS = REGISTRY.register(Counter(
+    "google_ads_prefetch_api_requests_total", "Google Ads API requests made by prefetch jobs (cache misses)."))
+
+
+def tool_status(result: Any) -> str:
+    """Classify a tool result: tools report failures as strings starting with 'Error'."""
+    return "error" if isinstance(result, str) and result.startswith("Error") else "ok"
+
+
+def instrument_tool(func: Callable) -> Callable:
+    """Wrap an async tool function to count its calls and time them."""
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        status = "exception"
+        try:
+            result = await func(*args, **kwargs)
+            status = tool_status(result)
+            return result
+        finally:
+            TOOL_LATENCY.observe(time.perf_counter() - start, tool=name)
+            TOOL_CALLS.inc(tool=name, status=status)
+
+    return wrapper
+
+
+class timed_wait:
+    """Async context manager that acquires a limiter and records how long that took."""
+
+    def __init__(self, limiter, name: str):
+        self.limiter = limiter
+        self.name = name
+
+    async def __aenter__(self):
+        start = time.perf_counter()
+        await self.limiter.acquire()
+        LIMITER_WAIT.observe(time.perf_counter() - start, limiter=self.name)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.limiter.release()
+
+
+def start_http_server(port: int, host: str = "127.0.0.1"):
+    """
+    Serve the metrics at http://host:port/metrics from a daemon thread.
+
+    Returns:
+        The running HTTP server (call shutdown() to stop it)
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = REGISTRY.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def dump(path: Optional[str] = None) -> None:
+    """Write the current metrics to a file, or to stderr if no path is given."""
+    text = REGISTRY.render()
+    if path:
+        with open(path, "w") as f:
+            f.write(text)
+    else:
+        sys.stderr.write(text)
+        sys.stderr.flush()
+
+
+def install_dump_signal(path: Optional[str] = None, signum: Optional[int] = None) -> bool:
+    """
+    Dump metrics whenever the process receives a signal (SIGUSR1 by default).
+
+    Returns:
+        False if the platform has no such signal (e.g. Windows)
+    """
+    signum = signum if signum is not None else getattr(signal, "SIGUSR1", None)
+    if signum is None:
+        return False
+    signal.signal(signum, lambda *_: dump(path))
+    return True
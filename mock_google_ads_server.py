@@ -0,0 +1,672 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Google Ads REST API
+
+Serves the endpoints google_ads_server.py talks to, so tools can be tested and
+benchmarked offline without credentials or API quota:
+
+- POST /{version}/customers/{id}/googleAds:search         (paged)
+- POST /{version}/customers/{id}/googleAds:searchStream   (chunked batches)
+- GET  /{version}/customers:listAccessibleCustomers
+- POST /token                                              (OAuth token refresh)
+- GET  /images/{id}.png                                    (image asset downloads)
+
+Rows are synthesized on the fly from the SELECT clause of each GAQL query, so
+accounts with millions of rows cost no memory. An optional manager hierarchy
+makes customer_client queries return real trees and requires the matching
+login-customer-id header for accounts below a manager. Latency, page size and error
+injection (429/503/401) are configurable.
+
+Usage:
+    python mock_google_ads_server.py --port 8089 --rows 1000000 --latency-ms 50
+    GOOGLE_ADS_API_BASE_URL=http://127.0.0.1:8089 \
+    GOOGLE_ADS_OAUTH_TOKEN_URI=http://127.0.0.1:8089/token python google_ads_server.py
+
+In tests and benchmarks use start_mock_server() and write_mock_credentials().
+"""
+
+import re
+import json
+import time
+import zlib
+import random
+import struct
+import argparse
+import threading
+from datetime import date, datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+DEFAULT_PAGE_SIZE = 10000
+DEFAULT_STREAM_BATCH_SIZE = 10000
+DEFAULT_DAYS = 30
+
+ERROR_STATUSES = {
+    400: "INVALID_ARGUMENT",
+    401: "UNAUTHENTICATED",
+    403: "PERMISSION_DENIED",
+    429: "RESOURCE_EXHAUSTED",
+    503: "UNAVAILABLE",
+}
+
+DEVICES = ["MOBILE", "DESKTOP", "TABLET"]
+STATUSES = ["ENABLED", "ENABLED", "ENABLED", "PAUSED"]
+DAYS_OF_WEEK = ["MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY"]
+
+
+class MockConfig:
+    """Behaviour of the mock server. Attributes may be changed while it is running."""
+
+    def __init__(
+        self,
+        rows: int = 100,
+        accounts: Optional[Dict[str, Optional[int]]] = None,
+        page_size: int = DEFAULT_PAGE_SIZE,
+        stream_batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+        latency_ms: float = 0.0,
+        latency_jitter_ms: float = 0.0,
+        error_rates: Optional[Dict[int, float]] = None,
+        fail_next: Optional[List[int]] = None,
+        seed: int = 0,
+        managers: Optional[Dict[str, List[str]]] = None,
+    ):
+        """
+        Args:
+            rows: Rows available per account and query unless set in accounts
+            accounts: Customer ID -> row count (None uses rows); also the list returned by
+                listAccessibleCustomers
+            page_size: Rows per googleAds:search page
+            stream_batch_size: Rows per googleAds:searchStream batch
+            latency_ms: Delay added to every API response
+            latency_jitter_ms: Random extra delay of up to this many milliseconds
+            error_rates: HTTP status -> probability of failing an API request with it
+            fail_next: HTTP statuses returned, in order, by the next API requests
+            seed: Seed for latency jitter and error injection
+            managers: Manager customer ID -> direct client IDs. Accounts below a manager
+                need it (or a manager above it) as login-customer-id unless they are in
+                accounts themselves
+        """
+        self.rows = rows
+        self.accounts = accounts if accounts is not None else {"1234567890": None, "9876543210": None}
+        self.page_size = page_size
+        self.stream_batch_size = stream_batch_size
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.error_rates = error_rates or {}
+        self.fail_next = list(fail_next or [])
+        self.seed = seed
+        self.managers = managers
+
+    def clients(self, manager_id: str, max_level: Optional[int] = None) -> List[Tuple[str, int]]:
+        """(customer ID, level) of a manager and the accounts below it, parents before children."""
+        found = [(manager_id, 0)]
+        seen = {manager_id}
+        for customer_id, level in found:
+            if max_level is not None and level >= max_level:
+                continue
+            for client_id in (self.managers or {}).get(customer_id, []):
+                if client_id not in seen:
+                    seen.add(client_id)
+                    found.append((client_id, level + 1))
+        return found
+
+    def can_access(self, customer_id: str, login_customer_id: Optional[str]) -> bool:
+        if self.managers is None or not login_customer_id:
+            return customer_id in self.accounts
+        if login_customer_id not in self.accounts:
+            return False
+        return any(client_id == customer_id for client_id, _ in self.clients(login_customer_id))
+
+
+def to_camel(name: str) -> str:
+    """Convert a GAQL snake_case name to the camelCase used in REST JSON."""
+    head, *rest = name.split('_')
+    return head + ''.join(part.title() for part in rest)
+
+
+class ParsedQuery:
+    """The parts of a GAQL query the mock needs to synthesize results."""
+
+    QUERY_PATTERN = re.compile(r'^\s*SELECT\s+(?P<fields>.+?)\s+FROM\s+(?P<resource>\w+)(?P<rest>.*)$', re.IGNORECASE | re.DOTALL)
+    LIMIT_PATTERN = re.compile(r'\bLIMIT\s+(\d+)', re.IGNORECASE)
+    DURING_PATTERN = re.compile(r'\bDURING\s+LAST_(\d+)_DAYS', re.IGNORECASE)
+    BETWEEN_PATTERN = re.compile(r"\bBETWEEN\s+'(\d{4}-\d{2}-\d{2})'\s+AND\s+'(\d{4}-\d{2}-\d{2})'", re.IGNORECASE)
+    ID_IN_PATTERN = re.compile(r'\b(\w+)\.id\s+IN\s*\(([^)]*)\)', re.IGNORECASE)
+    ID_EQUALS_PATTERN = re.compile(r'\b(\w+)\.id\s*=\s*(\d+)', re.IGNORECASE)
+    LEVEL_PATTERN = re.compile(r'\bcustomer_client\.level\s*(<=|<|=)\s*(\d+)', re.IGNORECASE)
+
+    def __init__(self, query: str):
+        match = self.QUERY_PATTERN.match(query)
+        if not match:
+            raise ValueError("Query must have the form SELECT ... FROM resource")
+
+        self.fields = [field.strip() for field in match.group('fields').split(',') if field.strip()]
+        if not self.fields or any(not re.fullmatch(r'\w+(\.\w+)+', field) for field in self.fields):
+            raise ValueError(f"Invalid field list: {match.group('fields').strip()}")
+
+        self.resource = match.group('resource')
+        rest = match.group('rest')
+
+        limit = self.LIMIT_PATTERN.search(rest)
+        self.limit = int(limit.group(1)) if limit else None
+
+        # Date segmentation: one row per entity and day
+        self.dates = []
+        # Date range of unsegmented queries, so totals differ between periods
+        self.period = ''
+        between = self.BETWEEN_PATTERN.search(rest)
+        during = self.DURING_PATTERN.search(rest)
+        if not any(field == 'segments.date' for field in self.fields):
+            if between:
+                self.period = f"{between.group(1)}:{between.group(2)}"
+            elif during:
+                self.period = f"LAST_{during.group(1)}_DAYS"
+        else:
+            if between:
+                start = date.fromisoformat(between.group(1))
+                end = date.fromisoformat(between.group(2))
+            else:
+                days = int(during.group(1)) if during else DEFAULT_DAYS
+                end = date.today() - timedelta(days=1)
+                start = end - timedelta(days=days - 1)
+            self.dates = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+        # Explicit ID filters on the queried resource
+        self.ids = None
+        id_in = self.ID_IN_PATTERN.search(rest)
+        id_equals = self.ID_EQUALS_PATTERN.search(rest)
+        if id_in and id_in.group(1) in (self.resource, self.resource.split('_')[-1]):
+            self.ids = [int(value) for value in re.findall(r'\d+', id_in.group(2))]
+        elif id_equals and id_equals.group(1) in (self.resource, self.resource.split('_')[-1]):
+            self.ids = [int(id_equals.group(2))]
+
+        # Depth limit of a customer_client query
+        self.max_level = None
+        level = self.LEVEL_PATTERN.search(rest)
+        if level:
+            self.max_level = int(level.group(2)) - (1 if level.group(1) == '<' else 0)
+
+    @property
+    def field_mask(self) -> str:
+        return ','.join('.'.join(to_camel(part) for part in field.split('.')) for field in self.fields)
+
+
+class MockDataset:
+    """Synthesizes deterministic result rows for a customer and query."""
+
+    def __init__(
+        self,
+        customer_id: str,
+        query: ParsedQuery,
+        entity_count: int,
+        base_url: str,
+        clients: Optional[Dict[int, Tuple[int, bool]]] = None,
+    ):
+        """
+        Args:
+            clients: For customer_client queries in a configured hierarchy, customer ID ->
+                (level, manager flag) of every account to return, in order
+        """
+        self.customer_id = customer_id
+        self.query = query
+        self.base_url = base_url
+        self.days = len(query.dates) or 1
+        self.clients = clients
+
+        if clients is not None:
+            self.entity_ids = list(clients)
+        elif query.resource == 'customer':
+            self.entity_ids = [int(customer_id)]
+        elif query.ids is not None:
+            self.entity_ids = [entity_id for entity_id in query.ids if 1 <= entity_id <= entity_count]
+        else:
+            self.entity_ids = None
+        if self.entity_ids is not None:
+            self.entity_count = len(self.entity_ids)
+        else:
+            self.entity_count = max(1, entity_count // self.days) if entity_count else 0
+
+        total = self.entity_count * self.days
+        self.total = min(total, query.limit) if query.limit is not None else total
+        self.paths = [[to_camel(part) for part in field.split('.')] for field in query.fields]
+
+    def entity_id(self, entity: int) -> int:
+        if self.query.resource == 'customer_client' and self.entity_ids is None and entity == 0:
+            # Like the real API, the queried account is its own level 0 client
+            return int(self.customer_id)
+        return self.entity_ids[entity] if self.entity_ids is not None else entity + 1
+
+    def rows(self, start: int, stop: int) -> List[Dict[str, Any]]:
+        """Build the rows with index start <= i < stop."""
+        rows = []
+        for index in range(start, min(stop, self.total)):
+            entity, day = divmod(index, self.days)
+            entity_id = self.entity_id(entity)
+            row = {}
+            for field, path in zip(self.query.fields, self.paths):
+                node = row
+                for part in path[:-1]:
+                    node = node.setdefault(part, {})
+                node[path[-1]] = self.value(field, entity_id, day)
+            rows.append(row)
+        return rows
+
+    def value(self, field: str, entity_id: int, day: int) -> Any:
+        """Deterministic synthetic value of a field for an entity and day."""
+        resource, _, attribute = field.partition('.')
+        leaf = field.rsplit('.', 1)[-1]
+        period = f":{self.query.period}" if self.query.period else ""
+        seed = zlib.crc32(f"{self.customer_id}:{entity_id}:{day}{period}".encode())
+        impressions = 100 + seed % 10000
+        clicks = impressions * (1 + seed % 9) // 100
+        cost_micros = clicks * (200000 + seed % 800000)
+
+        if resource == 'segments':
+            current_date = self.query.dates[day] if self.query.dates else date.today()
+            if leaf == 'date':
+                return current_date.isoformat()
+            if leaf == 'device':
+                return DEVICES[(entity_id + day) % len(DEVICES)]
+            if leaf == 'day_of_week':
+                return DAYS_OF_WEEK[current_date.weekday()]
+            if leaf == 'week':
+                return (current_date - timedelta(days=current_date.weekday())).isoformat()
+            if leaf == 'month':
+                return current_date.replace(day=1).isoformat()
+            return f"{leaf.upper()}_{entity_id % 3}"
+
+        if resource == 'metrics':
+            if leaf == 'impressions':
+                return str(impressions)
+            if leaf == 'clicks':
+                return str(clicks)
+            if leaf == 'cost_micros':
+                return str(cost_micros)
+            if leaf == 'conversions':
+                return round(clicks * 0.05, 2)
+            if leaf == 'conversions_value':
+                return round(clicks * 2.5, 2)
+            if leaf == 'ctr':
+                return clicks / impressions
+            if leaf in ('average_cpc', 'cost_per_conversion'):
+                return cost_micros / clicks if clicks else 0
+            return str(seed % 1000)
+
+        if resource == 'customer' or resource == 'customer_client':
+            if leaf == 'id':
+                return str(entity_id if resource == 'customer_client' else self.customer_id)
+            if leaf == 'client_customer':
+                return f"customers/{entity_id}"
+            if leaf == 'descriptive_name':
+                return f"Account {entity_id}"
+            if leaf == 'currency_code':
+                return "USD"
+            if leaf == 'time_zone':
+                return "America/New_York"
+            if leaf == 'manager':
+                if self.clients is not None:
+                    return self.clients[entity_id][1]
+                return resource == 'customer_client' and entity_id == int(self.customer_id) and self.total > 1
+            if leaf == 'level':
+                if self.clients is not None:
+                    return str(self.clients[entity_id][0])
+                return "0" if entity_id == int(self.customer_id) else "1"
+            return f"{leaf} {entity_id}"
+
+        if leaf == 'id':
+            return str(entity_id)
+        if leaf == 'resource_name':
+            return f"customers/{self.customer_id}/{to_camel(resource)}s/{entity_id}"
+        if leaf in ('name', 'text'):
+            return f"{resource.replace('_', ' ').title()} {entity_id}"
+        if leaf == 'status':
+            return STATUSES[entity_id % len(STATUSES)]
+        if leaf == 'type':
+            return "IMAGE" if resource == 'asset' else "SEARCH"
+        if leaf == 'url':
+            return f"{self.base_url}/images/{entity_id}.png"
+        if leaf == 'width_pixels':
+            return "1200"
+        if leaf == 'height_pixels':
+            return "628" if entity_id % 2 else "1200"
+        if leaf == 'file_size':
+            return str(50000 + seed % 100000)
+        if leaf == 'final_urls':
+            return [f"https://www.example.com/{resource}/{entity_id}"]
+        if leaf in ('headlines', 'descriptions'):
+            return [{"text": f"{leaf[:-1].title()} {entity_id}-{i}"} for i in range(3)]
+        return f"{leaf} {entity_id}"
+
+
+def png_bytes(width: int, height: int, seed: int) -> bytes:
+    """Encode a solid-colour RGB PNG."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    color = bytes([seed * 37 % 256, seed * 91 % 256, seed * 53 % 256])
+    raw = b''.join(b'\x00' + color * width for _ in range(height))
+    return (
+        b'\x89PNG\r\n\x1a\n'
+        + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+        + chunk(b'IDAT', zlib.compress(raw))
+        + chunk(b'IEND', b'')
+    )
+
+
+class MockGoogleAdsServer(ThreadingHTTPServer):
+    """HTTP server holding the mock configuration and request statistics."""
+
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], config: MockConfig):
+        super().__init__(address, MockGoogleAdsHandler)
+        self.config = config
+        self.lock = threading.Lock()
+        self.random = random.Random(config.seed)
+        self.request_counts: Dict[str, int] = {}
+        self.tokens_issued = 0
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def count(self, endpoint: str) -> None:
+        with self.lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def injected_error(self) -> Optional[int]:
+        """Pick the error status to fail the current API request with, if any."""
+        with self.lock:
+            if self.config.fail_next:
+                return self.config.fail_next.pop(0)
+            for status, rate in self.config.error_rates.items():
+                if self.random.random() < rate:
+                    return status
+        return None
+
+    def delay(self) -> None:
+        latency = self.config.latency_ms
+        if self.config.latency_jitter_ms:
+            with self.lock:
+                latency += self.random.uniform(0, self.config.latency_jitter_ms)
+        if latency > 0:
+            time.sleep(latency / 1000)
+
+    def stop(self) -> None:
+        """Shut the server down and release its port."""
+        self.shutdown()
+        self.server_close()
+        if self.thread:
+            self.thread.join()
+
+
+class MockGoogleAdsHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this, Nagle + delayed ACK add ~40ms per response
+    disable_nagle_algorithm = True
+    server: MockGoogleAdsServer
+
+    API_PATH = re.compile(r'^/v\d+/customers/(\d+)/googleAds:(search|searchStream)$')
+    ACCOUNTS_PATH = re.compile(r'^/v\d+/customers:listAccessibleCustomers$')
+    IMAGE_PATH = re.compile(r'^/images/(\d+)\.png$')
+
+    def log_message(self, format, *args):
+        pass
+
+    # Responses
+
+    def send_json(self, status: int, body: Any) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def send_error_json(self, status: int, message: str) -> None:
+        self.send_json(status, {
+            "error": {"code": status, "message": message, "status": ERROR_STATUSES.get(status, "UNKNOWN")}
+        })
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def check_api_request(self) -> bool:
+        """Apply latency, error injection and authentication; False if an error was sent."""
+        self.server.delay()
+
+        status = self.server.injected_error()
+        if status:
+            self.send_error_json(status, f"Injected {ERROR_STATUSES.get(status, 'error')} error")
+            return False
+
+        if not (self.headers.get('Authorization') or '').startswith('Bearer '):
+            self.send_error_json(401, "Request is missing required authentication credential.")
+            return False
+        if not self.headers.get('developer-token'):
+            self.send_error_json(401, "The developer token is not set.")
+            return False
+        return True
+
+    # Routing
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+
+        if self.ACCOUNTS_PATH.match(path):
+            self.server.count('listAccessibleCustomers')
+            if self.check_api_request():
+                self.send_json(200, {
+                    "resourceNames": [f"customers/{customer_id}" for customer_id in self.server.config.accounts]
+                })
+            return
+
+        image = self.IMAGE_PATH.match(path)
+        if image:
+            self.server.count('image')
+            data = png_bytes(120, 63, int(image.group(1)))
+            self.send_response(200)
+            self.send_header('Content-Type', 'image/png')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+
+        self.send_error_json(404, f"Unknown path {path}")
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self.read_body()
+
+        if path == '/token':
+            self.handle_token(body)
+            return
+
+        api = self.API_PATH.match(path)
+        if not api:
+            self.send_error_json(404, f"Unknown path {path}")
+            return
+
+        customer_id, method = api.groups()
+        self.server.count(method)
+        if not self.check_api_request():
+            return
+
+        try:
+            request = json.loads(body or b'{}')
+            query = ParsedQuery(request.get('query', ''))
+        except (json.JSONDecodeError, ValueError) as e:
+            self.send_error_json(400, f"Invalid query: {e}")
+            return
+
+        config = self.server.config
+        if not config.can_access(customer_id, self.headers.get('login-customer-id')):
+            self.send_error_json(403, f"User doesn't have permission to access customer {customer_id}.")
+            return
+
+        rows = config.accounts.get(customer_id)
+        rows = rows if rows is not None else config.rows
+        clients = None
+        if query.resource == 'customer_client' and config.managers is not None:
+            clients = {
+                int(client_id): (level, client_id in config.managers)
+                for client_id, level in config.clients(customer_id, query.max_level)
+            }
+        dataset = MockDataset(customer_id, query, rows, self.server.base_url, clients)
+        if method == 'search':
+            self.handle_search(dataset, request)
+        else:
+            self.handle_search_stream(dataset)
+
+    def handle_token(self, body: bytes) -> None:
+        self.server.count('token')
+        form = parse_qs(body.decode())
+        if form.get('grant_type', [''])[0] != 'refresh_token' or not form.get('refresh_token'):
+            self.send_json(400, {"error": "invalid_grant", "error_description": "Bad Request"})
+            return
+
+        with self.server.lock:
+            self.server.tokens_issued += 1
+            token = f"mock-access-token-{self.server.tokens_issued}"
+        self.send_json(200, {
+            "access_token": token,
+            "expires_in": 3599,
+            "scope": "https://www.googleapis.com/auth/adwords",
+            "token_type": "Bearer",
+        })
+
+    def handle_search(self, dataset: MockDataset, request: Dict[str, Any]) -> None:
+        try:
+            start = int(request.get('pageToken') or 0)
+        except ValueError:
+            self.send_error_json(400, "Invalid page token")
+            return
+
+        page_size = self.server.config.page_size
+        response = {
+            "results": dataset.rows(start, start + page_size),
+            "fieldMask": dataset.query.field_mask,
+            "requestId": f"mock-{random.getrandbits(32):08x}",
+        }
+        if start + page_size < dataset.total:
+            response["nextPageToken"] = str(start + page_size)
+        if not response["results"]:
+            del response["results"]
+        self.send_json(200, response)
+
+    def handle_search_stream(self, dataset: MockDataset) -> None:
+        """Send a JSON array of result batches using chunked transfer encoding."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def write_chunk(data: bytes) -> None:
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+        batch_size = self.server.config.stream_batch_size
+        write_chunk(b'[')
+        for index, start in enumerate(range(0, max(dataset.total, 1), batch_size)):
+            batch = {"fieldMask": dataset.query.field_mask, "requestId": f"mock-stream-{index}"}
+            rows = dataset.rows(start, start + batch_size)
+            if rows:
+                batch["results"] = rows
+            write_chunk((b',' if index else b'') + json.dumps(batch).encode())
+        write_chunk(b']')
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def start_mock_server(config: Optional[MockConfig] = None, host: str = '127.0.0.1', port: int = 0) -> MockGoogleAdsServer:
+    """
+    Start the mock server in a background thread.
+
+    Args:
+        config: Mock behaviour (default: MockConfig())
+        host: Interface to bind
+        port: Port to bind (0 picks a free port)
+
+    Returns:
+        The running server; use server.base_url and server.stop()
+    """
+    server = MockGoogleAdsServer((host, port), config or MockConfig())
+    server.thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    server.thread.start()
+    return server
+
+
+def write_mock_credentials(path: str, base_url: str) -> None:
+    """
+    Write an expired OAuth token file for refreshing against the mock /token endpoint.
+
+    Point GOOGLE_ADS_CREDENTIALS_PATH at the file and GOOGLE_ADS_OAUTH_TOKEN_URI at
+    {base_url}/token so get_credentials() exercises the real refresh flow.
+    """
+    expired = datetime.now(timezone.utc) - timedelta(hours=1)
+    with open(path, 'w') as f:
+        json.dump({
+            "token": "expired-mock-token",
+            "refresh_token": "mock-refresh-token",
+            "token_uri": f"{base_url}/token",
+            "client_id": "mock-client-id.apps.googleusercontent.com",
+            "client_secret": "mock-client-secret",
+            "scopes": ["https://www.googleapis.com/auth/adwords"],
+            "expiry": expired.strftime('%Y-%m-%dT%H:%M:%S.%fZ'),
+        }, f)
+
+
+def parse_error_rates(values: List[str]) -> Dict[int, float]:
+    """Parse STATUS=RATE command line values, e.g. 429=0.05."""
+    rates = {}
+    for value in values:
+        status, _, rate = value.partition('=')
+        rates[int(status)] = float(rate)
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Google Ads REST API")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8089, help="Port to listen on (default: 8089)")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows per account and query (default: 1000)")
+    parser.add_argument("--accounts", nargs="*", help="Customer IDs to serve, optionally ID=ROWS")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="Rows per search page")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Delay added to every API response")
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0, help="Random extra delay")
+    parser.add_argument("--error-rate", nargs="*", default=[], help="Error injection as STATUS=RATE, e.g. 429=0.05 503=0.01")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for jitter and error injection")
+    args = parser.parse_args()
+
+    accounts = None
+    if args.accounts:
+        accounts = {}
+        for value in args.accounts:
+            customer_id, _, rows = value.partition('=')
+            accounts[customer_id.replace('-', '')] = int(rows) if rows else None
+
+    config = MockConfig(
+        rows=args.rows,
+        accounts=accounts,
+        page_size=args.page_size,
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        error_rates=parse_error_rates(args.error_rate),
+        seed=args.seed,
+    )
+    server = MockGoogleAdsServer((args.host, args.port), config)
+    print(f"Mock Google Ads API listening on {server.base_url}")
+    print(f"  export GOOGLE_ADS_API_BASE_URL={server.base_url}")
+    print(f"  export GOOGLE_ADS_OAUTH_TOKEN_URI={server.base_url}/token")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+Comparison of Google Ads metrics between two date windows.
+
+compare_periods() in google_ads_server.py fetches the same report for the
+current and the previous window. This module joins the two result sets on the
+resource ID with a hash index and computes absolute and percent changes for
+every metric at once. Only the entities with the largest changes are
+formatted, so the model gets a small, precomputed answer, not two raw tables.
+
+The change computation uses numpy arrays (entity × metric) when numpy is
+installed and plain Python otherwise; both give the same results.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Metric name -> (GAQL field, divisor to convert to display units)
+METRICS = {
+    "impressions": ("metrics.impressions", 1),
+    "clicks": ("metrics.clicks", 1),
+    "cost": ("metrics.cost_micros", 1_000_000),
+    "conversions": ("metrics.conversions", 1),
+    "conversions_value": ("metrics.conversions_value", 1),
+}
+
+# Level -> (FROM resource, ID fields, descriptive fields shown with each entity)
+# Keyword criterion IDs are only unique within an ad group, so keywords are keyed by both,
+# joined with "~" as in ad_group_criterion resource names
+LEVELS = {
+    "campaign": ("campaign", ["campaign.id"], ["campaign.name"]),
+    "ad_group": ("ad_group", ["ad_group.id"], ["ad_group.name", "campaign.name"]),
+    "keyword": ("keyword_view", ["ad_group.id", "ad_group_criterion.criterion_id"], ["ad_group_criterion.keyword.text", "ad_group.name"]),
+}
+
+
+def windows(days: int, end: date) -> Tuple[Tuple[date, date], Tuple[date, date]]:
+    """The current window of `days` days ending on `end`, and the window just before it."""
+    current_start = end - timedelta(days=days - 1)
+    previous_end = current_start - timedelta(days=1)
+    return (current_start, end), (previous_end - timedelta(days=days - 1), previous_end)
+
+
+def build_query(level: str, start: date, end: date) -> str:
+    """GAQL for the per-entity totals of one window (no segments.date, so the API aggregates)."""
+    resource, id_fields, name_fields = LEVELS[level]
+    fields = id_fields + name_fields + [field for field, _ in METRICS.values()]
+    return (
+        f"SELECT {', '.join(fields)} FROM {resource} "
+        f"WHERE segments.date BETWEEN '{start.isoformat()}' AND '{end.isoformat()}'"
+    )
+
+
+def field_value(row: Dict[str, Any], field: str) -> Any:
+    """Value of a dotted snake_case GAQL field in a REST result row (camelCase keys)."""
+    value: Any = row
+    for part in field.split('.'):
+        head, *rest = part.split('_')
+        key = head + ''.join(word.title() for word in rest)
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def entity_key(row: Dict[str, Any], id_fields: List[str]) -> str:
+    """The entity ID of a row, "" if any of its ID fields is missing."""
+    parts = [str(field_value(row, field) or "") for field in id_fields]
+    return "~".join(parts) if all(parts) else ""
+
+
+def metric_values(row: Dict[str, Any]) -> List[float]:
+    values = []
+    for field, divisor in METRICS.values():
+        try:
+            values.append(float(field_value(row, field) or 0) / divisor)
+        except (TypeError, ValueError):
+            values.append(0.0)
+    return values
+
+
+def index_rows(rows: List[Dict[str, Any]], level: str) -> Tuple[Dict[str, int], List[List[float]], Dict[str, List[str]]]:
+    """
+    Hash index of one window's rows.
+
+    Returns:
+        Tuple of (entity ID -> row position, metric values per position, entity ID -> descriptive values)
+    """
+    _, id_fields, name_fields = LEVELS[level]
+    positions: Dict[str, int] = {}
+    values: List[List[float]] = []
+    names: Dict[str, List[str]] = {}
+    for row in rows:
+        entity_id = entity_key(row, id_fields)
+        if not entity_id:
+            continue
+        metrics = metric_values(row)
+        if entity_id in positions:
+            # Repeated rows for the same entity are summed
+            existing = values[positions[entity_id]]
+            for i, value in enumerate(metrics):
+                existing[i] += value
+            continue
+        positions[entity_id] = len(values)
+        values.append(metrics)
+        names[entity_id] = [str(field_value(row, field) or "") for field in name_fields]
+    return positions, values, names
+
+
+def compare(current_rows: List[Dict[str, Any]], previous_rows: List[Dict[str, Any]], level: str, metric: str, top_n: int) -> Dict[str, Any]:
+    """
+    Join both windows on entity ID and rank entities by the change of one metric.
+
+    Entities present in only one window count as zero in the other.
+
+    Args:
+        current_rows: Result rows of the current window
+        previous_rows: Result rows of the previous window
+        level: Key of LEVELS the rows were fetched at
+        metric: Key of METRICS to rank by (largest absolute change first)
+        top_n: Number of entities to return
+
+    Returns:
+        Dict with "totals" ({metric: (previous, current)}), "entities" (number compared)
+        and "movers", a list of {"id", "names", "previous", "current", "change", "percent"}
+        where the last four map each metric name to a number (percent is None if previous is 0)
+    """
+    current_positions, current_values, current_names = index_rows(current_rows, level)
+    previous_positions, previous_values, previous_names = index_rows(previous_rows, level)
+
+    entity_ids = list(current_positions) + [entity_id for entity_id in previous_positions if entity_id not in current_positions]
+    metric_names = list(METRICS)
+    rank_column = metric_names.index(metric)
+    zeros = [0.0] * len(metric_names)
+
+    def aligned(positions: Dict[str, int], values: List[List[float]]) -> List[List[float]]:
+        return [values[positions[entity_id]] if entity_id in positions else zeros for entity_id in entity_ids]
+
+    current = aligned(current_positions, current_values)
+    previous = aligned(previous_positions, previous_values)
+
+    if np is not None and entity_ids:
+        current_matrix = np.array(current, dtype=float)
+        previous_matrix = np.array(previous, dtype=float)
+        change_matrix = current_matrix - previous_matrix
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent_matrix = np.where(previous_matrix != 0, change_matrix / previous_matrix * 100, np.nan)
+        order = np.argsort(-np.abs(change_matrix[:, rank_column]), kind='stable')[:top_n].tolist()
+        change = change_matrix.tolist()
+        percent = [[None if np.isnan(value) else value for value in row] for row in percent_matrix.tolist()]
+        totals = list(zip(previous_matrix.sum(axis=0).tolist(), current_matrix.sum(axis=0).tolist()))
+    else:
+        change = [[c - p for c, p in zip(cur, prev)] for cur, prev in zip(current, previous)]
+        percent = [
+            [(c - p) / p * 100 if p else None for c, p in zip(cur, prev)]
+            for cur, prev in zip(current, previous)
+        ]
+        order = sorted(range(len(entity_ids)), key=lambda i: -abs(change[i][rank_column]))[:top_n]
+        totals = [
+            (sum(row[i] for row in previous), sum(row[i] for row in current))
+            for i in range(len(metric_names))
+        ]
+
+    movers = []
+    for i in order:
+        entity_id = entity_ids[i]
+        movers.append({
+            "id": entity_id,
+            "names": current_names.get(entity_id) or previous_names.get(entity_id) or [],
+            "previous": dict(zip(metric_names, previous[i])),
+            "current": dict(zip(metric_names, current[i])),
+            "change": dict(zip(metric_names, change[i])),
+            "percent": dict(zip(metric_names, percent[i])),
+        })
+
+    return {
+        "entities": len(entity_ids),
+        "totals": dict(zip(metric_names, totals)),
+        "movers": movers,
+    }
+
+
+def format_number(value: float, metric: str) -> str:
+    if metric in ("cost", "conversions", "conversions_value"):
+        return f"{value:,.2f}"
+    return f"{value:,.0f}"
+
+
+def format_percent(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value:+.1f}%"
+
+
+def format_comparison(result: Dict[str, Any], level: str, metric: str, customer_id: str,
+                      current_window: Tuple[date, date], previous_window: Tuple[date, date]) -> str:
+    """Render compare() output as totals plus a table of the top movers."""
+    lines = [f"Period comparison for account {customer_id} by {level}, ranked by change in {metric}:"]
+    lines.append(f"Current:  {current_window[0].isoformat()} to {current_window[1].isoformat()}")
+    lines.append(f"Previous: {previous_window[0].isoformat()} to {previous_window[1].isoformat()}")
+    lines.append("-" * 80)
+
+    lines.append("Totals:")
+    for name, (previous, current) in result["totals"].items():
+        percent = (current - previous) / previous * 100 if previous else None
+        lines.append(
+            f"  {name}: {format_number(previous, name)} -> {format_number(current, name)} "
+            f"({format_percent(percent)})"
+        )
+
+    if not result["movers"]:
+        lines.append("")
+        lines.append(f"No {level} data found in either period.")
+        return "\n".join(lines)
+
+    _, id_fields, name_fields = LEVELS[level]
+    others = [name for name in METRICS if name != metric]
+    header = ["~".join(id_fields)] + name_fields + [f"{metric} previous", f"{metric} current", f"{metric} change", f"{metric} change %"]
+    header += [f"{name} change %" for name in others]
+    table = [header]
+    for mover in result["movers"]:
+        names = mover["names"] + [""] * (len(name_fields) - len(mover["names"]))
+        table.append(
+            [mover["id"]] + names + [
+                format_number(mover["previous"][metric], metric),
+                format_number(mover["current"][metric], metric),
+                format_number(mover["change"][metric], metric),
+                format_percent(mover["percent"][metric]),
+            ] + [format_percent(mover["percent"][name]) for name in others]
+        )
+
+    widths = [max(len(row[column]) for row in table) for column in range(len(header))]
+    lines.append("")
+    lines.append(f"Top {len(result['movers'])} of {result['entities']} by absolute change in {metric}:")
+    for position, row in enumerate(table):
+        lines.append(" | ".join(f"{value:{widths[column]}}" for column, value in enumerate(row)))
+        if position == 0:
+            lines.append("-" * len(lines[-1]))
+    return "\n".join(lines)
@@ -0,0 +1,241 @@
+"""
+Columnar in-memory table of segmented Google Ads metrics, with local pivots.
+
+pivot_report() in google_ads_server.py fetches a report once at the finest
+grain it supports (one row per entity, day, device and network; see GRAINS)
+and keeps it as a Table in an in-process cache. Every pivot, rollup and
+subtotal is then computed from that table, so re-slicing the same data
+("now by week", "only mobile", "split by network") costs no API calls as
+long as the same server process answers the follow-up.
+
+Coarser date dimensions (week, month, day_of_week) are derived from
+segments.date. Ratio metrics (CTR, CPC, CPA, ROAS) are computed from the
+summed base metrics of each cell, so subtotals and totals stay correct.
+"""
+
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from period_comparison import field_value
+
+# Level -> (FROM resource, dimension name -> GAQL field) fetched for a table at that level
+GRAINS = {
+    "campaign": ("campaign", {
+        "campaign_id": "campaign.id",
+        "campaign": "campaign.name",
+        "date": "segments.date",
+        "device": "segments.device",
+        "network": "segments.ad_network_type",
+    }),
+    "ad_group": ("ad_group", {
+        "campaign_id": "campaign.id",
+        "campaign": "campaign.name",
+        "ad_group_id": "ad_group.id",
+        "ad_group": "ad_group.name",
+        "date": "segments.date",
+        "device": "segments.device",
+        "network": "segments.ad_network_type",
+    }),
+}
+
+# Dimensions computed from the date column
+DATE_DIMENSIONS = ("week", "month", "day_of_week")
+DAYS_OF_WEEK = ("MONDAY", "TUESDAY", "WEDNESDAY", "THURSDAY", "FRIDAY", "SATURDAY", "SUNDAY")
+
+# Summable metric -> (GAQL field, divisor to convert to display units)
+BASE_METRICS = {
+    "impressions": ("metrics.impressions", 1),
+    "clicks": ("metrics.clicks", 1),
+    "cost": ("metrics.cost_micros", 1_000_000),
+    "conversions": ("metrics.conversions", 1),
+    "conversions_value": ("metrics.conversions_value", 1),
+}
+
+# Ratio metric -> (numerator, denominator) base metrics
+RATIO_METRICS = {
+    "ctr": ("clicks", "impressions"),
+    "cpc": ("cost", "clicks"),
+    "cpa": ("cost", "conversions"),
+    "roas": ("conversions_value", "cost"),
+}
+
+METRICS = tuple(BASE_METRICS) + tuple(RATIO_METRICS)
+
+TOTAL_LABEL = "Total"
+
+
+def level_for(dimensions: Sequence[str]) -> Optional[str]:
+    """The coarsest level whose table has every dimension, or None if a dimension is unknown."""
+    for level, (_, fields) in GRAINS.items():
+        if all(dimension in fields or dimension in DATE_DIMENSIONS for dimension in dimensions):
+            return level
+    return None
+
+
+def build_query(level: str, start: date, end: date) -> str:
+    resource, fields = GRAINS[level]
+    selected = list(fields.values()) + [field for field, _ in BASE_METRICS.values()]
+    return (
+        f"SELECT {', '.join(selected)} FROM {resource} "
+        f"WHERE segments.date BETWEEN '{start.isoformat()}' AND '{end.isoformat()}'"
+    )
+
+
+class Table:
+    """Column-oriented rows of one report: a list per dimension and per base metric."""
+
+    def __init__(self, level: str, columns: Dict[str, List[Any]]):
+        self.level = level
+        self.columns = columns
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]], level: str) -> "Table":
+        _, fields = GRAINS[level]
+        columns: Dict[str, List[Any]] = {name: [] for name in list(fields) + list(BASE_METRICS)}
+        for row in rows:
+            for name, field in fields.items():
+                value = field_value(row, field)
+                columns[name].append("" if value is None else str(value))
+            for name, (field, divisor) in BASE_METRICS.items():
+                try:
+                    columns[name].append(float(field_value(row, field) or 0) / divisor)
+                except (TypeError, ValueError):
+                    columns[name].append(0.0)
+        return cls(level, columns)
+
+    def __len__(self) -> int:
+        return len(self.columns["date"])
+
+    def column(self, dimension: str) -> List[str]:
+        """Values of a dimension, deriving week (Monday), month and day_of_week from the date."""
+        if dimension in self.columns:
+            return self.columns[dimension]
+        days = [date.fromisoformat(value) if value else None for value in self.columns["date"]]
+        if dimension == "week":
+            return [(day - timedelta(days=day.weekday())).isoformat() if day else "" for day in days]
+        if dimension == "month":
+            return [day.strftime("%Y-%m") if day else "" for day in days]
+        if dimension == "day_of_week":
+            return [DAYS_OF_WEEK[day.weekday()] if day else "" for day in days]
+        raise KeyError(dimension)
+
+    def aggregate(self, dimensions: Sequence[str], filters: Dict[str, str]) -> Dict[Tuple[str, ...], List[float]]:
+        """
+        Sum the base metrics by the values of some dimensions.
+
+        Args:
+            dimensions: Dimensions to group by (an empty list gives one grand total)
+            filters: Dimension -> value rows must have to be included (case-insensitive)
+
+        Returns:
+            Group key (one value per dimension) -> sums in BASE_METRICS order
+        """
+        keys = list(zip(*(self.column(dimension) for dimension in dimensions))) if dimensions else [()] * len(self)
+        keep = [True] * len(self)
+        for dimension, wanted in filters.items():
+            wanted = wanted.lower()
+            keep = [kept and value.lower() == wanted for kept, value in zip(keep, self.column(dimension))]
+
+        metric_columns = [self.columns[name] for name in BASE_METRICS]
+        groups: Dict[Tuple[str, ...], List[float]] = {}
+        for position, key in enumerate(keys):
+            if not keep[position]:
+                continue
+            sums = groups.get(key)
+            if sums is None:
+                sums = groups[key] = [0.0] * len(metric_columns)
+            for i, column in enumerate(metric_columns):
+                sums[i] += column[position]
+        return groups
+
+
+def metric_value(sums: List[float], metric: str) -> Optional[float]:
+    """A metric of summed base metrics; None for a ratio whose denominator is 0."""
+    names = list(BASE_METRICS)
+    if metric in BASE_METRICS:
+        return sums[names.index(metric)]
+    numerator, denominator = RATIO_METRICS[metric]
+    divisor = sums[names.index(denominator)]
+    return sums[names.index(numerator)] / divisor if divisor else None
+
+
+def format_metric(value: Optional[float], metric: str) -> str:
+    if value is None:
+        return "-"
+    if metric == "ctr":
+        return f"{value:.2%}"
+    if metric in ("impressions", "clicks"):
+        return f"{value:,.0f}"
+    return f"{value:,.2f}"
+
+
+def pivot(table: Table, row_dimensions: List[str], column_dimension: str, metrics: List[str],
+          filters: Dict[str, str], subtotals: bool, max_rows: int) -> Tuple[List[List[str]], int]:
+    """
+    Pivot a table into text cells.
+
+    Rows are the combinations of row_dimensions, sorted by their values. With a
+    column_dimension every metric gets one column per value of that dimension plus
+    a total column; otherwise one column per metric. With subtotals, each group of
+    the first row dimension is followed by a subtotal row when there are several
+    row dimensions. The last row is always the grand total.
+
+    Returns:
+        Tuple of (table cells including the header row, number of data rows before max_rows)
+    """
+    columns_by = [column_dimension] if column_dimension else []
+    cells = table.aggregate(row_dimensions + columns_by, filters)
+    rows = table.aggregate(row_dimensions, filters)
+    column_values = sorted({key[-1] for key in cells}) if column_dimension else []
+
+    header = list(row_dimensions)
+    for metric in metrics:
+        if column_dimension:
+            label = f" {metric}" if len(metrics) > 1 else ""
+            header += [f"{value}{label}" for value in column_values] + [f"{TOTAL_LABEL}{label}"]
+        else:
+            header.append(metric)
+
+    def line(labels: List[str], key: Tuple[str, ...], source: Dict[Tuple[str, ...], List[float]],
+             totals: Dict[Tuple[str, ...], List[float]]) -> List[str]:
+        values = list(labels)
+        for metric in metrics:
+            for column_value in column_values:
+                sums = source.get(key + (column_value,))
+                values.append(format_metric(metric_value(sums, metric), metric) if sums else "-")
+            values.append(format_metric(metric_value(totals[key], metric), metric))
+        return values
+
+    subtotal_cells = subtotal_rows = {}
+    if subtotals and len(row_dimensions) > 1:
+        subtotal_cells = table.aggregate(row_dimensions[:1] + columns_by, filters)
+        subtotal_rows = table.aggregate(row_dimensions[:1], filters)
+
+    output = [header]
+    ordered = sorted(rows)
+    for position, key in enumerate(ordered[:max_rows]):
+        output.append(line(list(key), key, cells, rows))
+        last_in_group = position + 1 == len(ordered) or ordered[position + 1][0] != key[0]
+        if subtotal_rows and last_in_group:
+            labels = [f"{key[0]} subtotal"] + [""] * (len(row_dimensions) - 1)
+            output.append(line(labels, key[:1], subtotal_cells, subtotal_rows))
+
+    grand_cells = table.aggregate(columns_by, filters)
+    grand = table.aggregate([], filters)
+    if grand:
+        labels = [TOTAL_LABEL] + [""] * (len(row_dimensions) - 1) if row_dimensions else []
+        output.append(line(labels, (), grand_cells, grand))
+    return output, len(ordered)
+
+
+def format_pivot(cells: List[List[str]], row_count: int, max_rows: int) -> List[str]:
+    """Aligned " | "-separated lines of pivot() cells."""
+    widths = [max(len(row[column]) for row in cells) for column in range(len(cells[0]))]
+    lines = []
+    for position, row in enumerate(cells):
+        lines.append(" | ".join(f"{value:{widths[column]}}" for column, value in enumerate(row)))
+        if position == 0:
+            lines.append("-" * len(lines[-1]))
+    if row_count > max_rows:
+        lines.append(f"... {row_count - max_rows} more rows not shown (totals include them)")
+    return lines
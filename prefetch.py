@@ -0,0 +1,169 @@
+"""
+Scheduled prefetch of frequently requested reports into the result cache.
+
+GOOGLE_ADS_PREFETCH_CONFIG names a JSON file of jobs that the server runs at
+startup and/or on a schedule, so the first interactive question of the day
+is answered from the result cache. A job either calls a tool with fixed
+arguments, for one or several accounts, or runs a raw GAQL query:
+
+    {
+      "budget": 500,
+      "jobs": [
+        {"name": "campaigns-7d", "tool": "get_campaign_performance",
+         "args": {"days": 7}, "accounts": ["1234567890", "9876543210"],
+         "at": ["06:30"]},
+        {"name": "creatives", "tool": "get_ad_creatives",
+         "accounts": ["1234567890"], "every": 3600, "on_start": false},
+        {"name": "spend", "customer_id": "1234567890",
+         "query": "SELECT campaign.id, metrics.cost_micros FROM campaign WHERE segments.date DURING YESTERDAY"}
+      ]
+    }
+
+Schedules: "on_start" (default true) runs the job when the server starts,
+"at" at local times of day (HH:MM), "every" every N seconds. A job calls the
+same tool code as an interactive request, so it fills exactly the cache
+entries that request will look up.
+
+"budget" caps the Google Ads API requests prefetch may make per UTC day (0 =
+no cap); cache hits do not count. Once it is used up, jobs fail with a 429
+until the next day, leaving the rest of the daily quota to interactive use.
+"cache_ttl" (seconds, default DEFAULT_CACHE_TTL) turns the result cache on
+when GOOGLE_ADS_RESULT_CACHE_TTL is not set; it should cover the time between
+a job and the questions it prepares for.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import fast_json
+import shared_state
+
+logger = logging.getLogger('google_ads_server')
+
+DEFAULT_CACHE_TTL = 3600
+
+
+class PrefetchBudget:
+    """Thread-safe count of API requests against a per-UTC-day limit."""
+
+    def __init__(self, daily_limit: int):
+        self.daily_limit = daily_limit
+        self.day = shared_state.utc_day()
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def spend(self) -> bool:
+        """Count one request; False if the day's budget is already used up."""
+        with self._lock:
+            today = shared_state.utc_day()
+            if today != self.day:
+                self.day, self.used = today, 0
+            if self.daily_limit and self.used >= self.daily_limit:
+                return False
+            self.used += 1
+            return True
+
+    def refund(self) -> None:
+        """Give back a request counted by spend() that was not sent after all."""
+        with self._lock:
+            self.used = max(0, self.used - 1)
+
+
+class PrefetchJob:
+    """One configured prefetch: a tool call or GAQL query per account, and when to run it."""
+
+    def __init__(self, spec: Dict[str, Any]):
+        self.tool = spec.get("tool", "")
+        self.query = spec.get("query", "")
+        if bool(self.tool) == bool(self.query):
+            raise ValueError(f"Prefetch job needs exactly one of 'tool' or 'query': {spec}")
+        self.name = spec.get("name") or self.tool or "query"
+        self.args: Dict[str, Any] = dict(spec.get("args", {}))
+        accounts = spec.get("accounts") or ([spec["customer_id"]] if spec.get("customer_id") else [])
+        self.accounts: List[str] = [str(account) for account in accounts]
+        if self.query and not self.accounts:
+            raise ValueError(f"Prefetch job '{self.name}' has a query but no customer_id or accounts")
+        self.on_start = bool(spec.get("on_start", True))
+        self.every = float(spec.get("every", 0))
+        self.at: List[Tuple[int, int]] = []
+        for value in spec.get("at", []):
+            hour, minute = (int(part) for part in str(value).split(":"))
+            if not (0 <= hour < 24 and 0 <= minute < 60):
+                raise ValueError(f"Invalid time '{value}' in prefetch job '{self.name}'")
+            self.at.append((hour, minute))
+        self.last_run: Optional[datetime] = None
+
+    def next_run(self, since: datetime) -> Optional[datetime]:
+        """
+        The first scheduled time after the last run, or after since if the job has not run.
+
+        Returns None if the job only runs on start.
+        """
+        reference = self.last_run or since
+        candidates = []
+        if self.every > 0:
+            candidates.append(reference + timedelta(seconds=self.every))
+        for hour, minute in self.at:
+            scheduled = reference.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            candidates.append(scheduled if scheduled > reference else scheduled + timedelta(days=1))
+        return min(candidates) if candidates else None
+
+
+def load_config(path: str) -> Tuple[List[PrefetchJob], int, float]:
+    """
+    Read a prefetch config file.
+
+    Returns:
+        Tuple of (jobs, daily request budget or 0 for none, result cache TTL in seconds)
+
+    Raises:
+        ValueError: If a job is malformed
+    """
+    with open(path, "rb") as f:
+        config = fast_json.loads(f.read())
+    jobs = [PrefetchJob(spec) for spec in config.get("jobs", [])]
+    return jobs, int(config.get("budget", 0)), float(config.get("cache_ttl", DEFAULT_CACHE_TTL))
+
+
+class PrefetchScheduler:
+    """Runs prefetch jobs on start and when they are due, one job at a time."""
+
+    def __init__(self, jobs: List[PrefetchJob], run_job: Callable[[PrefetchJob], Awaitable[None]],
+                 clock: Callable[[], datetime] = datetime.now):
+        self.jobs = jobs
+        self.run_job = run_job
+        self.clock = clock
+        self.started = clock()
+
+    async def run_jobs(self, jobs: List[PrefetchJob]) -> None:
+        for job in jobs:
+            started = time.perf_counter()
+            job.last_run = self.clock()
+            try:
+                await self.run_job(job)
+            except Exception as e:
+                logger.warning(f"Prefetch job {job.name} failed: {e}")
+            else:
+                logger.info(f"Prefetch job {job.name} finished in {time.perf_counter() - started:.1f}s")
+
+    def due(self, now: datetime) -> List[PrefetchJob]:
+        return [job for job in self.jobs if (next_run := job.next_run(self.started)) is not None and next_run <= now]
+
+    def seconds_until_next(self, now: datetime) -> Optional[float]:
+        upcoming = [next_run for job in self.jobs if (next_run := job.next_run(self.started)) is not None]
+        return max(0.0, (min(upcoming) - now).total_seconds()) if upcoming else None
+
+    async def run(self) -> None:
+        """Run the start-up jobs, then each scheduled job when due, until cancelled."""
+        await self.run_jobs([job for job in self.jobs if job.on_start])
+        while True:
+            wait = self.seconds_until_next(self.clock())
+            if wait is None:
+                return
+            # Wake up at least every minute, so clock changes (e.g. suspend) are noticed
+            await asyncio.sleep(min(wait, 60))
+            await self.run_jobs(self.due(self.clock()))
@@ -0,0 +1,205 @@
+"""
+Opt-in profiling of MCP tool calls.
+
+Profiling is enabled for every tool with GOOGLE_ADS_PROFILE=1, for selected
+tools with a comma-separated list (GOOGLE_ADS_PROFILE=run_gaql,get_asset_usage),
+or for a single call by sending `"_meta": {"profile": true}` with tools/call.
+When it is off, the only cost is one check per tool call.
+
+A profiled call is observed two ways, because tool work is split between the
+event loop thread (the tool coroutine, result formatting) and asyncio.to_thread
+workers (HTTP requests, JSON decoding):
+
+- a stack sampler reads the stacks of those threads every
+  GOOGLE_ADS_PROFILE_INTERVAL_MS and writes them as collapsed stacks
+  (`<name>.collapsed`, the input format of flamegraph.pl and speedscope)
+- cProfile records exact call counts and times on the event loop thread
+  (`<name>.prof`, readable with `python -m pstats`)
+
+Only one cProfile profiler can be active per process (Python 3.12 refuses a
+second one, and 3.11 lets it replace the first one's hook), and concurrent
+calls share the event loop thread anyway. A call that starts while another is
+being cProfiled is therefore profiled with the stack sampler only.
+
+Files go to GOOGLE_ADS_PROFILE_DIR, and the functions with the most samples are
+added to the log line for the call.
+"""
+
+import os
+import sys
+import time
+import logging
+import functools
+import itertools
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger('google_ads_server.profiling')
+
+# Leaf frames of a thread that is waiting rather than working
+IDLE_FRAMES = {"selectors:select", "selectors:poll"}
+POOL_WORKER_FILE = os.path.join("concurrent", "futures", "thread.py")
+
+# Held by the call being cProfiled, if any
+_cprofile_lock = threading.Lock()
+# Numbers the files of calls that finish in the same millisecond apart
+_profile_numbers = itertools.count()
+
+
+def configured_tools() -> Optional[set]:
+    """Tools profiled on every call: None for none, an empty set for all."""
+    value = os.environ.get("GOOGLE_ADS_PROFILE", "").strip().lower()
+    if value in ("", "0", "false", "no", "off"):
+        return None
+    if value in ("1", "true", "yes", "on", "all"):
+        return set()
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+def should_profile(tool_name: str, requested: Optional[bool] = None) -> bool:
+    """Whether to profile this call: a per-call request wins over the environment."""
+    if requested is not None:
+        return bool(requested)
+    tools = configured_tools()
+    return tools is not None and (not tools or tool_name in tools)
+
+
+def frame_label(code) -> str:
+    return f"{Path(code.co_filename).stem}:{code.co_name}"
+
+
+def pool_worker_busy(frame) -> bool:
+    """True for a thread pool worker (e.g. asyncio.to_thread) that is running a work item."""
+    while frame is not None:
+        code = frame.f_code
+        if code.co_name == "run" and code.co_filename.endswith(POOL_WORKER_FILE):
+            return True
+        frame = frame.f_back
+    return False
+
+
+class StackSampler:
+    """Periodically record the Python stacks of the event loop thread and busy pool workers."""
+
+    def __init__(self, target_thread_id: int, interval: float):
+        self.target_thread_id = target_thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id != self.target_thread_id and not pool_worker_busy(frame):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame.f_code))
+                    frame = frame.f_back
+                if thread_id not in names:
+                    names[thread_id] = "event-loop" if thread_id == self.target_thread_id else "worker"
+                self.samples[(names[thread_id],) + tuple(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """Samples in collapsed-stack format: 'thread;outer;...;inner count' per line."""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.samples.most_common()) + "\n"
+
+    def top_functions(self, limit: int) -> Tuple[List[Tuple[str, float]], float]:
+        """
+        Functions with the most self samples, excluding waits in the event loop.
+
+        Returns:
+            Tuple of ([(function, share of busy samples)], share of all samples spent idle)
+        """
+        total = sum(self.samples.values())
+        leaves: Counter = Counter()
+        idle = 0
+        for stack, count in self.samples.items():
+            if stack[-1] in IDLE_FRAMES:
+                idle += count
+            else:
+                leaves[stack[-1]] += count
+        busy = total - idle
+        top = [(name, count / busy) for name, count in leaves.most_common(limit)] if busy else []
+        return top, (idle / total if total else 0.0)
+
+
+def write_profile(tool_name: str, sampler: StackSampler, profiler) -> Path:
+    """Write the collapsed stacks and pstats (if profiler is set) of one call; returns the path without suffix."""
+    directory = Path(os.environ.get("GOOGLE_ADS_PROFILE_DIR", "./profiles"))
+    directory.mkdir(parents=True, exist_ok=True)
+    base = directory / f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-{tool_name}-{os.getpid()}-{next(_profile_numbers)}"
+    base.with_suffix(".collapsed").write_text(sampler.collapsed())
+    if profiler is not None:
+        profiler.dump_stats(str(base.with_suffix(".prof")))
+    return base
+
+
+def instrument_tool(func: Callable, requested: Callable[[], Optional[bool]]) -> Callable:
+    """
+    Wrap an async tool function so that selected calls are profiled.
+
+    Args:
+        func: The tool function
+        requested: Returns the per-call profile request (from _meta), or None
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not should_profile(name, requested()):
+            return await func(*args, **kwargs)
+
+        import cProfile
+
+        interval = float(os.environ.get("GOOGLE_ADS_PROFILE_INTERVAL_MS", "1")) / 1000
+        sampler = StackSampler(threading.get_ident(), interval)
+        profiler = None
+        if _cprofile_lock.acquire(blocking=False):
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiling tool, such as a debugger or coverage, holds the hook
+                profiler = None
+                _cprofile_lock.release()
+        if profiler is None:
+            logger.info(f"cProfile is in use by another call; profiling {name} with the stack sampler only")
+        start = time.perf_counter()
+        sampler.start()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                _cprofile_lock.release()
+            sampler.stop()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            try:
+                base = write_profile(name, sampler, profiler)
+            except OSError as e:
+                logger.warning(f"Could not write profile for {name}: {str(e)}")
+                base = None
+            top, idle_share = sampler.top_functions(int(os.environ.get("GOOGLE_ADS_PROFILE_TOP", "5")))
+            hot = ", ".join(f"{function} {share:.0%}" for function, share in top) or "no samples"
+            logger.info(
+                f"Profiled {name} in {elapsed_ms:.1f} ms ({sum(sampler.samples.values())} samples, "
+                f"{idle_share:.0%} waiting): {hot}"
+                + (f" -> {base}.collapsed" + ("/.prof" if profiler is not None else "") if base else "")
+            )
+
+    return wrapper
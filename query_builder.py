@@ -0,0 +1,151 @@
+"""
+Projection of canned reports into metric rows and cached entity attributes.
+
+A canned report that selects entity attributes next to segmented metrics gets
+the attributes repeated on every row: analyze_image_assets() used to receive
+an image's URL and size once per campaign it runs in. A Projection splits such
+a report in two:
+
+- one metrics query that selects only the entity IDs and the metrics, and
+- per entity resource, an attribute query for the IDs that query returned
+  (asset.id IN (...)), whose results are cached per entity
+
+and then joins the attributes into the metric rows locally. The joined rows
+have the same shape as rows of the combined query, so formatting code does
+not change. Attributes such as names and image sizes rarely change, so
+repeated reports only run the metrics query.
+
+That only pays off while the attribute cache outlives the report. Where it
+does not, such as a stdio server started for one call, combined_query() runs
+the report as the single query it replaces.
+"""
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import shared_state
+
+# IDs per attribute query; keeps the IN list well below the GAQL query size limit
+ATTRIBUTE_BATCH_SIZE = 1000
+
+
+def camel_case(name: str) -> str:
+    """REST key of a GAQL resource or field name, e.g. image_asset -> imageAsset."""
+    head, *rest = name.split('_')
+    return head + ''.join(word.title() for word in rest)
+
+
+def field_path(field: str) -> List[str]:
+    return [camel_case(part) for part in field.split('.')]
+
+
+class Projection:
+    """A canned report as one metrics query plus attribute lookups per entity resource."""
+
+    def __init__(self, resource: str, metrics: List[str], attributes: Dict[str, List[str]],
+                 where: str = "", order_by: str = "", limit: Optional[int] = None):
+        """
+        Args:
+            resource: FROM resource of the metrics query, e.g. "campaign_asset"
+            metrics: Metric (and segment) fields of the metrics query
+            attributes: Entity resource -> its attribute fields, e.g. {"asset": ["asset.name"]};
+                the metrics query selects <resource>.id of each
+            where: WHERE condition of the metrics query
+            order_by: ORDER BY clause of the metrics query
+            limit: LIMIT of the metrics query
+        """
+        self.resource = resource
+        self.metrics = metrics
+        self.attributes = attributes
+        self.where = where
+        self.order_by = order_by
+        self.limit = limit
+
+    def metrics_query(self) -> str:
+        return self._query([f"{entity}.id" for entity in self.attributes] + self.metrics)
+
+    def combined_query(self) -> str:
+        """One query selecting the attributes next to the metrics, for when they are not cached."""
+        fields = []
+        for entity, attribute_fields in self.attributes.items():
+            fields += [f"{entity}.id"] + [field for field in attribute_fields if field != f"{entity}.id"]
+        return self._query(fields + self.metrics)
+
+    def _query(self, fields: List[str]) -> str:
+        query = f"SELECT {', '.join(fields)} FROM {self.resource}"
+        if self.where:
+            query += f" WHERE {self.where}"
+        if self.order_by:
+            query += f" ORDER BY {self.order_by}"
+        if self.limit is not None:
+            query += f" LIMIT {self.limit}"
+        return query
+
+    def entity_ids(self, rows: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+        """Entity resource -> distinct IDs in the metric rows, in first-seen order."""
+        found = {}
+        for entity in self.attributes:
+            key = camel_case(entity)
+            ids = (str(row.get(key, {}).get('id') or "") for row in rows)
+            found[entity] = [entity_id for entity_id in dict.fromkeys(ids) if entity_id]
+        return found
+
+    def join(self, rows: List[Dict[str, Any]], attributes: Dict[str, Dict[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Merge attributes into the metric rows in place.
+
+        Args:
+            attributes: Entity resource -> entity ID -> that entity's REST object
+                (e.g. {"id": "1", "name": "Logo", "imageAsset": {...}})
+        """
+        for entity, by_id in attributes.items():
+            key = camel_case(entity)
+            for row in rows:
+                node = row.get(key)
+                found = by_id.get(str(node.get('id'))) if node else None
+                if found:
+                    row[key] = {**found, **node}
+        return rows
+
+
+def attribute_queries(entity: str, fields: List[str], ids: List[str]) -> List[str]:
+    """GAQL selecting the attribute fields of some entities, ATTRIBUTE_BATCH_SIZE IDs per query."""
+    selected = ", ".join([f"{entity}.id"] + [field for field in fields if field != f"{entity}.id"])
+    return [
+        f"SELECT {selected} FROM {entity} WHERE {entity}.id IN ({', '.join(ids[start:start + ATTRIBUTE_BATCH_SIZE])})"
+        for start in range(0, len(ids), ATTRIBUTE_BATCH_SIZE)
+    ]
+
+
+def cached_attributes(cache: shared_state.ResultCache, ttl: float, customer_id: str, entity: str,
+                      fields: List[str], ids: Iterable[str],
+                      search: Callable[[str], List[Dict[str, Any]]]) -> Tuple[Dict[str, Dict[str, Any]], int]:
+    """
+    Attributes of some entities, querying only those not in the cache.
+
+    Args:
+        search: Runs a GAQL query for customer_id and returns all its rows
+
+    Returns:
+        Tuple of (entity ID -> REST object of the entity, number of IDs found in the cache);
+        IDs the API does not return are left out
+    """
+    fieldset = ",".join(sorted(fields))
+    found: Dict[str, Dict[str, Any]] = {}
+    missing = []
+    for entity_id in ids:
+        cached = cache.get(f"{customer_id}/{entity}/{entity_id}/{fieldset}")
+        if cached is None:
+            missing.append(entity_id)
+        else:
+            found[entity_id] = cached
+    hits = len(found)
+
+    key = camel_case(entity)
+    for query in attribute_queries(entity, fields, missing):
+        for row in search(query):
+            node = row.get(key, {})
+            entity_id = str(node.get('id') or "")
+            if entity_id:
+                found[entity_id] = node
+                cache.set(f"{customer_id}/{entity}/{entity_id}/{fieldset}", node, ttl)
+    return found, hits
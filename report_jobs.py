@@ -0,0 +1,238 @@
+"""
+Background report jobs for result sets too large for one tool call.
+
+start_report() in google_ads_server.py creates a ReportJob and returns its ID
+at once. A background thread then pages through the query for every account
+of the job, several accounts at a time, and appends each row to a JSONL spool
+file. get_report_status() and get_report_result() read the job's progress and
+pages of the spooled rows, so the client never holds a request open for the
+whole pull and a client timeout does not restart it.
+
+The job's state is saved next to its spool as JSON after every account and
+every HEARTBEAT_INTERVAL seconds, with the ID of the process running it, so
+the status and spooled rows stay readable from another server process (such
+as another --workers worker) or after a restart. An unfinished job is reported
+as "interrupted", with the rows spooled so far, only once its process is gone
+or its state has not been saved for STALE_AFTER seconds.
+
+Files are named <job_id>.jsonl and <job_id>.json in the job directory and are
+not deleted automatically.
+"""
+
+import os
+import time
+import uuid
+import threading
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import fast_json
+
+# fetch_page(customer_id, query, page_token) -> (rows, next page token or None)
+FetchPage = Callable[[str, str, Optional[str]], Tuple[List[Dict[str, Any]], Optional[str]]]
+
+FINISHED = ("done", "failed", "cancelled", "interrupted")
+
+# Seconds between state saves of a running job, and without one before it counts as interrupted
+HEARTBEAT_INTERVAL = 10
+STALE_AFTER = 60
+
+
+def process_alive(pid: Optional[int]) -> bool:
+    """Whether a process of this host is running (assumed so where signals cannot probe it)."""
+    if not pid:
+        return False
+    if os.name == "nt":
+        # os.kill() terminates the process on Windows; rely on the heartbeat there
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class ReportJob:
+    """Progress and outcome of one report pull."""
+
+    def __init__(self, job_id: str, query: str, customer_ids: List[str], spool_path: Path):
+        self.job_id = job_id
+        self.query = query
+        self.customer_ids = customer_ids
+        self.spool_path = spool_path
+        self.status = "queued"
+        self.rows = 0
+        self.pages = 0
+        self.accounts_done = 0
+        # customer ID -> error message of accounts that failed
+        self.errors: Dict[str, str] = {}
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        # Process running the job and when it last saved the job's state
+        self.pid: Optional[int] = os.getpid()
+        self.heartbeat = self.created_at
+        self.cancelled = threading.Event()
+
+    @property
+    def state_path(self) -> Path:
+        return self.spool_path.with_suffix(".json")
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "query": self.query,
+            "customer_ids": self.customer_ids,
+            "status": self.status,
+            "rows": self.rows,
+            "pages": self.pages,
+            "accounts_done": self.accounts_done,
+            "errors": dict(self.errors),
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "pid": self.pid,
+            "heartbeat": self.heartbeat,
+        }
+
+    @classmethod
+    def from_snapshot(cls, state: Dict[str, Any], spool_path: Path) -> "ReportJob":
+        job = cls(state["job_id"], state["query"], state["customer_ids"], spool_path)
+        for key in ("status", "rows", "pages", "accounts_done", "errors", "created_at", "finished_at"):
+            setattr(job, key, state[key])
+        # State files written before heartbeats were recorded have neither
+        job.pid = state.get("pid")
+        job.heartbeat = state.get("heartbeat", 0.0)
+        return job
+
+
+class JobManager:
+    """Runs report jobs in background threads and serves their spooled rows."""
+
+    def __init__(self, job_dir: str, workers: int = 4):
+        self.job_dir = Path(job_dir)
+        self.workers = max(1, workers)
+        self.jobs: Dict[str, ReportJob] = {}
+        self._lock = threading.Lock()
+
+    def start(self, customer_ids: List[str], query: str, fetch_page: FetchPage) -> ReportJob:
+        """Create a job and start pulling its rows in a background thread."""
+        self.job_dir.mkdir(parents=True, exist_ok=True)
+        job_id = uuid.uuid4().hex[:12]
+        job = ReportJob(job_id, " ".join(query.split()), customer_ids, self.job_dir / f"{job_id}.jsonl")
+        job.spool_path.touch()
+        with self._lock:
+            self.jobs[job_id] = job
+            self._save(job)
+        threading.Thread(target=self._run, args=(job, fetch_page), name=f"report-job-{job_id}", daemon=True).start()
+        return job
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        """A job of this process, or one loaded from its saved state."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is not None or not job_id.isalnum():
+            return job
+        state_path = self.job_dir / f"{job_id}.json"
+        try:
+            state = fast_json.loads(state_path.read_bytes())
+        except (OSError, fast_json.JSONDecodeError):
+            return None
+        job = ReportJob.from_snapshot(state, state_path.with_suffix(".jsonl"))
+        if job.status not in FINISHED and (
+            not process_alive(job.pid) or time.time() - job.heartbeat > STALE_AFTER
+        ):
+            # Started by a process that is gone
+            job.status = "interrupted"
+        return job
+
+    def cancel(self, job_id: str) -> bool:
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is None or job.status in FINISHED:
+            return False
+        job.cancelled.set()
+        return True
+
+    def read(self, job: ReportJob, offset: int, limit: int) -> List[Dict[str, Any]]:
+        """Spooled rows offset <= i < offset + limit, of those fully written so far."""
+        stop = min(offset + limit, job.rows)
+        if stop <= offset:
+            return []
+        with open(job.spool_path, "rb") as spool:
+            return [fast_json.loads(line) for line in islice(spool, offset, stop)]
+
+    def _run(self, job: ReportJob, fetch_page: FetchPage) -> None:
+        job.status = "running"
+        self._save(job)
+        multi_account = len(job.customer_ids) > 1
+        spool_lock = threading.Lock()
+        stopped = threading.Event()
+
+        def heartbeat() -> None:
+            while not stopped.wait(HEARTBEAT_INTERVAL):
+                with spool_lock:
+                    self._save(job)
+
+        beating = threading.Thread(target=heartbeat, name=f"report-job-{job.job_id}-heartbeat", daemon=True)
+        beating.start()
+
+        def pull(customer_id: str) -> None:
+            page_token = None
+            try:
+                while not job.cancelled.is_set():
+                    rows, page_token = fetch_page(customer_id, job.query, page_token)
+                    if multi_account:
+                        for row in rows:
+                            row.setdefault("customer", {}).setdefault("id", customer_id)
+                    lines = "".join(fast_json.dumps(row) + "\n" for row in rows)
+                    with spool_lock:
+                        with open(job.spool_path, "a", encoding="utf-8") as spool:
+                            spool.write(lines)
+                        job.rows += len(rows)
+                        job.pages += 1
+                    if not page_token:
+                        break
+            except Exception as e:
+                with spool_lock:
+                    job.errors[customer_id] = getattr(e, "text", None) or str(e)
+            with spool_lock:
+                job.accounts_done += 1
+                self._save(job)
+
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(job.customer_ids) or 1)) as pool:
+            list(pool.map(pull, job.customer_ids))
+        stopped.set()
+        beating.join()
+
+        if job.cancelled.is_set():
+            job.status = "cancelled"
+        elif job.customer_ids and len(job.errors) == len(job.customer_ids):
+            job.status = "failed"
+        else:
+            job.status = "done"
+        job.finished_at = time.time()
+        self._save(job)
+
+    def _save(self, job: ReportJob) -> None:
+        job.heartbeat = time.time()
+        temporary = job.state_path.with_suffix(".json.tmp")
+        temporary.write_text(fast_json.dumps(job.snapshot()), encoding="utf-8")
+        os.replace(temporary, job.state_path)
+
+
+def describe(job: ReportJob) -> List[str]:
+    """Status lines of a job for get_report_status()."""
+    finished = job.finished_at or time.time()
+    lines = [
+        f"Job {job.job_id}: {job.status}",
+        f"Query: {job.query}",
+        f"Accounts: {job.accounts_done}/{len(job.customer_ids)} done" + (f" ({len(job.errors)} failed)" if job.errors else ""),
+        f"Rows: {job.rows:,} in {job.pages:,} pages",
+        f"Elapsed: {finished - job.created_at:.1f}s",
+    ]
+    for customer_id, error in job.errors.items():
+        lines.append(f"  {customer_id}: {error[:200]}")
+    return lines
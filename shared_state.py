@@ -0,0 +1,424 @@
+"""
+State shared by all tool calls in one long-running server process.
+
+When the server runs over HTTP (see google_ads_server.py --transport), many MCP
+clients use the same process, so they can share:
+
+- a result cache of Google Ads API responses (ResultCache), so identical
+  queries from different clients within the TTL cost one API call
+- a rate limiter (RateLimiter) that keeps the whole process under a
+  requests-per-second budget for the developer token
+- account metadata (AccountCache): name, currency, time zone and manager flag
+  per customer ID, which rarely change and are needed in most conversations,
+  and the login-customer-id of accounts below a manager
+- requests in flight (SingleFlight), so identical requests made at the same
+  moment, e.g. by an account fan-out and a client's own query, share one API
+  call even when the result cache is off
+
+All are thread-safe; API requests run in asyncio.to_thread workers.
+
+With several worker processes (google_ads_server.py --workers N) the in-memory
+versions would give every worker its own cache and its own request budget, so
+SqliteResultCache, SqliteRateLimiter and SqliteAccountCache keep the same state
+in one SQLite file that all workers on the machine share. The file also lets
+stdio servers started per tool call reuse account metadata and, through
+SqliteAttributeCache, the entity attributes of canned reports. The limiters can also enforce a daily
+request budget, raising QuotaExhausted once it is used up.
+"""
+
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from cassettes import normalize_payload
+
+
+class QuotaExhausted(Exception):
+    """Raised by a rate limiter when the daily request budget is used up."""
+
+
+def utc_day() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+def request_key(base_url: str, method: str, path: str, payload: Optional[dict], login_customer_id: Optional[str]) -> str:
+    """Cache key of an API request; GAQL whitespace does not change it."""
+    request = json.dumps([base_url, method.upper(), path, normalize_payload(payload), login_customer_id], sort_keys=True)
+    return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    In-memory LRU cache of raw API response bodies with a per-entry TTL.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one.
+
+    The first caller of a key runs the function; callers that arrive while it
+    runs wait for it and get its result, or its exception.
+    """
+
+    def __init__(self):
+        # Key -> [done event, result, exception] of the call in flight
+        self._calls: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, function: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run function, or wait for the call already running under key.
+
+        Returns:
+            Tuple of (result, whether it came from another caller's call)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None]
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1], True
+
+        try:
+            call[1] = function()
+        except BaseException as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call[0].set()
+        return call[1], False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+class AccountCache:
+    """
+    In-memory account metadata by customer ID with a per-entry TTL.
+
+    It also keeps the login-customer-id of accounts below a manager, so
+    requests are routed without crawling the hierarchy again.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, tuple] = {}
+        # customer ID -> (expires at, login-customer-id)
+        self._login_customers: Dict[str, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(customer_id)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return dict(entry[1])
+
+    def set_many(self, accounts: Dict[str, Dict[str, Any]], ttl: float) -> None:
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            for customer_id, metadata in accounts.items():
+                self._entries[customer_id] = (expires_at, dict(metadata))
+
+    def login_customer_id(self, customer_id: str) -> Optional[str]:
+        """The login-customer-id a hierarchy crawl found for an account, if any."""
+        with self._lock:
+            entry = self._login_customers.get(customer_id)
+            if entry is None or entry[0] <= time.monotonic():
+                return None
+            return entry[1]
+
+    def set_login_customer_ids(self, login_customer_ids: Dict[str, str], ttl: float) -> None:
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            for customer_id, login_customer_id in login_customer_ids.items():
+                self._login_customers[customer_id] = (expires_at, login_customer_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._login_customers.clear()
+
+
+class RateLimiter:
+    """
+    Token bucket limiting requests per second across all threads.
+
+    A rate of 0 disables limiting. Up to `burst` requests may start at once
+    after an idle period. A daily_limit above 0 caps requests per UTC day.
+    """
+
+    def __init__(self, rate: float, burst: Optional[float] = None, daily_limit: int = 0):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.daily_limit = daily_limit
+        self._tokens = self.burst
+        self._updated = time.time()
+        self._day = utc_day()
+        self._day_count = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 or self.daily_limit > 0
+
+    def acquire(self) -> float:
+        """
+        Take one token, sleeping until one is available.
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            QuotaExhausted: If the daily request budget is used up
+        """
+        if not self.enabled:
+            return 0.0
+
+        with self._lock:
+            self._tokens, self._updated, self._day, self._day_count, wait = reserve(
+                self.rate, self.burst, self.daily_limit,
+                self._tokens, self._updated, self._day, self._day_count
+            )
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+def reserve(rate: float, burst: float, daily_limit: int, tokens: float, updated: float, day: str, day_count: int) -> tuple:
+    """
+    Token bucket step shared by the limiters: refill, check the daily budget, reserve one token.
+
+    Returns:
+        Tuple of (tokens, updated, day, day_count, seconds to wait) after the reservation
+
+    Raises:
+        QuotaExhausted: If the daily request budget is used up
+    """
+    now = time.time()
+    today = utc_day()
+    if day != today:
+        day, day_count = today, 0
+    if daily_limit > 0 and day_count >= daily_limit:
+        raise QuotaExhausted(f"Daily budget of {daily_limit} Google Ads API requests is used up for {day} (UTC)")
+    day_count += 1
+
+    if rate <= 0:
+        return tokens, now, day, day_count, 0.0
+
+    tokens = min(burst, tokens + (now - updated) * rate)
+    # Reserve the token now; a negative balance is the queue of waiting requests
+    tokens -= 1
+    wait = -tokens / rate if tokens < 0 else 0.0
+    return tokens, now, day, day_count, wait
+
+
+class SqliteState:
+    """Per-thread connections to the SQLite file shared by worker processes."""
+
+    def __init__(self, path: str):
+        import sqlite3
+
+        self.path = path
+        self._sqlite3 = sqlite3
+        self._local = threading.local()
+        with self.connection() as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            self.create_tables(connection)
+
+    def connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA busy_timeout=30000")
+            self._local.connection = connection
+        return connection
+
+    def create_tables(self, connection) -> None:
+        raise NotImplementedError
+
+
+class SqliteResultCache(SqliteState):
+    """
+    ResultCache stored in SQLite, shared by every process using the same file.
+    """
+
+    table = "result_cache"
+
+    def __init__(self, path: str, max_entries: int = 256):
+        self.max_entries = max_entries
+        super().__init__(path)
+
+    def create_tables(self, connection) -> None:
+        connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, expires_at REAL, stored_at REAL, value TEXT)"
+        )
+
+    def get(self, key: str) -> Optional[str]:
+        row = self.connection().execute(
+            f"SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        connection = self.connection()
+        connection.execute(
+            f"INSERT OR REPLACE INTO {self.table} (key, expires_at, stored_at, value) VALUES (?, ?, ?, ?)",
+            (key, now + ttl, now, value)
+        )
+        # Drop expired entries, then the oldest ones beyond max_entries
+        connection.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+        connection.execute(
+            f"DELETE FROM {self.table} WHERE key IN "
+            f"(SELECT key FROM {self.table} ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        )
+
+    def clear(self) -> None:
+        self.connection().execute(f"DELETE FROM {self.table}")
+
+
+class SqliteAttributeCache(SqliteResultCache):
+    """ResultCache of entity attributes (JSON objects) stored in SQLite, next to the result cache."""
+
+    table = "entity_attributes"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        value = super().get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key: str, value: Dict[str, Any], ttl: float) -> None:
+        super().set(key, json.dumps(value), ttl)
+
+
+class SqliteAccountCache(SqliteState):
+    """AccountCache stored in SQLite, shared by every process using the same file."""
+
+    def create_tables(self, connection) -> None:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS account_cache (customer_id TEXT PRIMARY KEY, expires_at REAL, value TEXT)"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS login_customers "
+            "(customer_id TEXT PRIMARY KEY, expires_at REAL, login_customer_id TEXT)"
+        )
+
+    def get(self, customer_id: str) -> Optional[Dict[str, Any]]:
+        row = self.connection().execute(
+            "SELECT value FROM account_cache WHERE customer_id = ? AND expires_at > ?", (customer_id, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set_many(self, accounts: Dict[str, Dict[str, Any]], ttl: float) -> None:
+        expires_at = time.time() + ttl
+        self.connection().executemany(
+            "INSERT OR REPLACE INTO account_cache (customer_id, expires_at, value) VALUES (?, ?, ?)",
+            [(customer_id, expires_at, json.dumps(metadata)) for customer_id, metadata in accounts.items()]
+        )
+
+    def login_customer_id(self, customer_id: str) -> Optional[str]:
+        row = self.connection().execute(
+            "SELECT login_customer_id FROM login_customers WHERE customer_id = ? AND expires_at > ?",
+            (customer_id, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_login_customer_ids(self, login_customer_ids: Dict[str, str], ttl: float) -> None:
+        expires_at = time.time() + ttl
+        self.connection().executemany(
+            "INSERT OR REPLACE INTO login_customers (customer_id, expires_at, login_customer_id) VALUES (?, ?, ?)",
+            [(customer_id, expires_at, login_customer_id) for customer_id, login_customer_id in login_customer_ids.items()]
+        )
+
+    def clear(self) -> None:
+        self.connection().execute("DELETE FROM account_cache")
+        self.connection().execute("DELETE FROM login_customers")
+
+
+class SqliteRateLimiter(SqliteState):
+    """RateLimiter whose bucket and daily count live in SQLite, shared by every process using the file."""
+
+    def __init__(self, path: str, rate: float, burst: Optional[float] = None, daily_limit: int = 0):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.daily_limit = daily_limit
+        super().__init__(path)
+
+    def create_tables(self, connection) -> None:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS rate_limiter "
+            "(id INTEGER PRIMARY KEY CHECK (id = 1), tokens REAL, updated REAL, day TEXT, day_count INTEGER)"
+        )
+        connection.execute(
+            "INSERT OR IGNORE INTO rate_limiter (id, tokens, updated, day, day_count) VALUES (1, ?, ?, ?, 0)",
+            (self.burst, time.time(), utc_day())
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 or self.daily_limit > 0
+
+    def acquire(self) -> float:
+        """Same as RateLimiter.acquire(), coordinated across processes."""
+        if not self.enabled:
+            return 0.0
+
+        connection = self.connection()
+        # BEGIN IMMEDIATE takes the write lock, so reservations from all workers are serialized
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT tokens, updated, day, day_count FROM rate_limiter WHERE id = 1").fetchone()
+            tokens, updated, day, day_count, wait = reserve(self.rate, self.burst, self.daily_limit, *row)
+            connection.execute(
+                "UPDATE rate_limiter SET tokens = ?, updated = ?, day = ?, day_count = ? WHERE id = 1",
+                (tokens, updated, day, day_count)
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
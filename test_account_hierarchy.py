@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import account_hierarchy
+
+
+def client_rows(manager_id, children):
+    """HIERARCHY_QUERY rows: the manager at level 0, then (id, manager flag) children at level 1."""
+    rows = [{"customerClient": {"id": manager_id, "level": "0", "manager": True, "descriptiveName": f"Manager {manager_id}"}}]
+    for child_id, manager in children:
+        rows.append({"customerClient": {"id": child_id, "level": "1", "manager": manager, "descriptiveName": f"Account {child_id}"}})
+    return rows
+
+
+def test_index_links_levels_and_login_customers():
+    index = account_hierarchy.HierarchyIndex()
+    index.set_roots(["1000000001"])
+    assert index.update_manager("1000000001", client_rows("1000000001", [("1000000002", True), ("1000000003", False)])) == ["1000000002"]
+    index.update_manager("1000000002", client_rows("1000000002", [("1000000004", False)]))
+
+    assert index.subtree("1000000001") == ["1000000001", "1000000002", "1000000004", "1000000003"]
+    assert index.subtree("1000000002") == ["1000000002", "1000000004"]
+    assert index.login_customer_id("1000000004") == "1000000001"
+    assert index.login_customer_id("1000000001") == "1000000001"
+    assert index.login_customer_id("9999999999") is None
+    assert index.render("1000000001", {"1000000003": {"currency": "EUR", "time_zone": "Europe/Berlin"}}) == [
+        "1000000001 | Manager 1000000001 | manager",
+        "  1000000002 | Manager 1000000002 | manager",
+        "    1000000004 | Account 1000000004",
+        "  1000000003 | Account 1000000003 | EUR, Europe/Berlin",
+    ]
+
+
+def test_refresh_drops_unlinked_subtrees_but_keeps_roots():
+    index = account_hierarchy.HierarchyIndex()
+    index.set_roots(["1000000001", "1000000003"])
+    index.update_manager("1000000001", client_rows("1000000001", [("1000000002", True), ("1000000003", False)]))
+    index.update_manager("1000000002", client_rows("1000000002", [("1000000004", False)]))
+    assert index.top_level() == ["1000000001"]
+    # Directly accessible accounts need no manager
+    assert index.login_customer_id("1000000003") == "1000000003"
+
+    assert index.needs_crawl("1000000002", ttl=3600) is False
+    assert index.needs_crawl("1000000002", ttl=0) is True
+    index.update_manager("1000000001", client_rows("1000000001", []))
+
+    assert index.subtree("1000000001") == ["1000000001"]
+    assert "1000000002" not in index.nodes and "1000000004" not in index.nodes
+    assert index.top_level() == ["1000000001", "1000000003"]
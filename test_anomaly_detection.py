@@ -0,0 +1,80 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+np = pytest.importorskip("numpy")
+
+import anomaly_detection
+
+DATES = anomaly_detection.date_range(date(2024, 3, 1), date(2024, 3, 14))
+
+
+def daily_rows(campaign_id, name, clicks_by_day, cost_per_click=0.5):
+    return [
+        {
+            "campaign": {"id": campaign_id, "name": name},
+            "segments": {"date": day},
+            "metrics": {
+                "impressions": str(clicks * 20),
+                "clicks": str(clicks),
+                "costMicros": str(int(clicks * cost_per_click * 1_000_000)),
+                "conversions": clicks / 10,
+            },
+        }
+        for day, clicks in zip(DATES, clicks_by_day)
+    ]
+
+
+def test_build_matrices_fills_missing_days():
+    rows = daily_rows("1", "Brand", [100] * 14) + daily_rows("2", "Generic", [40] * 3)
+    entity_ids, names, matrices = anomaly_detection.build_matrices(rows, "campaign", DATES)
+    assert entity_ids == ["1", "2"]
+    assert names == {"1": "Brand", "2": "Generic"}
+    assert matrices["spend"].shape == (2, 14)
+    assert matrices["spend"][0, 0] == pytest.approx(50.0)
+    assert matrices["spend"][1, 5] == 0.0
+    assert np.isnan(matrices["ctr"][1, 5]) and np.isnan(matrices["cpc"][1, 5])
+    assert matrices["ctr"][0, 0] == pytest.approx(0.05)
+
+
+def test_detect_flags_only_the_spike():
+    steady = [100, 104, 98, 101, 99, 103, 97, 100, 102, 98, 101, 99, 100, 103]
+    spiking = steady[:10] + [400] + steady[11:]
+    rows = daily_rows("1", "Brand", steady) + daily_rows("2", "Generic", spiking)
+    result = anomaly_detection.detect(rows, "campaign", DATES, 7, 3.5)
+
+    assert result["entities"] == 2
+    assert result["days"] == 7
+    flagged = {(anomaly["id"], anomaly["date"], anomaly["metric"]) for anomaly in result["anomalies"]}
+    assert flagged == {("2", "2024-03-11", "spend"), ("2", "2024-03-11", "conversions")}
+    top = result["anomalies"][0]
+    assert top["value"] == pytest.approx(200.0)
+    assert top["baseline"] == pytest.approx(50.0)
+    assert top["z"] > 3.5
+
+
+def test_robust_scores_skip_days_without_history():
+    matrix = np.array([[1.0, 2.0, 3.0, 50.0]])
+    baseline, scores = anomaly_detection.robust_scores(matrix, 3, 1.0)
+    assert np.isnan(scores[0, :3]).all()
+    assert baseline[0, 3] == pytest.approx(2.0)
+    assert scores[0, 3] == pytest.approx(48.0 / 1.4826)
+
+
+def test_format_anomalies():
+    rows = daily_rows("1", "Brand", [100] * 10 + [400] + [100] * 3)
+    result = anomaly_detection.detect(rows, "campaign", DATES, 7, 3.5)
+    output = anomaly_detection.format_anomalies(result, "campaign", "1234567890", 3.5, 1)
+    lines = output.split("\n")
+    assert lines[0] == "Anomalies for account 1234567890 by campaign: 2 flagged (|robust z| >= 3.5) across 1 entities x 7 days"
+    assert lines[2].startswith("date       | campaign.id | campaign.name | metric")
+    assert lines[4].startswith("2024-03-11 | 1           | Brand         |")
+    assert lines[-1] == "... 1 more not shown"
+
+    empty = anomaly_detection.detect([], "campaign", DATES, 7, 3.5)
+    assert anomaly_detection.format_anomalies(empty, "campaign", "1234567890", 3.5, 10).endswith("No anomalies found.")
@@ -0,0 +1,47 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import fast_json
+
+RESPONSE = {
+    "results": [
+        {"campaign": {"id": "1", "name": "Été – Brand"}, "metrics": {"clicks": "10", "ctr": 0.0125, "conversions": 1.5}},
+        {"campaign": {"id": "2", "name": "Display", "labels": []}, "metrics": {"clicks": "0", "ctr": 0.0}},
+    ],
+    "fieldMask": "campaign.id,campaign.name,metrics.clicks",
+    "totalResultsCount": "2",
+}
+
+
+def test_stdlib_backend_round_trips(monkeypatch):
+    monkeypatch.setattr(fast_json, "_orjson", None)
+    assert fast_json.backend() == "stdlib"
+    assert fast_json.loads(fast_json.dumps(RESPONSE)) == RESPONSE
+    assert fast_json.loads(fast_json.dumps(RESPONSE).encode("utf-8")) == RESPONSE
+    assert fast_json.dumps(RESPONSE, indent=True) == json.dumps(RESPONSE, indent=2, ensure_ascii=False)
+    assert "\n" not in fast_json.dumps(RESPONSE) and ", " not in fast_json.dumps(RESPONSE)
+    with pytest.raises(fast_json.JSONDecodeError):
+        fast_json.loads('{"results": [')
+
+
+def test_orjson_backend_matches_stdlib(monkeypatch):
+    orjson = pytest.importorskip("orjson")
+    monkeypatch.setattr(fast_json, "_orjson", orjson)
+    assert fast_json.backend() == "orjson"
+    fast = (fast_json.dumps(RESPONSE), fast_json.dumps(RESPONSE, indent=True))
+    assert fast_json.loads(fast[0]) == RESPONSE
+
+    monkeypatch.setattr(fast_json, "_orjson", None)
+    assert fast == (fast_json.dumps(RESPONSE), fast_json.dumps(RESPONSE, indent=True))
+
+    monkeypatch.setattr(fast_json, "_orjson", orjson)
+    with pytest.raises(fast_json.JSONDecodeError):
+        fast_json.loads('{"results": [')
+    # Integers orjson cannot represent are encoded by the stdlib
+    assert fast_json.dumps({"id": 2 ** 70}) == '{"id":1180591620717411303424}'
@@ -0,0 +1,54 @@
+import json
+import sys
+from pathlib import Path
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import gaql_format
+
+ROWS = [
+    {"campaign": {"id": "1", "name": "Brand, Search"}, "metrics": {"clicks": "10"}},
+    {"campaign": {"id": "22", "name": "Display"}, "metrics": {"clicks": "5"}},
+]
+
+
+def test_format_csv():
+    assert gaql_format.format_results({"results": ROWS}, "csv", "1234567890") == (
+        "campaign.id,campaign.name,metrics.clicks\n"
+        "1,Brand; Search,10\n"
+        "22,Display,5"
+    )
+
+
+def test_format_table():
+    lines = gaql_format.format_results({"results": ROWS}, "TABLE", "1234567890").split("\n")
+    assert lines[0] == "Query Results for Account 1234567890:"
+    assert lines[2] == "campaign.id | campaign.name | metrics.clicks"
+    assert lines[4] == "1           | Brand, Search | 10            "
+
+
+def test_format_json():
+    response = {"results": ROWS, "fieldMask": "campaign.id"}
+    assert json.loads(gaql_format.format_results(response, "json", "1234567890")) == response
+
+
+def test_render_response_body():
+    body = json.dumps({"results": ROWS})
+    assert gaql_format.render_response_body(body, "simple", "1234567890") == (2, "\n".join([
+        "Query Results for Account 1234567890:",
+        "-" * 80,
+        "campaign.id | campaign.name | metrics.clicks",
+        "-" * 80,
+        "1 | Brand, Search | 10",
+        "22 | Display | 5",
+    ]))
+    assert gaql_format.render_response_body('{"results": []}', "table", "1234567890") == (0, "")
+    assert gaql_format.render_response_body("{}", "csv", "1234567890") == (0, "")
+
+
+def test_format_json_compact():
+    response = {"results": ROWS}
+    output = gaql_format.format_results(response, "json_compact", "1234567890")
+    assert "\n" not in output
+    assert json.loads(output) == response
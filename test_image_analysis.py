@@ -0,0 +1,105 @@
+import io
+import sys
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import image_analysis
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+requires_pillow = pytest.mark.skipif(Image is None, reason="Pillow is not installed")
+
+
+def make_image(path, size, color, fmt):
+    image = Image.new('RGB', size, color)
+    # A gradient so the perceptual hash is not all zeros
+    for x in range(size[0]):
+        image.putpixel((x, size[1] // 2), (x % 256, 0, 0))
+    image.save(path, fmt)
+
+
+@requires_pillow
+def test_read_image_header_formats(tmp_path):
+    for fmt, ext in (('PNG', '.png'), ('JPEG', '.jpg'), ('GIF', '.gif'), ('WEBP', '.webp')):
+        path = tmp_path / f"sample{ext}"
+        make_image(path, (191, 100), (10, 20, 30), fmt)
+        assert image_analysis.read_image_header(path.read_bytes()) == (fmt, 191, 100)
+
+
+def test_closest_aspect_ratio():
+    assert image_analysis.closest_aspect_ratio(1200, 628) == ('1.91:1', True)
+    assert image_analysis.closest_aspect_ratio(1200, 1200) == ('1:1', True)
+    assert image_analysis.closest_aspect_ratio(1000, 700)[1] is False
+    assert image_analysis.closest_aspect_ratio(None, 100) == (None, False)
+
+
+def test_find_near_duplicates_matches_bruteforce():
+    hashes = {
+        'a': '0000000000000000',
+        'b': '0000000000000007',
+        'c': 'ffffffffffffffff',
+        'd': 'fffffffffffffff0',
+        'e': '0f0f0f0f0f0f0f0f',
+    }
+    pairs = image_analysis.find_near_duplicates(hashes, max_distance=4)
+    assert pairs == [('a', 'b', 3), ('c', 'd', 4)]
+
+
+@requires_pillow
+def test_analyze_images_uses_index(tmp_path):
+    make_image(tmp_path / 'one.png', (100, 100), (200, 10, 10), 'PNG')
+    make_image(tmp_path / 'two.jpg', (300, 100), (10, 200, 10), 'JPEG')
+    index_path = tmp_path / image_analysis.INDEX_NAME
+
+    files = image_analysis.list_image_files(tmp_path)
+    analyses, analyzed = image_analysis.analyze_images(files, index_path, max_workers=2)
+    assert analyzed == 2
+    assert analyses[str(tmp_path / 'two.jpg')]['aspect_ratio_ok'] is False
+    assert analyses[str(tmp_path / 'one.png')]['phash'] is not None
+
+    make_image(tmp_path / 'three.png', (100, 100), (1, 2, 3), 'PNG')
+    analyses, analyzed = image_analysis.analyze_images(image_analysis.list_image_files(tmp_path), index_path)
+    assert analyzed == 1
+    assert len(analyses) == 3
+
+
+@requires_pillow
+def test_jpeg_size_is_found_past_large_metadata(tmp_path):
+    path = tmp_path / 'profiled.jpg'
+    # A large ICC profile is split across APP2 segments ahead of the frame header
+    Image.new('RGB', (1200, 628), (10, 20, 30)).save(path, 'JPEG', icc_profile=bytes(200_000))
+    assert image_analysis.read_image_header(path.read_bytes()[:image_analysis.HEADER_READ_SIZE]) == ('JPEG', None, None)
+    with open(path, 'rb') as f:
+        assert image_analysis.jpeg_file_dimensions(f) == (1200, 628)
+
+    analysis = image_analysis.analyze_image_file(str(path))
+    assert (analysis['width'], analysis['height'], analysis['aspect_ratio_ok']) == (1200, 628, True)
+
+
+@requires_pillow
+def test_analyze_images_uses_given_executor_and_retries_unknown_sizes(tmp_path):
+    make_image(tmp_path / 'one.png', (100, 100), (200, 10, 10), 'PNG')
+    make_image(tmp_path / 'two.png', (191, 100), (10, 200, 10), 'PNG')
+    index_path = tmp_path / image_analysis.INDEX_NAME
+    files = image_analysis.list_image_files(tmp_path)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        analyses, analyzed = image_analysis.analyze_images(files, index_path, executor)
+    assert analyzed == 2
+
+    # An index entry without a size, as older header-only analyses left for some JPEGs
+    index = image_analysis.load_index(index_path)
+    stale = analyses[str(tmp_path / 'one.png')]['sha256']
+    index[stale].update({'width': None, 'height': None, 'aspect_ratio_ok': False})
+    image_analysis.save_index(index_path, index)
+    analyses, analyzed = image_analysis.analyze_images(files, index_path)
+    assert analyzed == 1
+    assert analyses[str(tmp_path / 'one.png')]['width'] == 100
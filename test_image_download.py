@@ -0,0 +1,89 @@
+import http.server
+import hashlib
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import google_ads_server
+
+PNG_BYTES = b'\x89PNG\r\n\x1a\n' + b'\x00' * 200_000
+GIF_BYTES = b'GIF89a' + b'\x01' * 1000
+
+
+class ImageHandler(http.server.BaseHTTPRequestHandler):
+    images = {'/a.png': PNG_BYTES, '/b.png': PNG_BYTES, '/c': GIF_BYTES}
+
+    def do_GET(self):
+        body = self.images.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_images():
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), ImageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def test_detect_image_extension():
+    assert google_ads_server.detect_image_extension(b'\xff\xd8\xff\xe0rest') == '.jpg'
+    assert google_ads_server.detect_image_extension(PNG_BYTES[:16]) == '.png'
+    assert google_ads_server.detect_image_extension(b'GIF87a...') == '.gif'
+    assert google_ads_server.detect_image_extension(b'RIFF\x00\x00\x00\x00WEBPVP8 ') == '.webp'
+    assert google_ads_server.detect_image_extension(b'????', 'image/jpeg') == '.jpg'
+    assert google_ads_server.detect_image_extension(b'????') == '.bin'
+
+
+def test_download_image_to_store_dedupes_by_content(tmp_path):
+    server, base_url = serve_images()
+    try:
+        first = google_ads_server.download_image_to_store('1', f"{base_url}/a.png", tmp_path)
+        second = google_ads_server.download_image_to_store('2', f"{base_url}/b.png", tmp_path)
+        third = google_ads_server.download_image_to_store('3', f"{base_url}/c", tmp_path)
+    finally:
+        server.shutdown()
+
+    assert first['file'] == f"{hashlib.sha256(PNG_BYTES).hexdigest()}.png"
+    assert not first['deduplicated']
+    assert second['file'] == first['file'] and second['deduplicated']
+    assert third['file'].endswith('.gif')
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([first['file'], third['file']])
+    assert (tmp_path / first['file']).read_bytes() == PNG_BYTES
+
+
+def test_failed_download_is_not_an_api_error(tmp_path):
+    server, base_url = serve_images()
+    try:
+        with pytest.raises(google_ads_server.ImageDownloadError) as error:
+            google_ads_server.download_image_to_store('1', f"{base_url}/missing.png", tmp_path)
+    finally:
+        server.shutdown()
+
+    assert error.value.status_code == 404
+    assert not isinstance(error.value, google_ads_server.GoogleAdsApiError)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_load_image_manifest_skips_missing_files(tmp_path):
+    (tmp_path / 'abc.png').write_bytes(b'x')
+    (tmp_path / google_ads_server.IMAGE_MANIFEST_NAME).write_text(
+        '{"asset_id": "1", "file": "abc.png"}\n'
+        '{"asset_id": "2", "file": "gone.png"}\n'
+        '{"asset_id": "3", "fi'
+    )
+    assert list(google_ads_server.load_image_manifest(tmp_path)) == ['1']
@@ -0,0 +1,107 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import local_sql
+
+CAMPAIGNS = [
+    {"campaign": {"id": "1", "name": "Brand", "status": "ENABLED"}},
+    {"campaign": {"id": "2", "name": "Generic", "status": "PAUSED"}},
+]
+METRICS = [
+    {"campaign": {"id": "1"}, "segments": {"date": "2024-03-01"}, "metrics": {"costMicros": "1500000", "conversions": 1.5}},
+    {"campaign": {"id": "1"}, "segments": {"date": "2024-03-02"}, "metrics": {"costMicros": "2500000", "conversions": 0}},
+    {"campaign": {"id": "2"}, "segments": {"date": "2024-03-01"}, "metrics": {"costMicros": "1000000"}},
+]
+
+
+def test_flatten_uses_snake_case_columns():
+    row = {"adGroupCriterion": {"keyword": {"text": "shoes", "matchType": "EXACT"}}, "metrics": {"costMicros": "10"}}
+    assert local_sql.flatten(row) == {
+        "ad_group_criterion_keyword_text": "shoes",
+        "ad_group_criterion_keyword_match_type": "EXACT",
+        "metrics_cost_micros": "10",
+    }
+
+
+def test_column_types():
+    assert local_sql.column_type(["1", "20", None]) == "BIGINT"
+    assert local_sql.column_type([1.5, "2"]) == "DOUBLE"
+    assert local_sql.column_type(["2024-03-01"]) == "TEXT"
+    assert local_sql.column_type([True, False]) == "BOOLEAN"
+    assert local_sql.column_type([["https://example.com"]]) == "TEXT"
+    assert local_sql.column_type([None]) == "TEXT"
+
+
+def test_join_across_loaded_tables():
+    database = local_sql.LocalDatabase("sqlite")
+    columns = database.load("campaigns", "1234567890", "SELECT campaign.id FROM campaign", CAMPAIGNS)
+    assert columns == [("customer_id", "TEXT"), ("campaign_id", "BIGINT"), ("campaign_name", "TEXT"), ("campaign_status", "TEXT")]
+    database.load("campaign_metrics", "1234567890", "SELECT metrics.cost_micros FROM campaign", METRICS)
+
+    names, rows, truncated = database.query(
+        "SELECT c.campaign_name, SUM(m.metrics_cost_micros) / 1e6 AS cost, SUM(m.metrics_conversions) AS conversions "
+        "FROM campaign_metrics m JOIN campaigns c USING (campaign_id) GROUP BY 1 ORDER BY 2 DESC",
+        1,
+    )
+    assert names == ["campaign_name", "cost", "conversions"]
+    assert rows == [("Brand", 4.0, 1.5)]
+    assert truncated
+
+    assert local_sql.format_rows(names, rows, "table").split("\n") == [
+        "campaign_name | cost | conversions",
+        "----------------------------------",
+        "Brand         | 4    | 1.5        ",
+    ]
+    assert local_sql.format_rows(names, rows, "csv") == "campaign_name,cost,conversions\nBrand,4,1.5"
+
+
+def test_query_is_read_only():
+    database = local_sql.LocalDatabase("sqlite")
+    database.load("campaigns", "1234567890", "", CAMPAIGNS)
+    with pytest.raises(ValueError):
+        database.query("DELETE FROM campaigns", 10)
+    with pytest.raises(Exception):
+        database.query("WITH doomed AS (SELECT 1) DELETE FROM campaigns", 10)
+    assert database.query("SELECT COUNT(*) FROM campaigns", 10)[1] == [(2,)]
+
+
+def test_load_replaces_table_and_rejects_bad_names():
+    database = local_sql.LocalDatabase("sqlite")
+    database.load("campaigns", "1234567890", "", CAMPAIGNS)
+    database.load("campaigns", "1234567890", "", CAMPAIGNS[:1])
+    assert database.query("SELECT COUNT(*) FROM campaigns", 10)[1] == [(1,)]
+    assert database.describe()[0].startswith("campaigns (1 rows from account 1234567890, loaded ")
+    with pytest.raises(ValueError):
+        database.load("campaigns; DROP TABLE x", "1234567890", "", CAMPAIGNS)
+
+
+def test_multiple_statements_are_rejected():
+    database = local_sql.LocalDatabase("sqlite")
+    database.load("campaigns", "1234567890", "", CAMPAIGNS)
+    with pytest.raises(ValueError):
+        database.query("SELECT 1; DROP TABLE campaigns", 10)
+    with pytest.raises(ValueError):
+        database.query("SELECT 1 /* ; */; DELETE FROM campaigns", 10)
+    assert database.query("SELECT campaign_name FROM campaigns WHERE campaign_name <> 'a;b' -- ;\n;", 10)[1] == [
+        ("Brand",), ("Generic",)
+    ]
+    assert local_sql.single_statement('SELECT "x;y" FROM t;')
+    assert not local_sql.single_statement("SELECT 'unterminated; DROP TABLE t")
+
+
+def test_file_database_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "tables.sqlite")
+    local_sql.LocalDatabase("sqlite", path).load("campaigns", "1234567890", "SELECT campaign.id FROM campaign", CAMPAIGNS)
+
+    # A later process, such as the next stdio server glm_client starts, sees the table
+    database = local_sql.LocalDatabase("sqlite", path)
+    assert database.query("SELECT COUNT(*) FROM campaigns", 10)[1] == [(2,)]
+    assert database.tables["campaigns"]["query"] == "SELECT campaign.id FROM campaign"
+    assert database.describe()[1] == "  customer_id TEXT, campaign_id BIGINT, campaign_name TEXT, campaign_status TEXT"
+    with pytest.raises(ValueError):
+        database.load(local_sql.CATALOG_TABLE, "1234567890", "", CAMPAIGNS)
@@ -0,0 +1,42 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_latency_seconds", "Test latency.", ("tool",), buckets=(0.1, 1.0))
+    histogram.observe(0.05, tool="a")
+    histogram.observe(0.5, tool="a")
+    histogram.observe(5, tool="a")
+    assert histogram.render() == [
+        'test_latency_seconds_bucket{tool="a",le="0.1"} 1',
+        'test_latency_seconds_bucket{tool="a",le="1"} 2',
+        'test_latency_seconds_bucket{tool="a",le="+Inf"} 3',
+        'test_latency_seconds_sum{tool="a"} 5.55',
+        'test_latency_seconds_count{tool="a"} 3',
+    ]
+
+
+def test_counter_escapes_label_values():
+    counter = metrics.Counter("test_total", "Test counter.", ("customer_id",))
+    counter.inc(customer_id='a"b')
+    counter.inc(2, customer_id='a"b')
+    assert counter.render() == ['test_total{customer_id="a\\"b"} 3']
+
+
+def test_instrument_tool_classifies_error_strings():
+    @metrics.instrument_tool
+    async def sample_tool(fail: bool) -> str:
+        return "Error: nope" if fail else "fine"
+
+    asyncio.run(sample_tool(False))
+    asyncio.run(sample_tool(True))
+    assert metrics.TOOL_CALLS.value(tool="sample_tool", status="ok") == 1
+    assert metrics.TOOL_CALLS.value(tool="sample_tool", status="error") == 1
+    assert metrics.TOOL_LATENCY.count(tool="sample_tool") == 2
+    assert "# TYPE google_ads_mcp_tool_calls_total counter" in metrics.REGISTRY.render()
@@ -0,0 +1,614 @@
+import asyncio
+import json
+import sys
+import time
+import threading
+from pathlib import Path
+
+import pytest
+import requests
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import google_ads_server
+import shared_state
+from mock_google_ads_server import MockConfig, start_mock_server, write_mock_credentials
+
+
+@pytest.fixture
+def mock_api(tmp_path, monkeypatch):
+    """Point google_ads_server at a local mock API with refreshable OAuth credentials."""
+    server = start_mock_server(MockConfig(rows=25, page_size=10))
+    credentials_path = tmp_path / "google_ads_token.json"
+    write_mock_credentials(str(credentials_path), server.base_url)
+
+    monkeypatch.setattr(google_ads_server, "GOOGLE_ADS_API_BASE_URL", server.base_url)
+    monkeypatch.setattr(google_ads_server, "GOOGLE_ADS_OAUTH_TOKEN_URI", f"{server.base_url}/token")
+    monkeypatch.setattr(google_ads_server, "GOOGLE_ADS_CREDENTIALS_PATH", str(credentials_path))
+    monkeypatch.setattr(google_ads_server, "GOOGLE_ADS_DEVELOPER_TOKEN", "mock-developer-token")
+    monkeypatch.setattr(google_ads_server, "GOOGLE_ADS_AUTH_TYPE", "oauth")
+    monkeypatch.setattr(google_ads_server, "account_cache", shared_state.AccountCache())
+    monkeypatch.setattr(google_ads_server, "_hierarchy_index", None)
+    monkeypatch.setattr(google_ads_server, "_undiscoverable", {})
+    monkeypatch.setattr(google_ads_server, "pivot_tables", shared_state.ResultCache())
+    monkeypatch.setattr(google_ads_server, "entity_attributes", shared_state.ResultCache())
+    monkeypatch.setattr(google_ads_server, "_local_database", None)
+    monkeypatch.setattr(google_ads_server, "_job_manager", None)
+    monkeypatch.chdir(tmp_path)
+    yield server
+    server.stop()
+
+
+def test_list_accounts_refreshes_token(mock_api):
+    result = asyncio.run(google_ads_server.list_accounts())
+    assert "Account ID: 1234567890" in result
+    assert "Account ID: 9876543210" in result
+    assert mock_api.request_counts["token"] == 1
+
+
+def test_account_metadata_is_cached(mock_api):
+    result = asyncio.run(google_ads_server.list_accounts())
+    assert "Account ID: 1234567890 | Account 1234567890 | USD | America/New_York | manager" in result
+    # One customer_client query (3 pages of the mock) per account
+    assert mock_api.request_counts["search"] == 6
+
+    currency = asyncio.run(google_ads_server.get_account_currency("123-456-7890"))
+    assert currency == "Account 1234567890 uses currency: USD (time zone: America/New_York)"
+    client = asyncio.run(google_ads_server.get_account_currency("0000000002"))
+    assert client.startswith("Account 0000000002 uses currency: USD")
+    assert mock_api.request_counts["search"] == 6
+
+
+def test_account_hierarchy_routes_login_customer(mock_api):
+    mock_api.config.accounts = {"1000000001": None}
+    mock_api.config.managers = {"1000000001": ["1000000002", "1000000003"], "1000000002": ["1000000004"]}
+    query = "SELECT campaign.id FROM campaign LIMIT 1"
+
+    # The API refuses accounts below a manager without a login-customer-id, so the first
+    # request crawls the hierarchy and is retried through the manager
+    assert asyncio.run(google_ads_server.run_gaql("1000000004", query, "csv")) == "campaign.id\n1"
+    assert google_ads_server.hierarchy_index().login_customer_id("1000000004") == "1000000001"
+
+    result = asyncio.run(google_ads_server.get_account_hierarchy("", False))
+    assert result.split("\n")[2:6] == [
+        "1000000001 | Account 1000000001 | USD, America/New_York | manager",
+        "  1000000002 | Account 1000000002 | USD, America/New_York | manager",
+        "    1000000004 | Account 1000000004 | USD, America/New_York",
+        "  1000000003 | Account 1000000003 | USD, America/New_York",
+    ]
+    assert result.endswith("4 accounts (2 managers)")
+    assert asyncio.run(google_ads_server.run_gaql("1000000004", query, "csv")) == "campaign.id\n1"
+
+    # Recently crawled managers are not queried again; a refresh picks up new clients
+    searches = mock_api.request_counts["search"]
+    subtree = asyncio.run(google_ads_server.get_account_hierarchy("1000000002", False))
+    assert subtree.endswith("2 accounts (1 managers)")
+    assert mock_api.request_counts["search"] == searches
+    mock_api.config.managers["1000000002"].append("1000000005")
+    subtree = asyncio.run(google_ads_server.get_account_hierarchy("1000000002", True))
+    assert "  1000000005 | Account 1000000005 | USD, America/New_York" in subtree
+
+
+def test_login_customer_routes_persist_across_processes(mock_api, monkeypatch, tmp_path):
+    mock_api.config.accounts = {"1000000001": None}
+    mock_api.config.managers = {"1000000001": ["1000000002"]}
+    monkeypatch.setattr(google_ads_server, "account_cache", shared_state.SqliteAccountCache(str(tmp_path / "state.db")))
+    query = "SELECT campaign.id FROM campaign LIMIT 1"
+    asyncio.run(google_ads_server.get_account_hierarchy("", False))
+
+    # A new process has no hierarchy index, but finds the route in the shared account cache
+    monkeypatch.setattr(google_ads_server, "_hierarchy_index", None)
+    monkeypatch.setattr(google_ads_server, "account_cache", shared_state.SqliteAccountCache(str(tmp_path / "state.db")))
+    searches = mock_api.request_counts["search"]
+    assert asyncio.run(google_ads_server.run_gaql("1000000002", query, "csv")) == "campaign.id\n1"
+    assert mock_api.request_counts["search"] == searches + 1
+
+    # An account no crawl finds fails as before, and is not crawled for again right away
+    assert "PERMISSION_DENIED" in asyncio.run(google_ads_server.run_gaql("1000000009", query, "csv"))
+    searches = mock_api.request_counts["search"]
+    assert "PERMISSION_DENIED" in asyncio.run(google_ads_server.run_gaql("1000000009", query, "csv"))
+    assert mock_api.request_counts["search"] == searches + 1
+
+
+def test_compare_periods(mock_api):
+    result = asyncio.run(google_ads_server.compare_periods("1234567890", "ad_group", 7, "clicks", 5, "2024-03-14"))
+    lines = result.split("\n")
+    assert lines[1:3] == ["Current:  2024-03-08 to 2024-03-14", "Previous: 2024-03-01 to 2024-03-07"]
+    assert "Top 5 of 25 by absolute change in clicks:" in lines
+    assert lines[-7].startswith("ad_group.id | ad_group.name | campaign.name | clicks previous")
+    assert mock_api.request_counts["search"] == 6
+
+    assert asyncio.run(google_ads_server.compare_periods("1234567890", "ad", 7, "clicks", 5, "")).startswith("Unknown level")
+
+
+def test_detect_anomalies(mock_api):
+    pytest.importorskip("numpy")
+    # 10 campaigns over 7 baseline days + 7 checked days
+    mock_api.config.rows = 140
+    result = asyncio.run(google_ads_server.detect_anomalies("1234567890", "campaign", 7, 7, 2.0, 5, "2024-03-14"))
+    lines = result.split("\n")
+    assert lines[0].startswith("Anomalies for account 1234567890 by campaign: ")
+    assert lines[0].endswith("across 10 entities x 7 days")
+    assert mock_api.request_counts["search"] == 14
+
+    assert asyncio.run(google_ads_server.detect_anomalies("1234567890", "keyword", 7, 7, 3.5, 5, "")).startswith("Unknown level")
+
+
+def test_pivot_report_reuses_cached_table(mock_api):
+    result = asyncio.run(google_ads_server.pivot_report(
+        "1234567890", "ad_group", "", "cost", 5, "", True, 100, "2024-03-14", False
+    ))
+    lines = result.split("\n")
+    assert lines[0] == "Pivot report for account 1234567890, 2024-03-10 to 2024-03-14 (ad_group table, 25 rows, fetched)"
+    assert lines[2].startswith("ad_group ")
+    assert lines[-1].startswith("Total ")
+    searches = mock_api.request_counts["search"]
+
+    # Re-slicing the same window at the same level is answered from the cached table
+    result = asyncio.run(google_ads_server.pivot_report(
+        "1234567890", "campaign,ad_group,date", "device", "clicks,ctr", 5, "network=AD_NETWORK_TYPE_0", True, 100, "2024-03-14", False
+    ))
+    assert result.split("\n")[0].endswith("(ad_group table, 25 rows, cached)")
+    assert result.split("\n")[1] == "Filters: network=AD_NETWORK_TYPE_0"
+    assert mock_api.request_counts["search"] == searches
+
+    # Campaign pivots need campaign rows, which include campaigns without ad groups
+    result = asyncio.run(google_ads_server.pivot_report(
+        "1234567890", "campaign", "", "cost", 5, "", True, 100, "2024-03-14", False
+    ))
+    assert result.split("\n")[0].endswith("(campaign table, 25 rows, fetched)")
+    searches = mock_api.request_counts["search"]
+
+    asyncio.run(google_ads_server.pivot_report(
+        "1234567890", "campaign", "", "cost", 5, "", True, 100, "2024-03-14", True
+    ))
+    assert mock_api.request_counts["search"] > searches
+
+    assert asyncio.run(google_ads_server.pivot_report(
+        "1234567890", "keyword", "", "cost", 5, "", True, 100, "", False
+    )).startswith("Unknown dimension")
+
+
+def test_asset_usage_joins_campaign_and_ad_group_links(mock_api, monkeypatch):
+    result = asyncio.run(google_ads_server.get_asset_usage("1234567890", "3", "IMAGE"))
+    lines = [line.rstrip() for line in result.split("\n")]
+    assert lines[2:5] == ["", "Asset ID: 3", "Name: Asset 3"]
+    assert "Campaign | Campaign 3 (3)                 | All ad groups" in lines
+    assert "Ad Group | Campaign 3 (3)                 | Ad Group 3 (3)" in lines
+    # The asset, campaign_asset and ad_group_asset queries
+    assert mock_api.request_counts["search"] == 3
+
+    # An asset without campaign or ad group links is listed without a usage table
+    search_all = google_ads_server.search_all
+
+    def without_links_to_asset_2(customer_id, query, headers):
+        rows = search_all(customer_id, query, headers)
+        if "campaign_asset" not in query and "ad_group_asset" not in query:
+            return rows
+        return [row for row in rows if row["asset"]["id"] != "2"]
+
+    monkeypatch.setattr(google_ads_server, "search_all", without_links_to_asset_2)
+    result = asyncio.run(google_ads_server.get_asset_usage("1234567890", "", "IMAGE"))
+    blocks = {block.split("\n")[0]: block for block in result.split("\nAsset ID: ")[1:]}
+    assert len(blocks) == 25
+    assert "Used in:" not in blocks["2"]
+    assert "Used in:" in blocks["1"]
+
+    assert asyncio.run(google_ads_server.get_asset_usage("1234567890", "999", "IMAGE")) == "No IMAGE assets found for this customer ID."
+
+
+def test_analyze_image_assets_caches_asset_attributes(mock_api, monkeypatch):
+    monkeypatch.setattr(google_ads_server, "long_running_server", True)
+    result = asyncio.run(google_ads_server.analyze_image_assets("1234567890", 30))
+    assert "Name: Asset 1\nDimensions: 1200 x 628" in result
+    assert "Used in 1 campaigns:\n  - Campaign 1" in result
+    assert f"Image URL: {mock_api.base_url}/images/2.png" in result
+    # The metrics query, then the assets and campaigns it names (3 pages of the mock each)
+    assert mock_api.request_counts["search"] == 9
+
+    # Attributes are cached, so a repeat only runs the metrics query
+    assert asyncio.run(google_ads_server.analyze_image_assets("1234567890", 30)) == result
+    assert mock_api.request_counts["search"] == 12
+
+    # A stdio server with a shared state file reuses attributes an earlier process cached
+    monkeypatch.setattr(google_ads_server, "long_running_server", False)
+    monkeypatch.setattr(google_ads_server, "GOOGLE_ADS_SHARED_STATE_DB", "shared_state.db")
+    monkeypatch.setattr(google_ads_server, "entity_attributes", shared_state.SqliteAttributeCache("shared_state.db"))
+    assert asyncio.run(google_ads_server.analyze_image_assets("1234567890", 30)) == result
+    assert mock_api.request_counts["search"] == 21
+    monkeypatch.setattr(google_ads_server, "entity_attributes", shared_state.SqliteAttributeCache("shared_state.db"))
+    assert asyncio.run(google_ads_server.analyze_image_assets("1234567890", 30)) == result
+    assert mock_api.request_counts["search"] == 24
+
+
+def test_analyze_image_assets_runs_one_query_without_an_attribute_cache(mock_api):
+    # A stdio server without a shared state file cannot keep attributes for the next call
+    result = asyncio.run(google_ads_server.analyze_image_assets("1234567890", 30))
+    assert "Name: Asset 1\nDimensions: 1200 x 628" in result
+    assert "Used in 1 campaigns:\n  - Campaign 1" in result
+    # The combined query alone (3 pages of the mock)
+    assert mock_api.request_counts["search"] == 3
+
+
+def test_local_sql_joins_loaded_tables(mock_api):
+    assert asyncio.run(google_ads_server.list_sql_tables()).startswith("No tables loaded.")
+    loaded = asyncio.run(google_ads_server.load_sql_table("1234567890", "campaigns", ""))
+    assert loaded.startswith("Loaded 25 rows from account 1234567890 into table campaigns (")
+    assert "campaign_id BIGINT" in loaded
+    asyncio.run(google_ads_server.load_sql_table(
+        "1234567890", "spend", "SELECT campaign.id, metrics.cost_micros FROM campaign WHERE segments.date DURING LAST_7_DAYS"
+    ))
+    searches = mock_api.request_counts["search"]
+
+    # A stdio server process may end after each call; the next one opens the same database file
+    google_ads_server._local_database = None
+    result = asyncio.run(google_ads_server.run_sql(
+        "SELECT COUNT(*) AS campaigns, SUM(s.metrics_cost_micros) > 0 AS has_spend "
+        "FROM campaigns c JOIN spend s USING (campaign_id)", 10, "csv"
+    ))
+    assert result.split("\n")[0] == "campaigns,has_spend"
+    assert result.split("\n")[1].endswith(",1")
+    assert mock_api.request_counts["search"] == searches
+
+    failed = asyncio.run(google_ads_server.run_sql("SELECT * FROM missing", 10, "table"))
+    assert failed.startswith("Error running SQL: ")
+    assert "Loaded tables:" in failed
+    assert "campaigns (25 rows from account 1234567890" in asyncio.run(google_ads_server.list_sql_tables())
+    assert asyncio.run(google_ads_server.load_sql_table("1234567890", "custom", "")).startswith("No query given")
+
+
+def test_background_report_job(mock_api):
+    started = asyncio.run(google_ads_server.start_report(
+        "1234567890, 9876543210", "SELECT campaign.id, metrics.clicks FROM campaign", False
+    ))
+    assert started.startswith("Started job ")
+    job_id = started.split()[2]
+
+    status = asyncio.run(google_ads_server.get_report_status(job_id, 10))
+    assert status.split("\n")[0] == f"Job {job_id}: done"
+    assert "Accounts: 2/2 done" in status
+    assert "Rows: 50 in 6 pages" in status
+
+    page = asyncio.run(google_ads_server.get_report_result(job_id, 40, 5, "csv"))
+    lines = page.split("\n")
+    assert lines[0] == f"Rows 40-44 of 50 (job {job_id} is done)"
+    assert lines[1] == "campaign.id,metrics.clicks,customer.id"
+    assert lines[-1] == f'Next page: get_report_result(job_id="{job_id}", offset=45)'
+    assert (Path.cwd() / "report_jobs" / f"{job_id}.jsonl").exists()
+
+    assert asyncio.run(google_ads_server.get_report_status("missing", 0)) == "Unknown job 'missing'."
+
+
+def test_report_status_waits_for_a_job_of_another_worker(mock_api):
+    import report_jobs
+
+    release = threading.Event()
+
+    def slow_fetch(customer_id, query, page_token):
+        release.wait(5)
+        return [{"campaign": {"id": "1"}}], None
+
+    # Started by another --workers process sharing the job directory
+    other_worker = report_jobs.JobManager(google_ads_server.GOOGLE_ADS_JOB_DIR)
+    job = other_worker.start(["1234567890"], "SELECT campaign.id FROM campaign", slow_fetch)
+    threading.Timer(1.0, release.set).start()
+
+    started = time.monotonic()
+    status = asyncio.run(google_ads_server.get_report_status(job.job_id, 30))
+    assert status.split("\n")[0] == f"Job {job.job_id}: done"
+    assert "Rows: 1 in 1 pages" in status
+    assert time.monotonic() - started < 10
+
+
+def test_search_all_follows_pages(mock_api):
+    headers = google_ads_server.get_headers(google_ads_server.get_credentials())
+    rows = google_ads_server.search_all("123-456-7890", "SELECT campaign.id, metrics.clicks FROM campaign", headers)
+    assert [row["campaign"]["id"] for row in rows] == [str(i) for i in range(1, 26)]
+    assert mock_api.request_counts["search"] == 3
+
+
+def test_run_gaql_csv(mock_api):
+    result = asyncio.run(google_ads_server.run_gaql(
+        "1234567890", "SELECT campaign.id, campaign.name FROM campaign LIMIT 3", "csv"
+    ))
+    assert result.split("\n") == [
+        "campaign.id,campaign.name",
+        "1,Campaign 1",
+        "2,Campaign 2",
+        "3,Campaign 3",
+    ]
+
+
+def test_large_responses_are_formatted_in_process_pool(mock_api, monkeypatch):
+    query = "SELECT campaign.id, campaign.name FROM campaign LIMIT 3"
+    expected = asyncio.run(google_ads_server.run_gaql("1234567890", query, "table"))
+
+    monkeypatch.setattr(google_ads_server, "GOOGLE_ADS_CPU_OFFLOAD_MIN_BYTES", 1)
+    assert asyncio.run(google_ads_server.run_gaql("1234567890", query, "table")) == expected
+    assert google_ads_server._cpu_pool is not None
+    # Workers are not forked from the threaded server process
+    assert google_ads_server._cpu_pool._mp_context.get_start_method() in ("forkserver", "spawn")
+    simple = asyncio.run(google_ads_server.execute_gaql_query("1234567890", query))
+    assert simple.split("\n")[2:5] == ["campaign.id | campaign.name", "-" * 80, "1 | Campaign 1"]
+
+
+def test_injected_errors_are_reported(mock_api):
+    mock_api.config.fail_next = [429]
+    result = asyncio.run(google_ads_server.run_gaql(
+        "1234567890", "SELECT campaign.id FROM campaign", "table"
+    ))
+    assert result.startswith("Error executing query:")
+    assert "RESOURCE_EXHAUSTED" in result
+
+
+def test_search_stream_batches(mock_api):
+    mock_api.config.stream_batch_size = 10
+    response = requests.post(
+        f"{mock_api.base_url}/v19/customers/1234567890/googleAds:searchStream",
+        headers={"Authorization": "Bearer x", "developer-token": "y"},
+        json={"query": "SELECT campaign.id, segments.date FROM campaign WHERE segments.date DURING LAST_7_DAYS"},
+    )
+    batches = response.json()
+    # 25 rows over 7 days is 3 campaigns with 7 daily rows each
+    assert [len(batch["results"]) for batch in batches] == [10, 10, 1]
+    assert batches[0]["results"][0]["segments"]["date"] < batches[0]["results"][6]["segments"]["date"]
+
+
+def test_download_image_assets_resumes(mock_api):
+    first = asyncio.run(google_ads_server.download_image_assets("1234567890", ["1", "2", "3"], "./ad_images", 4))
+    assert "Downloaded: 3" in first
+    second = asyncio.run(google_ads_server.download_image_assets("1234567890", None, "./ad_images", 4))
+    assert "Skipped (already downloaded): 3" in second
+    assert "Downloaded: 22" in second
+    assert len(list(Path("ad_images").glob("*.png"))) == 25
+
+
+def test_run_gaql_batch_reports_errors_per_item(mock_api):
+    result = json.loads(asyncio.run(google_ads_server.run_gaql_batch([
+        {"customer_id": "1234567890", "query": "SELECT campaign.id FROM campaign LIMIT 2", "format": "json"},
+        {"customer_id": "5555555555", "query": "SELECT campaign.id FROM campaign"},
+        {"customer_id": "1234567890", "query": "SELECT nonsense"},
+    ], 3)))["results"]
+    assert result[0]["status"] == "ok" and result[0]["row_count"] == 2
+    assert result[1]["status"] == "error" and "PERMISSION_DENIED" in result[1]["error"]
+    assert result[2]["status"] == "error" and "INVALID_ARGUMENT" in result[2]["error"]
+
+
+def test_run_gaql_batch_returns_one_page_per_query(mock_api):
+    result = json.loads(asyncio.run(google_ads_server.run_gaql_batch([
+        {"customer_id": "1234567890", "query": "SELECT campaign.id, campaign.name FROM campaign", "format": "csv"},
+        {"customer_id": "1234567890", "query": "SELECT ad_group.id FROM ad_group", "format": "json"},
+    ], 2)))["results"]
+    # The mock serves 25 rows in pages of 10; like run_gaql, only the first page is read
+    assert [item["row_count"] for item in result] == [10, 10]
+    assert result[0]["output"].split("\n")[0] == "campaign.id,campaign.name"
+    assert len(result[1]["rows"]) == 10
+    assert mock_api.request_counts["search"] == 2
+
+
+def test_run_gaql_batch_json_compact_is_smaller(mock_api):
+    def batch(format):
+        return asyncio.run(google_ads_server.run_gaql_batch([
+            {"customer_id": "1234567890", "query": "SELECT campaign.id, campaign.name, metrics.clicks FROM campaign", "format": format},
+            {"customer_id": "1234567890", "query": "SELECT ad_group.id, ad_group.name FROM ad_group", "format": format},
+        ], 2))
+
+    indented, compact = batch("json"), batch("json_compact")
+    assert len(compact) < len(indented)
+    assert "\n" not in compact
+    assert [item["rows"] for item in json.loads(compact)["results"]] == [item["rows"] for item in json.loads(indented)["results"]]
+
+
+def test_cassette_record_then_replay_offline(mock_api, monkeypatch):
+    import gzip
+    query = "SELECT campaign.id, campaign.name, metrics.clicks FROM campaign"
+    monkeypatch.setattr(google_ads_server, "GOOGLE_ADS_CASSETTE_MODE", "record")
+    recorded = asyncio.run(google_ads_server.run_gaql("1234567890", query, "csv"))
+
+    cassette_files = list(Path("cassettes").glob("*.json.gz"))
+    assert len(cassette_files) == 1
+    with gzip.open(cassette_files[0], "rt") as f:
+        cassette = json.load(f)
+    assert cassette["request"]["headers"]["Authorization"] == "REDACTED"
+    assert cassette["request"]["headers"]["developer-token"] == "REDACTED"
+    assert "mock-developer-token" not in json.dumps(cassette)
+
+    # Replay needs neither the API nor credentials; query whitespace does not matter
+    mock_api.stop()
+    monkeypatch.setattr(google_ads_server, "GOOGLE_ADS_CASSETTE_MODE", "replay")
+    monkeypatch.setattr(google_ads_server, "GOOGLE_ADS_CREDENTIALS_PATH", None)
+    replayed = asyncio.run(google_ads_server.run_gaql("1234567890", f"  {query}\n", "csv"))
+    assert replayed == recorded
+
+    missing = asyncio.run(google_ads_server.run_gaql("1234567890", "SELECT campaign.id FROM campaign", "csv"))
+    assert missing.startswith("Error executing query: No cassette recorded")
+
+
+def test_metrics_record_tool_and_api_calls(mock_api):
+    import metrics
+    before = metrics.API_LATENCY.count(endpoint="googleAds:search", status="200", customer_id="1234567890")
+    asyncio.run(google_ads_server.run_gaql("1234567890", "SELECT campaign.id FROM campaign", "csv"))
+
+    assert metrics.API_LATENCY.count(endpoint="googleAds:search", status="200", customer_id="1234567890") == before + 1
+    assert metrics.TOOL_CALLS.value(tool="run_gaql", status="ok") >= 1
+    assert metrics.TOKEN_REFRESHES.value(result="success") >= 1
+
+    server = metrics.start_http_server(0)
+    try:
+        body = requests.get(f"http://127.0.0.1:{server.server_address[1]}/metrics").text
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 'google_ads_api_rows_total{endpoint="googleAds:search",customer_id="1234567890"}' in body
+
+
+def test_canned_reports_record_one_tool_call(mock_api):
+    import metrics
+    executed = metrics.TOOL_CALLS.value(tool="execute_gaql_query", status="ok")
+    reports = metrics.TOOL_LATENCY.count(tool="get_campaign_performance")
+    asyncio.run(google_ads_server.get_campaign_performance("1234567890", 30))
+
+    assert metrics.TOOL_LATENCY.count(tool="get_campaign_performance") == reports + 1
+    assert metrics.TOOL_CALLS.value(tool="execute_gaql_query", status="ok") == executed
+
+
+def test_credentials_and_results_are_reused(mock_api, monkeypatch):
+    assert google_ads_server.get_credentials() is google_ads_server.get_credentials()
+
+    monkeypatch.setattr(google_ads_server, "GOOGLE_ADS_RESULT_CACHE_TTL", 60)
+    for query in ("SELECT campaign.id FROM campaign LIMIT 5", "SELECT campaign.id\n    FROM campaign LIMIT 5"):
+        result = asyncio.run(google_ads_server.run_gaql("1234567890", query, "csv"))
+        assert result.split("\n")[1] == "1"
+    assert mock_api.request_counts["search"] == 1
+    assert mock_api.request_counts["token"] == 1
+
+
+def test_identical_concurrent_requests_share_one_call(mock_api):
+    mock_api.config.latency_ms = 200
+    query = "SELECT campaign.id FROM campaign LIMIT 3"
+
+    async def run_together():
+        return await asyncio.gather(*(google_ads_server.run_gaql("1234567890", query, "csv") for _ in range(4)))
+
+    assert asyncio.run(run_together()) == ["campaign.id\n1\n2\n3"] * 4
+    assert mock_api.request_counts["search"] == 1
+    # The result cache is off, so a later request goes to the API again
+    asyncio.run(google_ads_server.run_gaql("1234567890", query, "csv"))
+    assert mock_api.request_counts["search"] == 2
+
+
+def test_prefetch_warms_result_cache_within_budget(mock_api, monkeypatch):
+    import prefetch
+
+    monkeypatch.setattr(google_ads_server, "GOOGLE_ADS_RESULT_CACHE_TTL", 60)
+    monkeypatch.setattr(google_ads_server, "result_cache", shared_state.ResultCache())
+    job = prefetch.PrefetchJob({"tool": "get_campaign_performance", "args": {"days": 7}, "accounts": ["1234567890"]})
+    asyncio.run(google_ads_server.run_prefetch_job(job, prefetch.PrefetchBudget(10)))
+    searches = mock_api.request_counts["search"]
+    assert searches > 0
+
+    result = asyncio.run(google_ads_server.get_campaign_performance("1234567890", 7))
+    assert "Campaign" in result
+    assert mock_api.request_counts["search"] == searches
+
+    other_account = prefetch.PrefetchJob({"tool": "get_campaign_performance", "accounts": ["9876543210"]})
+    spent = prefetch.PrefetchBudget(1)
+    assert spent.spend()
+    with pytest.raises(RuntimeError, match="budget"):
+        asyncio.run(google_ads_server.run_prefetch_job(other_account, spent))
+    assert mock_api.request_counts["search"] == searches
+
+
+def test_prefetch_budget_charges_only_requests_sent(mock_api, monkeypatch):
+    import prefetch
+
+    path, payload = "customers/1234567890/googleAds:search", {"query": "SELECT campaign.id FROM campaign"}
+    headers = google_ads_server.get_headers(google_ads_server.get_credentials())
+    budget = prefetch.PrefetchBudget(1)
+    token = google_ads_server.prefetch_budget.set(budget)
+    try:
+        # Answered by an identical request another caller already sent, successfully or not
+        monkeypatch.setattr(google_ads_server.requests_in_flight, "do", lambda key, fetch: ('{"results": []}', True))
+        google_ads_server.send_api_request("POST", path, headers, payload)
+        assert budget.used == 0
+
+        def leader_failed(key, fetch):
+            raise google_ads_server.GoogleAdsApiError(503, "unavailable")
+
+        monkeypatch.setattr(google_ads_server.requests_in_flight, "do", leader_failed)
+        with pytest.raises(google_ads_server.GoogleAdsApiError):
+            google_ads_server.send_api_request("POST", path, headers, payload)
+        assert budget.used == 0
+
+        monkeypatch.setattr(google_ads_server.requests_in_flight, "do", lambda key, fetch: (fetch(), False))
+        google_ads_server.send_api_request("POST", path, headers, payload)
+        assert budget.used == 1
+        # Refused before joining a flight, so no follower shares the error
+        monkeypatch.setattr(google_ads_server.requests_in_flight, "do", None)
+        with pytest.raises(google_ads_server.GoogleAdsApiError, match="budget"):
+            google_ads_server.send_api_request("POST", path, headers, payload)
+    finally:
+        google_ads_server.prefetch_budget.reset(token)
+
+
+def start_http_server(mock_api, tmp_path, *extra_args):
+    """Run google_ads_server.py over streamable HTTP against the mock; returns (process, client_call)."""
+    import os
+    import socket
+    import subprocess
+    import time
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamable_http_client
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    env = {
+        **os.environ,
+        "GOOGLE_ADS_API_BASE_URL": mock_api.base_url,
+        "GOOGLE_ADS_OAUTH_TOKEN_URI": f"{mock_api.base_url}/token",
+        "GOOGLE_ADS_CREDENTIALS_PATH": str(tmp_path / "google_ads_token.json"),
+        "GOOGLE_ADS_DEVELOPER_TOKEN": "mock-developer-token",
+        "GOOGLE_ADS_AUTH_TYPE": "oauth",
+        "GOOGLE_ADS_SHARED_STATE_DB": str(tmp_path / "shared_state.db"),
+    }
+    process = subprocess.Popen(
+        [sys.executable, str(Path(__file__).parent / "google_ads_server.py"),
+         "--transport", "streamable-http", "--port", str(port), *extra_args],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            break
+        except OSError:
+            time.sleep(0.1)
+
+    async def client_call():
+        async with streamable_http_client(f"http://127.0.0.1:{port}/mcp") as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                result = await session.call_tool("run_gaql", {
+                    "customer_id": "1234567890",
+                    "query": "SELECT campaign.id FROM campaign LIMIT 3",
+                    "format": "csv",
+                })
+                return result.content[0].text
+
+    return process, client_call
+
+
+def test_streamable_http_serves_concurrent_clients(mock_api, tmp_path):
+    server, client_call = start_http_server(mock_api, tmp_path)
+
+    async def run_clients():
+        return await asyncio.gather(*(client_call() for _ in range(4)))
+
+    try:
+        outputs = asyncio.run(run_clients())
+        searches = mock_api.request_counts["search"]
+        later_output = asyncio.run(client_call())
+    finally:
+        server.terminate()
+        server.wait()
+
+    assert outputs == ["campaign.id\n1\n2\n3"] * 4
+    # One process serves every client: one token refresh, and a later client gets the cached result
+    assert mock_api.request_counts["token"] == 1
+    assert later_output == outputs[0]
+    assert mock_api.request_counts["search"] == searches
+
+
+def test_workers_share_result_cache(mock_api, tmp_path):
+    server, client_call = start_http_server(mock_api, tmp_path, "--workers", "2")
+    try:
+        outputs = [asyncio.run(client_call()) for _ in range(4)]
+    finally:
+        server.terminate()
+        server.wait()
+
+    assert outputs == ["campaign.id\n1\n2\n3"] * 4
+    # Whichever worker answers, repeats are served from the shared SQLite cache
+    assert mock_api.request_counts["search"] == 1
@@ -0,0 +1,88 @@
+import sys
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import period_comparison
+
+
+def campaign_row(campaign_id, name, clicks, cost_micros):
+    return {
+        "campaign": {"id": campaign_id, "name": name},
+        "metrics": {"impressions": str(clicks * 10), "clicks": str(clicks), "costMicros": str(cost_micros), "conversions": 1.0},
+    }
+
+
+CURRENT = [campaign_row("1", "Brand", 100, 50_000_000), campaign_row("2", "Generic", 40, 30_000_000), campaign_row("3", "New", 5, 2_000_000)]
+PREVIOUS = [campaign_row("1", "Brand", 80, 45_000_000), campaign_row("2", "Generic", 60, 60_000_000), campaign_row("4", "Old", 10, 1_000_000)]
+
+
+def test_windows_are_adjacent():
+    assert period_comparison.windows(7, date(2024, 3, 14)) == (
+        (date(2024, 3, 8), date(2024, 3, 14)),
+        (date(2024, 3, 1), date(2024, 3, 7)),
+    )
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_compare_ranks_by_absolute_change(monkeypatch, use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(period_comparison, "np", None)
+
+    result = period_comparison.compare(CURRENT, PREVIOUS, "campaign", "cost", 3)
+    assert result["entities"] == 4
+    assert result["totals"]["cost"] == pytest.approx((106.0, 82.0))
+    assert [mover["id"] for mover in result["movers"]] == ["2", "1", "3"]
+
+    generic = result["movers"][0]
+    assert generic["names"] == ["Generic"]
+    assert generic["change"]["cost"] == pytest.approx(-30.0)
+    assert generic["percent"]["cost"] == pytest.approx(-50.0)
+    assert generic["percent"]["clicks"] == pytest.approx(-33.333, rel=1e-3)
+    # Only in the current period: no previous value to compare with
+    assert result["movers"][2]["percent"]["cost"] is None
+
+
+def test_format_comparison_lists_top_movers():
+    result = period_comparison.compare(CURRENT, PREVIOUS, "campaign", "cost", 2)
+    output = period_comparison.format_comparison(
+        result, "campaign", "cost", "1234567890", *period_comparison.windows(7, date(2024, 3, 14))
+    )
+    lines = output.split("\n")
+    assert lines[1] == "Current:  2024-03-08 to 2024-03-14"
+    assert "  cost: 106.00 -> 82.00 (-22.6%)" in lines
+    assert "Top 2 of 4 by absolute change in cost:" in lines
+    table = lines[lines.index("Top 2 of 4 by absolute change in cost:") + 1:]
+    assert table[0].startswith("campaign.id | campaign.name | cost previous | cost current | cost change | cost change %")
+    assert table[2].startswith("2           | Generic       | 60.00         | 30.00        | -30.00      | -50.0%")
+
+
+def keyword_row(ad_group_id, ad_group, criterion_id, clicks):
+    return {
+        "adGroup": {"id": ad_group_id, "name": ad_group},
+        "adGroupCriterion": {"criterionId": criterion_id, "keyword": {"text": "running shoes"}},
+        "metrics": {"impressions": str(clicks * 10), "clicks": str(clicks), "costMicros": "0", "conversions": 0.0},
+    }
+
+
+def test_keywords_with_the_same_criterion_id_stay_apart():
+    # The same keyword text and match type has the same criterion ID in every ad group
+    current = [keyword_row("10", "Men", "555", 30), keyword_row("20", "Women", "555", 5)]
+    previous = [keyword_row("10", "Men", "555", 10), keyword_row("20", "Women", "555", 15)]
+    result = period_comparison.compare(current, previous, "keyword", "clicks", 5)
+
+    assert result["entities"] == 2
+    movers = {mover["id"]: mover for mover in result["movers"]}
+    assert movers["10~555"]["names"] == ["running shoes", "Men"]
+    assert movers["10~555"]["change"]["clicks"] == pytest.approx(20.0)
+    assert movers["20~555"]["names"] == ["running shoes", "Women"]
+    assert movers["20~555"]["change"]["clicks"] == pytest.approx(-10.0)
+    assert "SELECT ad_group.id, ad_group_criterion.criterion_id, " in period_comparison.build_query(
+        "keyword", date(2024, 3, 1), date(2024, 3, 7)
+    )
@@ -0,0 +1,75 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import pivot_table
+
+
+def row(campaign, day, device, clicks, cost_micros, conversions=0.0):
+    return {
+        "campaign": {"id": campaign[0], "name": campaign[1]},
+        "segments": {"date": day, "device": device, "adNetworkType": "SEARCH"},
+        "metrics": {
+            "impressions": str(clicks * 10), "clicks": str(clicks), "costMicros": str(cost_micros),
+            "conversions": conversions, "conversionsValue": conversions * 20,
+        },
+    }
+
+
+BRAND = ("1", "Brand")
+GENERIC = ("2", "Generic")
+ROWS = [
+    row(BRAND, "2024-03-04", "MOBILE", 10, 5_000_000, 1.0),
+    row(BRAND, "2024-03-04", "DESKTOP", 20, 8_000_000, 1.0),
+    row(BRAND, "2024-03-11", "MOBILE", 30, 9_000_000, 2.0),
+    row(GENERIC, "2024-03-05", "MOBILE", 5, 4_000_000),
+]
+
+
+def test_level_for_picks_coarsest_table():
+    assert pivot_table.level_for(["campaign", "week", "device"]) == "campaign"
+    assert pivot_table.level_for(["ad_group", "month"]) == "ad_group"
+    assert pivot_table.level_for(["keyword"]) is None
+
+
+def test_table_derives_date_dimensions():
+    table = pivot_table.Table.from_rows(ROWS, "campaign")
+    assert len(table) == 4
+    assert table.column("week") == ["2024-03-04", "2024-03-04", "2024-03-11", "2024-03-04"]
+    assert table.column("month") == ["2024-03"] * 4
+    assert table.column("day_of_week")[3] == "TUESDAY"
+    assert table.columns["cost"][0] == pytest.approx(5.0)
+
+
+def test_aggregate_with_filters():
+    table = pivot_table.Table.from_rows(ROWS, "campaign")
+    groups = table.aggregate(["campaign"], {"device": "mobile"})
+    assert groups[("Brand",)][2] == pytest.approx(14.0)
+    assert groups[("Generic",)][1] == 5
+    assert table.aggregate([], {}) == {(): [pytest.approx(650.0), 65.0, pytest.approx(26.0), 4.0, 80.0]}
+
+
+def test_pivot_with_columns_and_subtotals():
+    table = pivot_table.Table.from_rows(ROWS, "campaign")
+    cells, row_count = pivot_table.pivot(table, ["campaign", "week"], "device", ["cost"], {}, True, 100)
+    assert row_count == 3
+    assert cells[0] == ["campaign", "week", "DESKTOP", "MOBILE", "Total"]
+    assert cells[1] == ["Brand", "2024-03-04", "8.00", "5.00", "13.00"]
+    assert cells[2] == ["Brand", "2024-03-11", "-", "9.00", "9.00"]
+    assert cells[3] == ["Brand subtotal", "", "8.00", "14.00", "22.00"]
+    assert cells[5] == ["Generic subtotal", "", "-", "4.00", "4.00"]
+    assert cells[-1] == ["Total", "", "8.00", "18.00", "26.00"]
+
+
+def test_pivot_ratio_metrics_use_summed_base_metrics():
+    table = pivot_table.Table.from_rows(ROWS, "campaign")
+    cells, _ = pivot_table.pivot(table, ["campaign"], "", ["cpc", "cpa", "ctr"], {}, True, 1)
+    assert cells[0] == ["campaign", "cpc", "cpa", "ctr"]
+    assert cells[1] == ["Brand", "0.37", "5.50", "10.00%"]
+    assert cells[-1] == ["Total", "0.40", "6.50", "10.00%"]
+    lines = pivot_table.format_pivot(cells, 2, 1)
+    assert lines[-1] == "... 1 more rows not shown (totals include them)"
@@ -0,0 +1,85 @@
+import sys
+import asyncio
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import prefetch
+
+
+def test_next_run_for_times_of_day_and_intervals():
+    job = prefetch.PrefetchJob({"tool": "list_accounts", "at": ["06:30", "18:00"], "every": 7200})
+    start = datetime(2024, 3, 14, 5, 0)
+    assert job.next_run(start) == datetime(2024, 3, 14, 6, 30)
+
+    job.last_run = datetime(2024, 3, 14, 6, 30, 2)
+    assert job.next_run(start) == datetime(2024, 3, 14, 8, 30, 2)
+
+    job = prefetch.PrefetchJob({"tool": "list_accounts", "at": ["06:30"]})
+    job.last_run = datetime(2024, 3, 14, 6, 30)
+    assert job.next_run(start) == datetime(2024, 3, 15, 6, 30)
+
+    assert prefetch.PrefetchJob({"tool": "list_accounts"}).next_run(start) is None
+
+
+@pytest.mark.parametrize("spec", [
+    {},
+    {"tool": "run_gaql", "query": "SELECT campaign.id FROM campaign"},
+    {"query": "SELECT campaign.id FROM campaign"},
+    {"tool": "list_accounts", "at": ["25:00"]},
+])
+def test_invalid_jobs_are_rejected(spec):
+    with pytest.raises(ValueError):
+        prefetch.PrefetchJob(spec)
+
+
+def test_load_config(tmp_path):
+    path = tmp_path / "prefetch.json"
+    path.write_text(json.dumps({
+        "budget": 50,
+        "jobs": [{"name": "perf", "tool": "get_campaign_performance", "args": {"days": 7}, "accounts": [1234567890]}],
+    }))
+    jobs, budget, cache_ttl = prefetch.load_config(str(path))
+    assert (budget, cache_ttl) == (50, prefetch.DEFAULT_CACHE_TTL)
+    assert (jobs[0].name, jobs[0].accounts, jobs[0].args) == ("perf", ["1234567890"], {"days": 7})
+
+
+def test_budget_caps_requests_per_day():
+    budget = prefetch.PrefetchBudget(2)
+    assert [budget.spend() for _ in range(3)] == [True, True, False]
+    budget.refund()
+    assert budget.spend()
+    budget.day = "2000-01-01"
+    assert budget.spend()
+    assert all(prefetch.PrefetchBudget(0).spend() for _ in range(100))
+
+
+def test_scheduler_runs_start_jobs_and_due_jobs():
+    now = [datetime(2024, 3, 14, 6, 0)]
+    ran = []
+
+    async def run_job(job):
+        ran.append(job.name)
+        if job.name == "broken":
+            raise RuntimeError("quota")
+
+    jobs = [
+        prefetch.PrefetchJob({"name": "morning", "tool": "list_accounts", "at": ["06:30"], "on_start": False}),
+        prefetch.PrefetchJob({"name": "broken", "tool": "list_accounts"}),
+    ]
+    scheduler = prefetch.PrefetchScheduler(jobs, run_job, clock=lambda: now[0])
+    asyncio.run(scheduler.run_jobs([job for job in jobs if job.on_start]))
+    assert ran == ["broken"]
+    assert scheduler.seconds_until_next(now[0]) == 1800
+    assert scheduler.due(now[0]) == []
+
+    now[0] = datetime(2024, 3, 14, 6, 30, 1)
+    assert [job.name for job in scheduler.due(now[0])] == ["morning"]
+    asyncio.run(scheduler.run_jobs(scheduler.due(now[0])))
+    assert scheduler.due(now[0]) == []
+    assert scheduler.seconds_until_next(now[0]) == pytest.approx(24 * 3600 - 1)
@@ -0,0 +1,78 @@
+import asyncio
+import json
+import pstats
+import sys
+import time
+from pathlib import Path
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import profiling
+
+
+def busy_decode(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    decoded = 0
+    while time.perf_counter() < deadline:
+        decoded += len(json.loads('{"results": [' + ",".join(["{}"] * 200) + "]}")["results"])
+    return decoded
+
+
+async def sample_tool() -> str:
+    # Work in a pool thread, like the tools' asyncio.to_thread HTTP calls
+    decoded = await asyncio.to_thread(busy_decode, 0.1)
+    return f"decoded {decoded}"
+
+
+def test_should_profile_reads_env_and_per_call_request(monkeypatch):
+    monkeypatch.delenv("GOOGLE_ADS_PROFILE", raising=False)
+    assert not profiling.should_profile("run_gaql")
+    assert profiling.should_profile("run_gaql", requested=True)
+
+    monkeypatch.setenv("GOOGLE_ADS_PROFILE", "run_gaql, get_asset_usage")
+    assert profiling.should_profile("run_gaql")
+    assert not profiling.should_profile("list_accounts")
+    assert not profiling.should_profile("run_gaql", requested=False)
+
+    monkeypatch.setenv("GOOGLE_ADS_PROFILE", "1")
+    assert profiling.should_profile("list_accounts")
+
+
+def test_profiled_call_writes_collapsed_stacks_and_pstats(tmp_path, monkeypatch, caplog):
+    monkeypatch.delenv("GOOGLE_ADS_PROFILE", raising=False)
+    monkeypatch.setenv("GOOGLE_ADS_PROFILE_DIR", str(tmp_path))
+    instrumented = profiling.instrument_tool(sample_tool, lambda: True)
+
+    with caplog.at_level("INFO", logger="google_ads_server.profiling"):
+        assert asyncio.run(instrumented()).startswith("decoded")
+
+    collapsed = next(tmp_path.glob("*-sample_tool-*.collapsed")).read_text()
+    assert any(line.startswith("worker;") and "test_profiling:busy_decode" in line for line in collapsed.splitlines())
+    stats = pstats.Stats(str(next(tmp_path.glob("*-sample_tool-*.prof"))))
+    assert any(name == "sample_tool" for _, _, name in stats.stats)
+    assert "Profiled sample_tool" in caplog.text
+
+
+def test_unprofiled_call_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.delenv("GOOGLE_ADS_PROFILE", raising=False)
+    monkeypatch.setenv("GOOGLE_ADS_PROFILE_DIR", str(tmp_path))
+    asyncio.run(profiling.instrument_tool(sample_tool, lambda: None)())
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_overlapping_profiled_calls_share_one_cprofile(tmp_path, monkeypatch, caplog):
+    monkeypatch.delenv("GOOGLE_ADS_PROFILE", raising=False)
+    monkeypatch.setenv("GOOGLE_ADS_PROFILE_DIR", str(tmp_path))
+    instrumented = profiling.instrument_tool(sample_tool, lambda: True)
+
+    async def overlapping():
+        return await asyncio.gather(instrumented(), instrumented())
+
+    with caplog.at_level("INFO", logger="google_ads_server.profiling"):
+        assert all(result.startswith("decoded") for result in asyncio.run(overlapping()))
+
+    assert len(list(tmp_path.glob("*-sample_tool-*.collapsed"))) == 2
+    assert len(list(tmp_path.glob("*-sample_tool-*.prof"))) == 1
+    assert "profiling sample_tool with the stack sampler only" in caplog.text
+    assert not profiling._cprofile_lock.locked()
@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import query_builder
+import shared_state
+
+PROJECTION = query_builder.Projection(
+    resource="campaign_asset",
+    metrics=["metrics.clicks"],
+    attributes={"asset": ["asset.name", "asset.image_asset.full_size.url"], "campaign": ["campaign.name"]},
+    where="asset.type = 'IMAGE'",
+    order_by="metrics.clicks DESC",
+    limit=10,
+)
+
+
+def test_metrics_query_selects_ids_and_metrics_only():
+    assert PROJECTION.metrics_query() == (
+        "SELECT asset.id, campaign.id, metrics.clicks FROM campaign_asset "
+        "WHERE asset.type = 'IMAGE' ORDER BY metrics.clicks DESC LIMIT 10"
+    )
+
+
+def test_combined_query_selects_attributes_next_to_metrics():
+    assert PROJECTION.combined_query() == (
+        "SELECT asset.id, asset.name, asset.image_asset.full_size.url, campaign.id, campaign.name, metrics.clicks "
+        "FROM campaign_asset WHERE asset.type = 'IMAGE' ORDER BY metrics.clicks DESC LIMIT 10"
+    )
+
+
+def test_attribute_queries_are_batched(monkeypatch):
+    monkeypatch.setattr(query_builder, "ATTRIBUTE_BATCH_SIZE", 2)
+    assert query_builder.attribute_queries("ad_group", ["ad_group.name"], ["1", "2", "3"]) == [
+        "SELECT ad_group.id, ad_group.name FROM ad_group WHERE ad_group.id IN (1, 2)",
+        "SELECT ad_group.id, ad_group.name FROM ad_group WHERE ad_group.id IN (3)",
+    ]
+    assert query_builder.attribute_queries("asset", ["asset.name"], []) == []
+
+
+def test_cached_attributes_only_queries_missing_ids():
+    queries = []
+
+    def search(query):
+        queries.append(query)
+        ids = query.split("IN (")[1].rstrip(")").split(", ")
+        # The API leaves out removed entities
+        return [{"asset": {"id": entity_id, "name": f"Image {entity_id}"}} for entity_id in ids if entity_id != "9"]
+
+    cache = shared_state.ResultCache()
+    found, hits = query_builder.cached_attributes(cache, 60, "1", "asset", ["asset.name"], ["1", "2", "9"], search)
+    assert (sorted(found), hits) == (["1", "2"], 0)
+    found, hits = query_builder.cached_attributes(cache, 60, "1", "asset", ["asset.name"], ["2", "3"], search)
+    assert (found["3"]["name"], hits) == ("Image 3", 1)
+    assert queries[-1] == "SELECT asset.id, asset.name FROM asset WHERE asset.id IN (3)"
+    # Other fields, or another account, are separate cache entries
+    query_builder.cached_attributes(cache, 60, "2", "asset", ["asset.name"], ["2"], search)
+    assert len(queries) == 3
+
+
+def test_join_restores_rows_of_the_combined_query():
+    rows = [
+        {"asset": {"id": "1"}, "campaign": {"id": "7"}, "metrics": {"clicks": "5"}},
+        {"asset": {"id": "1"}, "campaign": {"id": "8"}, "metrics": {"clicks": "3"}},
+        {"asset": {"id": "2"}, "campaign": {"id": "7"}, "metrics": {"clicks": "1"}},
+    ]
+    assert PROJECTION.entity_ids(rows) == {"asset": ["1", "2"], "campaign": ["7", "8"]}
+    attributes = {
+        "asset": {"1": {"id": "1", "name": "Logo", "imageAsset": {"fullSize": {"url": "https://x/1.png"}}}},
+        "campaign": {"7": {"id": "7", "name": "Brand"}, "8": {"id": "8", "name": "Generic"}},
+    }
+    joined = PROJECTION.join(rows, attributes)
+    assert joined[1] == {
+        "asset": {"id": "1", "name": "Logo", "imageAsset": {"fullSize": {"url": "https://x/1.png"}}},
+        "campaign": {"id": "8", "name": "Generic"},
+        "metrics": {"clicks": "3"},
+    }
+    # Entities the attribute lookup did not return keep just their ID
+    assert joined[2]["asset"] == {"id": "2"}
@@ -0,0 +1,120 @@
+import sys
+import time
+import subprocess
+import threading
+from pathlib import Path
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import report_jobs
+
+
+def paged_fetch(pages_per_account=3, rows_per_page=4, fail=()):
+    def fetch_page(customer_id, query, page_token):
+        if customer_id in fail:
+            raise RuntimeError(f"no access to {customer_id}")
+        page = int(page_token or 0)
+        rows = [{"campaign": {"id": str(page * rows_per_page + i)}} for i in range(rows_per_page)]
+        return rows, str(page + 1) if page + 1 < pages_per_account else None
+    return fetch_page
+
+
+def wait_for(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while job.status not in report_jobs.FINISHED and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_job_spools_every_page_of_every_account(tmp_path):
+    manager = report_jobs.JobManager(str(tmp_path), workers=2)
+    job = wait_for(manager.start(["1111111111", "2222222222"], "SELECT campaign.id\n  FROM campaign", paged_fetch()))
+
+    assert job.status == "done"
+    assert (job.rows, job.pages, job.accounts_done) == (24, 6, 2)
+    assert job.query == "SELECT campaign.id FROM campaign"
+    rows = manager.read(job, 0, 100)
+    assert len(rows) == 24
+    assert {row["customer"]["id"] for row in rows} == {"1111111111", "2222222222"}
+    assert manager.read(job, 20, 10) == rows[20:]
+    assert manager.read(job, 24, 10) == []
+
+
+def test_failed_accounts_are_reported(tmp_path):
+    manager = report_jobs.JobManager(str(tmp_path))
+    job = wait_for(manager.start(["1111111111", "2222222222"], "q", paged_fetch(fail={"2222222222"})))
+    assert job.status == "done"
+    assert job.errors == {"2222222222": "no access to 2222222222"}
+    assert "Accounts: 2/2 done (1 failed)" in report_jobs.describe(job)
+
+    job = wait_for(manager.start(["2222222222"], "q", paged_fetch(fail={"2222222222"})))
+    assert job.status == "failed"
+
+
+def test_state_survives_the_process(tmp_path):
+    manager = report_jobs.JobManager(str(tmp_path))
+    job = wait_for(manager.start(["1111111111"], "q", paged_fetch()))
+
+    reloaded = report_jobs.JobManager(str(tmp_path)).get(job.job_id)
+    assert reloaded.status == "done"
+    assert reloaded.rows == 12
+    assert report_jobs.JobManager(str(tmp_path)).read(reloaded, 0, 2) == manager.read(job, 0, 2)
+    assert report_jobs.JobManager(str(tmp_path)).get("../etc") is None
+
+
+
+def test_running_job_is_interrupted_only_when_its_process_is_gone(tmp_path):
+    manager = report_jobs.JobManager(str(tmp_path))
+    job = wait_for(manager.start(["1111111111"], "q", paged_fetch()))
+    exited = subprocess.Popen([sys.executable, "-c", "pass"])
+    exited.wait()
+
+    def reloaded_status(job_id, **state):
+        snapshot = job.snapshot()
+        snapshot.update({"job_id": job_id, "status": "running", **state})
+        (tmp_path / f"{job_id}.json").write_text(report_jobs.fast_json.dumps(snapshot))
+        return report_jobs.JobManager(str(tmp_path)).get(job_id).status
+
+    # Polled from another worker while this process keeps it running
+    assert reloaded_status("alive", heartbeat=time.time()) == "running"
+    assert reloaded_status("exited", pid=exited.pid, heartbeat=time.time()) == "interrupted"
+    assert reloaded_status("stale", heartbeat=time.time() - report_jobs.STALE_AFTER - 1) == "interrupted"
+    assert reloaded_status("unowned", pid=None) == "interrupted"
+
+
+def test_running_job_saves_heartbeats(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_jobs, "HEARTBEAT_INTERVAL", 0.01)
+    release = threading.Event()
+    fetch = paged_fetch()
+
+    def slow_fetch(customer_id, query, page_token):
+        release.wait(5)
+        return fetch(customer_id, query, page_token)
+
+    manager = report_jobs.JobManager(str(tmp_path))
+    job = manager.start(["1111111111"], "q", slow_fetch)
+    started = report_jobs.fast_json.loads(job.state_path.read_bytes())["heartbeat"]
+    deadline = time.monotonic() + 5
+    while report_jobs.fast_json.loads(job.state_path.read_bytes())["heartbeat"] == started and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert report_jobs.fast_json.loads(job.state_path.read_bytes())["heartbeat"] > started
+    release.set()
+    assert wait_for(job).status == "done"
+
+
+def test_cancel_stops_paging(tmp_path):
+    release = threading.Event()
+    fetch = paged_fetch(pages_per_account=1000)
+
+    def slow_fetch(customer_id, query, page_token):
+        release.wait(5)
+        return fetch(customer_id, query, page_token)
+
+    manager = report_jobs.JobManager(str(tmp_path))
+    job = manager.start(["1111111111"], "q", slow_fetch)
+    assert manager.cancel(job.job_id)
+    release.set()
+    assert wait_for(job).status == "cancelled"
+    assert job.pages <= 1
+    assert not manager.cancel(job.job_id)
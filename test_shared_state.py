@@ -0,0 +1,148 @@
+import sys
+import time
+import threading
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import shared_state
+
+
+def test_request_key_ignores_query_whitespace():
+    key = shared_state.request_key("http://api", "POST", "customers/1/googleAds:search", {"query": "SELECT a\n  FROM b"}, None)
+    same = shared_state.request_key("http://api", "post", "customers/1/googleAds:search", {"query": " SELECT a FROM b "}, None)
+    other_manager = shared_state.request_key("http://api", "POST", "customers/1/googleAds:search", {"query": "SELECT a FROM b"}, "999")
+    assert key == same
+    assert key != other_manager
+
+
+def test_result_cache_expires_and_evicts_least_recent():
+    cache = shared_state.ResultCache(max_entries=2)
+    cache.set("a", 1, ttl=60)
+    cache.set("b", 2, ttl=60)
+    assert cache.get("a") == 1
+    cache.set("c", 3, ttl=60)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+
+    cache.set("short", 4, ttl=0.01)
+    time.sleep(0.02)
+    assert cache.get("short") is None
+
+
+def test_single_flight_shares_one_call():
+    flight = shared_state.SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "body"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("key", slow))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while len(flight) == 0:
+        time.sleep(0.001)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert sorted(results) == [("body", False)] + [("body", True)] * 3
+    assert len(flight) == 0
+
+    def failing():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("key", failing)
+    # Finished calls are not remembered
+    assert flight.do("key", lambda: "again") == ("again", False)
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = shared_state.RateLimiter(rate=50, burst=1)
+    start = time.monotonic()
+    waits = [limiter.acquire() for _ in range(6)]
+    elapsed = time.monotonic() - start
+    assert waits[0] == 0
+    assert elapsed >= 5 / 50 * 0.9
+
+    assert shared_state.RateLimiter(rate=0).acquire() == 0
+
+
+def test_sqlite_result_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "state.db")
+    writer = shared_state.SqliteResultCache(path, max_entries=2)
+    reader = shared_state.SqliteResultCache(path, max_entries=2)
+
+    writer.set("a", '{"results": []}', ttl=60)
+    assert reader.get("a") == '{"results": []}'
+
+    writer.set("b", "{}", ttl=60)
+    writer.set("c", "{}", ttl=60)
+    assert reader.get("a") is None
+    writer.set("expired", "{}", ttl=-1)
+    assert reader.get("expired") is None
+
+
+def test_sqlite_rate_limiter_shares_budget(tmp_path):
+    path = str(tmp_path / "state.db")
+    first = shared_state.SqliteRateLimiter(path, rate=0, daily_limit=3)
+    second = shared_state.SqliteRateLimiter(path, rate=0, daily_limit=3)
+    first.acquire()
+    second.acquire()
+    first.acquire()
+    try:
+        second.acquire()
+        assert False, "daily budget should be exhausted"
+    except shared_state.QuotaExhausted:
+        pass
+
+    spaced = [shared_state.SqliteRateLimiter(str(tmp_path / "qps.db"), rate=50, burst=1) for _ in range(2)]
+    start = time.monotonic()
+    for i in range(6):
+        spaced[i % 2].acquire()
+    assert time.monotonic() - start >= 5 / 50 * 0.9
+
+
+def test_account_caches_expire_and_are_shared(tmp_path):
+    metadata = {"name": "Brand", "currency": "EUR", "time_zone": "Europe/Berlin", "manager": False}
+
+    cache = shared_state.AccountCache()
+    cache.set_many({"111": metadata, "222": metadata}, ttl=60)
+    assert cache.get("111") == metadata
+    cache.set_many({"333": metadata}, ttl=-1)
+    assert cache.get("333") is None
+
+    path = str(tmp_path / "state.db")
+    shared_state.SqliteAccountCache(path).set_many({"111": metadata}, ttl=60)
+    assert shared_state.SqliteAccountCache(path).get("111") == metadata
+    assert shared_state.SqliteAccountCache(path).get("222") is None
+
+
+def test_login_customer_ids_are_kept_with_account_metadata(tmp_path):
+    cache = shared_state.AccountCache()
+    cache.set_login_customer_ids({"111": "999"}, ttl=60)
+    assert cache.login_customer_id("111") == "999"
+    assert cache.login_customer_id("222") is None
+
+    path = str(tmp_path / "state.db")
+    shared_state.SqliteAccountCache(path).set_login_customer_ids({"111": "999", "222": "999"}, ttl=60)
+    assert shared_state.SqliteAccountCache(path).login_customer_id("222") == "999"
+    shared_state.SqliteAccountCache(path).set_login_customer_ids({"222": "888"}, ttl=-1)
+    assert shared_state.SqliteAccountCache(path).login_customer_id("222") is None
+
+
+def test_sqlite_attribute_cache_keeps_objects_apart_from_results(tmp_path):
+    path = str(tmp_path / "shared.db")
+    shared_state.SqliteAttributeCache(path).set("1/asset/2/asset.name", {"id": "2", "name": "Logo"}, ttl=60)
+    shared_state.SqliteResultCache(path).set("1/asset/2/asset.name", "body", ttl=60)
+    assert shared_state.SqliteAttributeCache(path).get("1/asset/2/asset.name") == {"id": "2", "name": "Logo"}
+    assert shared_state.SqliteResultCache(path).get("1/asset/2/asset.name") == "body"
@@ -0,0 +1,13 @@
+import sys
+from pathlib import Path
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent / "benchmarks"))
+
+import bench_startup
+
+
+def test_heavy_modules_load_lazily():
+    """Starting the server must not import auth, HTTP, formatting or image modules."""
+    result = bench_startup.measure_once()
+    assert result["eager_modules"] == []
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add the parent directory to Python path for imports
+sys.path.insert(0, str(Path(__file__).parent))
+
+import tracing
+
+REMOTE_PARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+def read_spans(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_disabled_tracing_is_a_noop(tmp_path, monkeypatch):
+    monkeypatch.delenv("GOOGLE_ADS_TRACE_EXPORTER", raising=False)
+    with tracing.span("ignored") as span:
+        assert span is tracing.NOOP_SPAN
+        assert tracing.current_traceparent() is None
+
+
+def test_parse_traceparent_rejects_invalid_values():
+    assert tracing.parse_traceparent(REMOTE_PARENT) == ("0af7651916cd43dd8448eb211c80319c", "b7ad6b7169203331")
+    assert tracing.parse_traceparent("00-xyz-b7ad6b7169203331-01") is None
+    assert tracing.parse_traceparent("00-" + "0" * 32 + "-b7ad6b7169203331-01") is None
+    assert tracing.parse_traceparent(None) is None
+
+
+def test_tool_span_joins_remote_trace_and_nests_children(tmp_path, monkeypatch):
+    trace_file = tmp_path / "traces.jsonl"
+    monkeypatch.setenv("GOOGLE_ADS_TRACE_EXPORTER", "file")
+    monkeypatch.setenv("GOOGLE_ADS_TRACE_FILE", str(trace_file))
+
+    @tracing.traced("child")
+    def child():
+        return tracing.current_traceparent()
+
+    async def sample_tool() -> str:
+        # Spans started in worker threads keep their parent
+        return await asyncio.to_thread(child)
+
+    instrumented = tracing.instrument_tool(sample_tool, lambda: REMOTE_PARENT)
+    child_traceparent = asyncio.run(instrumented())
+
+    child_span, tool_span = read_spans(trace_file)
+    assert tool_span["name"] == "tool/sample_tool"
+    assert tool_span["context"]["trace_id"] == "0af7651916cd43dd8448eb211c80319c"
+    assert tool_span["parent_id"] == "b7ad6b7169203331"
+    assert child_span["parent_id"] == tool_span["context"]["span_id"]
+    assert child_traceparent == tracing.format_traceparent(child_span["context"]["trace_id"], child_span["context"]["span_id"])
+
+    summary = tracing.summarize(read_spans(trace_file)).splitlines()
+    assert summary[0] == "trace 0af7651916cd43dd8448eb211c80319c"
+    assert summary[1].strip().startswith("tool/sample_tool")
+    assert summary[2].startswith("    child")
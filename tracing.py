@@ -0,0 +1,239 @@
+"""
+Lightweight tracing for glm_client and the Google Ads MCP server.
+
+Spans follow the OpenTelemetry data model (128-bit trace ids, 64-bit span ids,
+parent links, attributes, status) and trace context is propagated with the
+W3C `traceparent` header format, so a question asked in glm_client can be
+followed through the Z.ai call, the MCP subprocess, the tool function,
+credential loading, each Google Ads request and result formatting.
+
+Tracing is off unless GOOGLE_ADS_TRACE_EXPORTER is set:
+
+- "console": finished spans are written to stderr as JSON lines
+- "file": finished spans are appended to GOOGLE_ADS_TRACE_FILE (default ./traces.jsonl)
+
+When disabled, span() returns a shared no-op context manager. Running this
+module on a trace file prints each trace as an indented tree with durations:
+
+    python tracing.py traces.jsonl
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import inspect
+import functools
+import threading
+import contextvars
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+TRACE_EXPORTERS = ("console", "file")
+TRACEPARENT_ENV = "TRACEPARENT"
+
+# (trace_id, span_id) of the active span, or of the remote parent
+_current: contextvars.ContextVar = contextvars.ContextVar("google_ads_trace_context", default=None)
+_export_lock = threading.Lock()
+_random = random.SystemRandom()
+
+
+def exporter() -> str:
+    """The configured exporter name, or "" when tracing is disabled."""
+    name = os.environ.get("GOOGLE_ADS_TRACE_EXPORTER", "").lower()
+    return name if name in TRACE_EXPORTERS else ""
+
+
+def enabled() -> bool:
+    return bool(exporter())
+
+
+def format_traceparent(trace_id: str, span_id: str) -> str:
+    return f"00-{trace_id}-{span_id}-01"
+
+
+def parse_traceparent(traceparent: Optional[str]) -> Optional[Tuple[str, str]]:
+    """Parse a W3C traceparent header into (trace_id, span_id), or None if invalid."""
+    if not traceparent:
+        return None
+    parts = traceparent.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2]
+
+
+def current_traceparent() -> Optional[str]:
+    """traceparent of the active span, for passing to another process."""
+    context = _current.get()
+    return format_traceparent(*context) if context else None
+
+
+def export(record: Dict[str, Any]) -> None:
+    line = json.dumps(record, default=str)
+    with _export_lock:
+        if exporter() == "file":
+            with open(os.environ.get("GOOGLE_ADS_TRACE_FILE", "./traces.jsonl"), "a") as f:
+                f.write(line + "\n")
+        else:
+            sys.stderr.write(line + "\n")
+            sys.stderr.flush()
+
+
+class Span:
+    """A timed operation. Use through span(); set_attribute() adds details before it ends."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any], parent: Optional[Tuple[str, str]]):
+        self.name = name
+        self.attributes = dict(attributes)
+        self.trace_id = parent[0] if parent else f"{_random.getrandbits(128):032x}"
+        self.parent_id = parent[1] if parent else None
+        self.span_id = f"{_random.getrandbits(64):016x}"
+        self.status = "OK"
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self):
+        self.start_time = time.time_ns()
+        self._start = time.perf_counter_ns()
+        self._token = _current.set((self.trace_id, self.span_id))
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter_ns() - self._start
+        _current.reset(self._token)
+        if exc is not None:
+            self.status = "ERROR"
+            self.attributes["exception.type"] = exc_type.__name__
+            self.attributes["exception.message"] = str(exc)
+        export({
+            "name": self.name,
+            "context": {"trace_id": self.trace_id, "span_id": self.span_id},
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.start_time + duration,
+            "duration_ms": duration / 1e6,
+            "status": self.status,
+            "attributes": self.attributes,
+            "resource": {"service.name": os.path.basename(sys.argv[0]) or "python", "process.pid": os.getpid()},
+        })
+        return False
+
+
+class _NoopSpan:
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+def span(name: str, traceparent: Optional[str] = None, **attributes: Any):
+    """
+    Start a span as a child of the active span.
+
+    Args:
+        name: Span name, e.g. "google_ads.api_request"
+        traceparent: Remote parent to use if there is no active span in this process
+        **attributes: Initial span attributes
+
+    Returns:
+        A context manager yielding the span (a no-op when tracing is disabled)
+    """
+    if not enabled():
+        return NOOP_SPAN
+    parent = _current.get() or parse_traceparent(traceparent)
+    return Span(name, attributes, parent)
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator that runs a sync or async function inside a span."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def instrument_tool(func: Callable, remote_traceparent: Callable[[], Optional[str]]) -> Callable:
+    """
+    Wrap an async tool function in a "tool/<name>" span.
+
+    Args:
+        func: The tool function
+        remote_traceparent: Returns the caller's traceparent for the current call, if any
+    """
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        if not enabled():
+            return await func(*args, **kwargs)
+        with span(f"tool/{name}", traceparent=remote_traceparent(), **{"mcp.tool": name}) as tool_span:
+            result = await func(*args, **kwargs)
+            if isinstance(result, str):
+                tool_span.set_attribute("output.chars", len(result))
+                if result.startswith("Error"):
+                    tool_span.status = "ERROR"
+            return result
+
+    return wrapper
+
+
+def summarize(records: List[Dict[str, Any]]) -> str:
+    """Render spans as one indented tree per trace, children ordered by start time."""
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    span_ids = {record["context"]["span_id"] for record in records}
+    for record in records:
+        parent = record.get("parent_id")
+        # Spans whose parent was not exported are shown as roots
+        children.setdefault(parent if parent in span_ids else None, []).append(record)
+
+    lines = []
+
+    def walk(record: Dict[str, Any], depth: int) -> None:
+        status = "" if record.get("status") == "OK" else f"  [{record.get('status')}]"
+        lines.append(f"{'  ' * depth}{record['name']:<{max(1, 50 - 2 * depth)}} {record['duration_ms']:>10.1f} ms{status}")
+        for child in sorted(children.get(record["context"]["span_id"], []), key=lambda r: r["start_time"]):
+            walk(child, depth + 1)
+
+    for root in sorted(children.get(None, []), key=lambda r: r["start_time"]):
+        lines.append(f"trace {root['context']['trace_id']}")
+        walk(root, 1)
+    return "\n".join(lines)
+
+
+def main():
+    if len(sys.argv) != 2:
+        print("Usage: python tracing.py <traces.jsonl>", file=sys.stderr)
+        sys.exit(2)
+    with open(sys.argv[1]) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    print(summarize(records))
+
+
+if __name__ == "__main__":
+    main()